@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the screen capture backends
+
+Reports grab latency and throughput for every available backend at each
+region size. The synthetic backend is always included so results are
+comparable across machines, including headless ones.
+
+Usage:
+    python bench_capture.py [--backend qt] [--resolution 1920x1080] [--repeat 20]
+"""
+
+import argparse
+import statistics
+import sys
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QRect
+
+from capture_backends import BACKENDS, SyntheticCaptureBackend, time_backend
+
+RESOLUTIONS = ["640x480", "1280x720", "1920x1080", "3840x2160"]
+
+
+def bench_backend(backend, width, height, repeat):
+    """Return latency and throughput figures for one backend and region size"""
+    sample = backend.grab(QRect(0, 0, width, height))  # warm-up; backends clip to the screen
+    pixels = sample.width() * sample.height()
+    latencies = sorted(time_backend(backend, QRect(0, 0, width, height), repeat=repeat))
+    mean = statistics.fmean(latencies)
+    return {
+        "mean_ms": mean * 1000.0,
+        "p50_ms": latencies[len(latencies) // 2] * 1000.0,
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000.0,
+        "fps": 1.0 / mean if mean else float("inf"),
+        "grabbed": f"{sample.width()}x{sample.height()}",
+        "mpix_s": pixels / mean / 1e6 if mean else float("inf"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark screen capture backends")
+    parser.add_argument("--backend", action="append", choices=sorted(BACKENDS), help="may be repeated; default all")
+    parser.add_argument("--resolution", action="append", help="WIDTHxHEIGHT region, may be repeated")
+    parser.add_argument("--repeat", type=int, default=20, help="grabs per measurement")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    resolutions = [tuple(int(v) for v in r.lower().split("x")) for r in (args.resolution or RESOLUTIONS)]
+
+    print(f"{'backend':>10} {'region':>10} {'grabbed':>10} {'mean ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'fps':>8} {'MPix/s':>8}")
+    for name in args.backend or list(BACKENDS):
+        if name == "synthetic":
+            max_width = max(w for w, _ in resolutions)
+            max_height = max(h for _, h in resolutions)
+            backend = SyntheticCaptureBackend(max_width, max_height)
+        else:
+            backend = BACKENDS[name]()
+            if not backend.probe():
+                print(f"{name:>10} {'-':>10} unavailable")
+                continue
+        for width, height in resolutions:
+            try:
+                stats = bench_backend(backend, width, height, args.repeat)
+            except Exception as e:
+                print(f"{name:>10} {width}x{height:<5} failed: {e}")
+                continue
+            print(f"{name:>10} {f'{width}x{height}':>10} {stats['grabbed']:>10} {stats['mean_ms']:9.2f} {stats['p50_ms']:8.2f} "
+                  f"{stats['p95_ms']:8.2f} {stats['fps']:8.1f} {stats['mpix_s']:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
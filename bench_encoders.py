@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the output encoders
+
+Encodes a corpus of synthetic frames (and optionally recorded screenshots)
+with every encoder option and reports encode time, decode time and size,
+so per-workload defaults can be picked.
+
+Usage:
+    python bench_encoders.py [--corpus DIR] [--limit 5] [--repeat 3] [--resolution 1920x1080]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+from PyQt6.QtCore import QRect
+from PyQt6.QtGui import QColor, QFont, QGuiApplication, QImage, QPainter
+
+from capture_backends import SyntheticCaptureBackend
+from encoders import PillowEncoder, PngEncoder, QoiEncoder, QtEncoder, rgb_array_to_qimage
+
+
+def candidate_encoders():
+    encoders = [
+        QtEncoder("png", "png", name="png (Qt default)"),
+        PillowEncoder("PNG", "png", name="png adaptive", compress_level=1),
+        PillowEncoder("PNG", "png", name="png adaptive", compress_level=6),
+        PillowEncoder("PNG", "png", name="png adaptive", compress_level=9),
+        PngEncoder(level=1, filter="none"),
+        PngEncoder(level=1, filter="up"),
+        PngEncoder(level=6, filter="up"),
+        PngEncoder(level=6, filter="paeth"),
+        PillowEncoder("WEBP", "webp", name="webp", lossless=True, method=0),
+        PillowEncoder("WEBP", "webp", name="webp", lossless=True, method=4),
+        PillowEncoder("WEBP", "webp", name="webp", lossless=False, quality=80, method=0),
+        QtEncoder("jpeg", "jpg", quality=90, name="jpeg", supports_alpha=False),
+        QtEncoder("jpeg", "jpg", quality=75, name="jpeg", supports_alpha=False),
+    ]
+    try:
+        import qoi  # noqa: F401
+        encoders.append(QoiEncoder())
+    except ImportError:
+        print("qoi package not installed, skipping QOI (pip install qoi)")
+    return encoders
+
+
+def decode(encoder, data):
+    if isinstance(encoder, QoiEncoder):
+        import qoi
+        return rgb_array_to_qimage(qoi.decode(data))
+    image = QImage.fromData(data)
+    if image.isNull():
+        raise OSError(f"could not decode {encoder.describe()}")
+    return image
+
+
+def ui_frame(width, height):
+    """Flat colours, window chrome and text, like a typical desktop"""
+    image = QImage(width, height, QImage.Format.Format_RGB32)
+    image.fill(QColor(236, 239, 244))
+    painter = QPainter(image)
+    painter.setFont(QFont("Sans", 11))
+    for index, x in enumerate(range(40, width - 300, 420)):
+        window = QRect(x, 60 + index * 30, 380, height - 200)
+        painter.fillRect(window, QColor(255, 255, 255))
+        painter.fillRect(QRect(window.x(), window.y(), window.width(), 28), QColor(60, 90, 160))
+        painter.setPen(QColor(30, 30, 30))
+        for line, y in enumerate(range(window.y() + 50, window.bottom() - 20, 22)):
+            painter.drawText(window.x() + 12, y, f"Row {line:04d}  status=OK  value={(line * 37) % 1000:>4}")
+    painter.end()
+    return image
+
+
+def noise_frame(width, height):
+    """Smooth photographic-like content, the hard case for lossless codecs"""
+    rng = np.random.default_rng(7)
+    coarse = rng.integers(0, 256, size=(height // 8 + 1, width // 8 + 1, 3), dtype=np.uint8)
+    smooth = np.repeat(np.repeat(coarse, 8, axis=0), 8, axis=1)[:height, :width]
+    grain = rng.integers(-12, 13, size=smooth.shape)
+    return rgb_array_to_qimage(np.clip(smooth.astype(np.int16) + grain, 0, 255).astype(np.uint8))
+
+
+def load_corpus(directory, limit):
+    frames = []
+    for name in sorted(os.listdir(directory)):
+        if len(frames) >= limit:
+            break
+        if os.path.splitext(name)[1].lower() not in (".png", ".jpg", ".jpeg", ".bmp", ".webp"):
+            continue
+        image = QImage(os.path.join(directory, name))
+        if not image.isNull():
+            frames.append((f"recorded:{name}", image.convertToFormat(QImage.Format.Format_RGB32)))
+    return frames
+
+
+def bench(encoder, image, repeat):
+    encode_times, decode_times = [], []
+    data = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        data = encoder.encode(image)
+        encode_times.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        decode(encoder, data)
+        decode_times.append(time.perf_counter() - started)
+    return statistics.median(encode_times) * 1000.0, statistics.median(decode_times) * 1000.0, len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark screenshot output encoders")
+    parser.add_argument("--corpus", help="directory of recorded screenshots to include")
+    parser.add_argument("--limit", type=int, default=5, help="max recorded screenshots")
+    parser.add_argument("--repeat", type=int, default=3, help="encodes per measurement (median reported)")
+    parser.add_argument("--resolution", default="1920x1080", help="size of the synthetic frames")
+    args = parser.parse_args()
+
+    app = QGuiApplication.instance() or QGuiApplication(sys.argv)
+    width, height = (int(v) for v in args.resolution.lower().split("x"))
+    corpus = [
+        ("synthetic:bands", SyntheticCaptureBackend(width, height).grab()),
+        ("synthetic:ui", ui_frame(width, height)),
+        ("synthetic:photo", noise_frame(width, height)),
+    ]
+    if args.corpus:
+        corpus.extend(load_corpus(args.corpus, args.limit))
+
+    encoders = candidate_encoders()
+    print(f"{'frame':<24} {'encoder':<40} {'enc ms':>8} {'dec ms':>8} {'KiB':>9} {'ratio':>7}")
+    for label, image in corpus:
+        raw_bytes = image.width() * image.height() * 3
+        for encoder in encoders:
+            try:
+                encode_ms, decode_ms, size = bench(encoder, image, args.repeat)
+            except Exception as e:
+                print(f"{label:<24} {encoder.describe():<40} failed: {e}")
+                continue
+            print(f"{label:<24} {encoder.describe():<40} {encode_ms:8.1f} {decode_ms:8.1f} "
+                  f"{size / 1024:9.1f} {raw_bytes / max(1, size):7.1f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
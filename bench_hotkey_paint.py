@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark for hotkey-to-first-paint latency of the dialog and region overlay
+
+Compares building a new ScreenshotDialog / CroppingWidget for every
+capture (the previous behaviour) with showing the pre-warmed instances the
+app now keeps, measuring from the trigger to the window's first paintEvent.
+
+Usage:
+    python bench_hotkey_paint.py [--resolution 1920x1080] [--repeat 20]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication
+
+from bench_overlay import synthetic_pixmap
+from capture_timeline import CaptureTimeline
+
+RESOLUTIONS = ["1920x1080", "3840x2160"]
+
+
+def time_to_paint(show, stage, timeout=5.0):
+    """Milliseconds from calling show(timeline) until stage is marked by a paint"""
+    app = QApplication.instance()
+    timeline = CaptureTimeline()
+    show(timeline)
+    deadline = time.perf_counter() + timeout
+    while timeline.elapsed_ms(stage) is None and time.perf_counter() < deadline:
+        app.processEvents()
+    return timeline.elapsed_ms(stage)
+
+
+def bench_dialog(dialog_class, repeat):
+    app = QApplication.instance()
+    cold, warm = [], []
+    for _ in range(repeat):
+        dialogs = []
+        def show_new(timeline):
+            dialog = dialog_class(None)
+            dialog.present(timeline)
+            dialogs.append(dialog)
+        cold.append(time_to_paint(show_new, "dialog_painted"))
+        dialogs[0].hide()
+        dialogs[0].deleteLater()
+        app.processEvents()
+    reused = dialog_class(None)
+    reused.prewarm()
+    for _ in range(repeat):
+        warm.append(time_to_paint(reused.present, "dialog_painted"))
+        reused.hide()
+        app.processEvents()
+    return cold, warm
+
+
+def bench_overlay(widget_class, width, height, repeat):
+    app = QApplication.instance()
+    pixmap = synthetic_pixmap(width, height)
+    cold, warm = [], []
+    for _ in range(repeat):
+        widgets = []
+        def show_new(timeline):
+            widget = widget_class(None)
+            widget.begin(pixmap, None, timeline)
+            widgets.append(widget)
+        cold.append(time_to_paint(show_new, "overlay_painted"))
+        widgets[0].close()
+        widgets[0].deleteLater()
+        app.processEvents()
+    reused = widget_class(None)
+    reused.prewarm()
+    for _ in range(repeat):
+        warm.append(time_to_paint(lambda timeline: reused.begin(pixmap, None, timeline), "overlay_painted"))
+        reused.close()
+        app.processEvents()
+    return cold, warm
+
+
+def describe(samples):
+    ordered = sorted(samples)
+    return f"{statistics.fmean(ordered):8.2f} {ordered[len(ordered) // 2]:8.2f} {ordered[-1]:8.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hotkey-to-first-paint for the dialog and overlay")
+    parser.add_argument("--resolution", action="append", help="overlay WIDTHxHEIGHT, may be repeated")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from screenshot_app import CroppingWidget, ScreenshotDialog
+
+    print(f"{'window':>20} {'variant':>8} {'mean ms':>8} {'p50 ms':>8} {'max ms':>8}")
+    cold, warm = bench_dialog(ScreenshotDialog, args.repeat)
+    print(f"{'dialog':>20} {'new':>8} {describe(cold)}")
+    print(f"{'dialog':>20} {'reused':>8} {describe(warm)}")
+    for resolution in args.resolution or RESOLUTIONS:
+        width, height = (int(v) for v in resolution.lower().split("x"))
+        cold, warm = bench_overlay(CroppingWidget, width, height, args.repeat)
+        print(f"{'overlay ' + resolution:>20} {'new':>8} {describe(cold)}")
+        print(f"{'overlay ' + resolution:>20} {'reused':>8} {describe(warm)}")
+
+
+if __name__ == "__main__":
+    main()
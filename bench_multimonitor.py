@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark for multi-monitor capture: parallel vs sequential screen grabs
+
+Grabs the whole virtual desktop with one worker thread per screen and
+then one screen after another, and reports per-screen grab time, wall-clock
+grab time, stitch time and the speedup. By default the layout is
+synthetic so the numbers are comparable across machines; --live uses the
+connected screens with a real backend.
+
+Usage:
+    python bench_multimonitor.py [--layout 1920x1080@1,2560x1440@1,3840x2160@2] [--repeat 20]
+    python bench_multimonitor.py --live --backend mss
+"""
+
+import argparse
+import statistics
+import sys
+
+from PyQt6.QtCore import QRect
+from PyQt6.QtWidgets import QApplication
+
+from capture_backends import BACKENDS, ScreenInfo, SyntheticCaptureBackend, VirtualDesktopBackend
+
+DEFAULT_LAYOUT = "1920x1080@1,2560x1440@1,3840x2160@2"
+
+
+def synthetic_layout(spec):
+    """ScreenInfo list for WIDTHxHEIGHT@RATIO native sizes side by side, and the native desktop size"""
+    layout, x, native_height = [], 0, 0
+    for index, entry in enumerate(spec.split(",")):
+        size, _, ratio = entry.partition("@")
+        width, height = (int(v) for v in size.lower().split("x"))
+        ratio = float(ratio or 1)
+        # Like Qt: the top-left is in native pixels, the size in logical pixels
+        layout.append(ScreenInfo(f"screen{index}", QRect(x, 0, round(width / ratio), round(height / ratio)), ratio))
+        x += width
+        native_height = max(native_height, height)
+    return layout, x, native_height
+
+
+def bench(desktop, repeat):
+    desktop.grab()  # warm-up: starts the worker threads and their backends
+    runs = []
+    for _ in range(repeat):
+        desktop.grab()
+        runs.append(desktop.last_timings)
+    screens = len(runs[0]["screens_ms"])
+    return {
+        "screens_ms": [statistics.median(run["screens_ms"][i] for run in runs) for i in range(screens)],
+        "grab_ms": statistics.median(run["grab_ms"] for run in runs),
+        "stitch_ms": statistics.median(run["stitch_ms"] for run in runs),
+        "total_ms": statistics.median(run["total_ms"] for run in runs),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare parallel and sequential multi-monitor grabs")
+    parser.add_argument("--layout", default=DEFAULT_LAYOUT, help="synthetic screens as WIDTHxHEIGHT@RATIO,...")
+    parser.add_argument("--live", action="store_true", help="grab the connected screens instead")
+    parser.add_argument("--backend", default="mss", choices=sorted(set(BACKENDS) - {"qt", "synthetic"}),
+                        help="per-screen backend for --live")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    if args.live:
+        layout, factory = None, BACKENDS[args.backend]
+        if not factory().probe():
+            print(f"Backend '{args.backend}' is unavailable")
+            return
+    else:
+        layout, width, height = synthetic_layout(args.layout)
+        factory = lambda: SyntheticCaptureBackend(width, height, static=True)
+
+    results = {}
+    for mode, parallel in (("parallel", True), ("sequential", False)):
+        desktop = VirtualDesktopBackend(factory, layout=layout, parallel=parallel)
+        results[mode] = bench(desktop, args.repeat)
+        desktop.close()
+
+    screens = layout if layout is not None else VirtualDesktopBackend(factory).screens()
+    print("screens: " + ", ".join(f"{s.name} {s.geometry.width()}x{s.geometry.height()}@{s.device_pixel_ratio:g}"
+                                  for s in screens))
+    print(f"{'mode':>10} {'per-screen ms':>24} {'grab ms':>9} {'stitch ms':>10} {'total ms':>9}")
+    for mode, stats in results.items():
+        per_screen = "/".join(f"{ms:.1f}" for ms in stats["screens_ms"])
+        print(f"{mode:>10} {per_screen:>24} {stats['grab_ms']:9.2f} {stats['stitch_ms']:10.2f} {stats['total_ms']:9.2f}")
+    speedup = results["sequential"]["grab_ms"] / results["parallel"]["grab_ms"]
+    print(f"parallel grab speedup: {speedup:.2f}x "
+          f"(sum of screens {sum(results['sequential']['screens_ms']):.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the CroppingWidget selection overlay
+
+Replays a synthetic drag under the Qt offscreen platform and reports the
+time taken to handle each mouse move and paint the resulting frame.
+
+Usage:
+    python bench_overlay.py [--resolution 1920x1080] [--steps 200]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import Qt, QPoint, QPointF, QRect
+from PyQt6.QtGui import QPixmap, QPainter, QColor, QLinearGradient, QMouseEvent
+
+RESOLUTIONS = ["1920x1080", "3840x2160"]
+
+
+def synthetic_pixmap(width, height):
+    """A deterministic, non-uniform screen image"""
+    pixmap = QPixmap(width, height)
+    painter = QPainter(pixmap)
+    gradient = QLinearGradient(0, 0, width, height)
+    gradient.setColorAt(0.0, QColor(30, 60, 90))
+    gradient.setColorAt(1.0, QColor(220, 200, 120))
+    painter.fillRect(0, 0, width, height, gradient)
+    for i in range(0, width, 64):
+        painter.fillRect(i, 0, 2, height, QColor(255, 255, 255, 40))
+    painter.end()
+    return pixmap
+
+
+def _mouse_event(event_type, point):
+    button = Qt.MouseButton.NoButton if event_type == QMouseEvent.Type.MouseMove else Qt.MouseButton.LeftButton
+    buttons = Qt.MouseButton.LeftButton
+    return QMouseEvent(event_type, QPointF(point), QPointF(point), button, buttons, Qt.KeyboardModifier.NoModifier)
+
+
+def _legacy_widget_class(base):
+    class LegacyCroppingWidget(base):
+        """The previous overlay: full repaint and a pixmap copy per frame"""
+        def paintEvent(self, event):
+            painter = QPainter(self)
+            painter.drawPixmap(0, 0, self.screen_pixmap)
+            painter.fillRect(self.rect(), QColor(0, 0, 0, int(255 * 0.5)))
+            if self.crop_rect is not None:
+                crop = self.screen_pixmap.copy(self.crop_rect)
+                painter.drawPixmap(self.crop_rect.topLeft(), crop)
+                painter.setPen(self.BORDER_PEN)
+                painter.drawRect(self.crop_rect)
+
+        def _set_crop_rect(self, crop_rect):
+            self.crop_rect = crop_rect
+            self.update()
+    return LegacyCroppingWidget
+
+
+def replay_drag(widget_class, width, height, steps):
+    """Drag diagonally across the widget, returning per-frame times in ms"""
+    app = QApplication.instance()
+    widget = widget_class(synthetic_pixmap(width, height))
+    widget.setWindowState(Qt.WindowState.WindowNoState)
+    widget.setGeometry(QRect(0, 0, width, height))
+    app.processEvents()
+
+    start = QPoint(width // 8, height // 8)
+    widget.mousePressEvent(_mouse_event(QMouseEvent.Type.MouseButtonPress, start))
+    app.processEvents()
+    frame_times = []
+    for step in range(1, steps + 1):
+        point = QPoint(start.x() + (width * 3 // 4) * step // steps,
+                       start.y() + (height * 3 // 4) * step // steps)
+        began = time.perf_counter()
+        widget.mouseMoveEvent(_mouse_event(QMouseEvent.Type.MouseMove, point))
+        app.processEvents()
+        frame_times.append((time.perf_counter() - began) * 1000.0)
+    widget.origin = None
+    widget.close()
+    widget.deleteLater()
+    app.processEvents()
+    return frame_times
+
+
+def summarize(frame_times):
+    ordered = sorted(frame_times)
+    return {
+        "mean": statistics.fmean(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CroppingWidget drag rendering")
+    parser.add_argument("--resolution", action="append", help="WIDTHxHEIGHT, may be repeated")
+    parser.add_argument("--steps", type=int, default=200, help="mouse moves per drag")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from screenshot_app import CroppingWidget
+    variants = [("cached", CroppingWidget), ("legacy", _legacy_widget_class(CroppingWidget))]
+
+    print(f"{'resolution':>12} {'variant':>8} {'mean ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for resolution in args.resolution or RESOLUTIONS:
+        width, height = (int(v) for v in resolution.lower().split("x"))
+        for name, widget_class in variants:
+            stats = summarize(replay_drag(widget_class, width, height, args.steps))
+            print(f"{resolution:>12} {name:>8} {stats['mean']:9.3f} {stats['p50']:8.3f} "
+                  f"{stats['p95']:8.3f} {stats['max']:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: time to tray icon and peak memory
+
+Launches the app with --startup-report, which shows the tray icon, warms
+the capture backend and encoder, writes its measurements and quits.
+Time-to-tray is measured from process launch, so for the frozen build it
+includes the --onefile bootloader unpacking the bundle. Peak RSS is the
+app process's own peak working set once warm-up has finished.
+
+Stop a running Screenshot Service first: a second instance exits at the
+single-instance check without a report.
+
+Usage:
+    python bench_startup.py [--repeat 5]
+    python bench_startup.py --exe dist/ScreenshotService.exe
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def launch(command, timeout):
+    """Run the app once; returns its startup report with time_to_tray_ms added, or None"""
+    with tempfile.TemporaryDirectory() as tmp:
+        report_path = os.path.join(tmp, "startup.json")
+        launched_at = time.time()
+        try:
+            subprocess.run(command + ["--startup-report", report_path], timeout=timeout,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except subprocess.TimeoutExpired:
+            print(f"[ERROR] {command[-1]} did not finish starting within {timeout}s")
+            return None
+        if not os.path.exists(report_path):
+            print(f"[ERROR] {command[-1]} wrote no startup report (is the service already running?)")
+            return None
+        with open(report_path) as f:
+            report = json.load(f)
+    report["time_to_tray_ms"] = (report["tray_shown_at"] - launched_at) * 1000.0
+    return report
+
+
+def describe(values):
+    ordered = sorted(values)
+    return f"{statistics.fmean(ordered):9.1f} {ordered[len(ordered) // 2]:9.1f} {ordered[-1]:9.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time-to-tray and peak RSS of a cold start")
+    parser.add_argument("--exe", help="also measure this frozen build")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    variants = [("source", [sys.executable, os.path.join(HERE, "screenshot_app.py")])]
+    if args.exe:
+        variants.append(("frozen", [os.path.abspath(args.exe)]))
+
+    print(f"{'variant':>8} {'metric':>16} {'mean':>9} {'p50':>9} {'max':>9}")
+    for variant, command in variants:
+        reports = [report for report in (launch(command, args.timeout) for _ in range(args.repeat)) if report]
+        if not reports:
+            continue
+        rows = [
+            ("time to tray ms", [r["time_to_tray_ms"] for r in reports]),
+            ("import->tray ms", [r["import_to_tray_ms"] for r in reports]),
+            ("import->warm ms", [r["import_to_warm_ms"] for r in reports]),
+        ]
+        if all(r["peak_rss_bytes"] for r in reports):
+            rows.append(("peak RSS MB", [r["peak_rss_bytes"] / (1024 * 1024) for r in reports]))
+        for metric, values in rows:
+            print(f"{variant:>8} {metric:>16} {describe(values)}")
+        last = reports[-1]
+        print(f"{variant:>8} backend {last['backend']}, heavy modules loaded: "
+              f"{', '.join(last['loaded_modules']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
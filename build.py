@@ -2,13 +2,17 @@ import subprocess
 import sys
 import os
 
-def build_executable():
-    """Build the screenshot application into an executable"""
+def build_executable(onefile=True):
+    """Build the screenshot application into an executable
+
+    A --onefile build unpacks the whole bundle to a temporary directory on
+    every launch; onefile=False builds a folder that starts faster.
+    """
     
     # PyInstaller command to create a single executable file
     cmd = [
         "pyinstaller",
-        "--onefile",                    # Create a single executable
+        "--onefile" if onefile else "--onedir",  # Single executable, or a folder that skips unpacking
         "--windowed",                   # Don't show console window
         "--name=ScreenshotService",     # Name of the executable
         "--icon=icon.ico",              # Icon file (if available)
@@ -16,10 +20,18 @@ def build_executable():
         "--hidden-import=PyQt6.QtCore",
         "--hidden-import=PyQt6.QtWidgets", 
         "--hidden-import=PyQt6.QtGui",
+        "--hidden-import=PyQt6.QtNetwork",
+        # Imported lazily (hotkey thread, capture backends, encoders); list them so the
+        # bundle keeps them even though the startup path no longer imports them
         "--hidden-import=keyboard",
         "--hidden-import=pyautogui",
         "--hidden-import=PIL",
-        "--hidden-import=tkinter",
+        "--hidden-import=numpy",
+        "--hidden-import=history_window",
+        "--hidden-import=startup_report",
+        "--hidden-import=screen_recorder",
+        "--hidden-import=perceptual_hash",
+        "--exclude-module=tkinter",     # Unused; keeps it out of the bundle
         "screenshot_app.py"
     ]
     
@@ -27,7 +39,10 @@ def build_executable():
         print("Building executable...")
         result = subprocess.run(cmd, check=True, capture_output=True, text=True)
         print("Build completed successfully!")
-        print(f"Executable created in: dist/ScreenshotService.exe")
+        if onefile:
+            print(f"Executable created in: dist/ScreenshotService.exe")
+        else:
+            print(f"Executable created in: dist/ScreenshotService/ScreenshotService.exe")
         return True
     except subprocess.CalledProcessError as e:
         print(f"Build failed with error: {e}")
@@ -39,4 +54,4 @@ def build_executable():
         return False
 
 if __name__ == "__main__":
-    build_executable() 
\ No newline at end of file
+    build_executable(onefile="--onedir" not in sys.argv)
\ No newline at end of file
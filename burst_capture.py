@@ -0,0 +1,236 @@
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from PyQt6.QtGui import QImage
+
+from frame_dedup import delta_path
+from save_pipeline import write_image
+from telemetry import metrics
+
+log = logging.getLogger(__name__)
+
+
+class FrameRingBuffer:
+    """A fixed set of preallocated frame slots shared by a producer and flush workers
+
+    Frames are copied into free slots and handed to the flush workers in
+    capture order. When every slot is waiting to be written the frame is
+    dropped instead of allocating more memory.
+    """
+
+    def __init__(self, capacity, width, height, image_format=QImage.Format.Format_RGB32):
+        self.capacity = capacity
+        self.image_format = image_format
+        self._slots = [QImage(width, height, image_format) for _ in range(capacity)]
+        self._free = queue.Queue()
+        self._filled = queue.Queue()
+        for index in range(capacity):
+            self._free.put(index)
+
+    @staticmethod
+    def slots_for_budget(budget_bytes, width, height, minimum=2):
+        """Number of RGB32 slots of the given size that fit in budget_bytes"""
+        frame_bytes = max(1, width * height * 4)
+        return max(minimum, budget_bytes // frame_bytes)
+
+    def push(self, image, filepath, dedup=None, captured_at=None):
+        """Copy image into a free slot; returns False (frame dropped) if none is free"""
+        try:
+            index = self._free.get_nowait()
+        except queue.Empty:
+            return False
+        if image.format() != self.image_format:
+            image = image.convertToFormat(self.image_format)
+        slot = self._slots[index]
+        if slot.size() == image.size():
+            source = image.constBits()
+            source.setsize(image.sizeInBytes())
+            target = slot.bits()
+            target.setsize(slot.sizeInBytes())
+            memoryview(target)[:] = memoryview(source)
+        else:
+            # Screen geometry changed mid-burst; the slot takes the new size
+            self._slots[index] = image.copy()
+        self._filled.put((index, filepath, dedup, captured_at))
+        return True
+
+    def has_free_slot(self):
+        return not self._free.empty()
+
+    def take(self, timeout=None):
+        """Next filled (index, filepath, dedup, captured_at) in capture order, or None when closed"""
+        return self._filled.get(timeout=timeout)
+
+    def slot(self, index):
+        return self._slots[index]
+
+    def release(self, index):
+        self._free.put(index)
+
+    def close(self, workers):
+        """Wake each flush worker with an end marker"""
+        for _ in range(workers):
+            self._filled.put(None)
+
+
+class BurstCapture(QObject):
+    """Grab frames at a fixed rate for a fixed duration and flush them in the background
+
+    Grabs run on a QTimer in the calling (GUI) thread so GUI-thread-only
+    backends work; encoding happens on flush worker threads reading from a
+    FrameRingBuffer.
+    """
+    frame_captured = pyqtSignal(int)  # sequence number
+    finished = pyqtSignal(dict)  # stats
+
+    def __init__(self, backend, screenshot_dir, buffer_bytes=256 * 1024 * 1024, flush_workers=2,
+                 deduplicator_factory=None, encoder=None, catalog=None, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self.encoder = encoder
+        self.deduplicator_factory = deduplicator_factory
+        self._deduplicator = None
+        self.backend = backend
+        self.screenshot_dir = screenshot_dir
+        self.buffer_bytes = buffer_bytes
+        self.flush_workers = flush_workers
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._grab_frame)
+        self._ring = None
+        self._workers = []
+        self._running = False
+        self._stats = {}
+
+    def is_running(self):
+        return self._running
+
+    def start(self, rate, duration):
+        """Capture at rate frames per second for duration seconds"""
+        if self._running:
+            return False
+        first = self.backend.grab()
+        capacity = FrameRingBuffer.slots_for_budget(self.buffer_bytes, first.width(), first.height())
+        self._ring = FrameRingBuffer(capacity, first.width(), first.height())
+        self._session = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self._sequence = 0
+        self._frame_limit = max(1, int(round(rate * duration)))
+        self._stats = {
+            "frames_captured": 0,
+            "frames_dropped": 0,
+            "frames_deduplicated": 0,
+            "frames_written": 0,
+            "write_errors": 0,
+            "buffer_slots": capacity,
+        }
+        self._stats_lock = threading.Lock()
+        self._deduplicator = self.deduplicator_factory() if self.deduplicator_factory else None
+        self._started_at = time.perf_counter()
+        self._workers = []
+        for index in range(self.flush_workers):
+            worker = threading.Thread(target=self._flush, name=f"BurstFlush-{index}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        self._running = True
+        log.debug("Burst capture started: %s fps for %ss into %s slots.", rate, duration, capacity)
+        self._store_frame(first)
+        self._timer.start(max(1, int(round(1000.0 / rate))))
+        return True
+
+    def stop(self, wait=False):
+        """Stop grabbing; pending frames are still flushed before finished is emitted"""
+        if not self._running:
+            return
+        self._timer.stop()
+        self._running = False
+        self._ring.close(len(self._workers))
+        if wait:
+            self._wait_for_flush()
+        else:
+            threading.Thread(target=self._wait_for_flush, name="BurstFinish", daemon=True).start()
+
+    def frame_path(self, sequence):
+        """Unique, monotonically ordered frame filename for this burst session"""
+        extension = self.encoder.extension if self.encoder is not None else "png"
+        return os.path.join(self.screenshot_dir, f"burst_{self._session}_{sequence:06d}.{extension}")
+
+    def _grab_frame(self):
+        try:
+            with metrics.span("grab", mode="burst"):
+                image = self.backend.grab()
+        except Exception as e:
+            log.error("Burst grab failed: %s", e)
+            self.stop()
+            return
+        self._store_frame(image)
+
+    def _store_frame(self, image):
+        sequence = self._sequence
+        self._sequence += 1
+        filepath = self.frame_path(sequence)
+        # Check for a free slot before dedup so a dropped frame never becomes a keyframe
+        if not self._ring.has_free_slot():
+            with self._stats_lock:
+                self._stats["frames_dropped"] += 1
+            log.debug("Burst frame %s dropped, encoder behind.", sequence)
+        else:
+            decision = None
+            if self._deduplicator is not None:
+                decision = self._deduplicator.check(image, filepath)
+            if decision is not None and decision.action == "skip":
+                with self._stats_lock:
+                    self._stats["frames_deduplicated"] += 1
+            else:
+                # Only this thread takes free slots, so the push cannot fail here
+                self._ring.push(image, filepath, decision, time.time())
+                with self._stats_lock:
+                    self._stats["frames_captured"] += 1
+                self.frame_captured.emit(sequence)
+        if self._sequence >= self._frame_limit:
+            self.stop()
+
+    def _flush(self):
+        while True:
+            item = self._ring.take()
+            if item is None:
+                return
+            index, filepath, decision, captured_at = item
+            action = decision.action if decision is not None else "full"
+            try:
+                image, encoder = self._ring.slot(index), self.encoder
+                if action == "delta":
+                    image = self._deduplicator.build_delta(image, decision)
+                    filepath, encoder = delta_path(filepath), None
+                started = time.perf_counter()
+                nbytes = write_image(image, filepath, encoder)
+                if self._deduplicator is not None:
+                    self._deduplicator.observe_write(action, nbytes, time.perf_counter() - started)
+                if self.catalog is not None:
+                    self.catalog.record(filepath, "burst", captured_at, image.width(), image.height(),
+                                        size_bytes=nbytes)
+            except Exception as e:
+                log.error("Failed to write burst frame %s: %s", filepath, e)
+                if self._deduplicator is not None:
+                    self._deduplicator.discard(filepath)
+                with self._stats_lock:
+                    self._stats["write_errors"] += 1
+            else:
+                with self._stats_lock:
+                    self._stats["frames_written"] += 1
+            finally:
+                self._ring.release(index)
+
+    def _wait_for_flush(self):
+        for worker in self._workers:
+            worker.join()
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["elapsed"] = time.perf_counter() - self._started_at
+        if self._deduplicator is not None:
+            stats["dedup"] = self._deduplicator.stats()
+        log.info("Burst capture finished: %s", stats)
+        self.finished.emit(stats)
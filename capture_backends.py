@@ -0,0 +1,547 @@
+import logging
+import queue
+import threading
+import time
+
+from PyQt6.QtCore import QPoint, QRect, QSize, Qt
+from PyQt6.QtGui import QImage, QPainter, QColor, QGuiApplication, QRegion
+
+log = logging.getLogger(__name__)
+
+
+def pil_to_qimage(pil_image):
+    """Convert a PIL image to a QImage that owns its pixel data"""
+    rgb = pil_image.convert("RGB")
+    data = rgb.tobytes("raw", "RGB")
+    image = QImage(data, rgb.width, rgb.height, rgb.width * 3, QImage.Format.Format_RGB888)
+    return image.copy()
+
+
+class CaptureBackend:
+    """Grabs screen pixels into a QImage
+
+    rect is an optional QRect in screen coordinates; None grabs the whole
+    primary screen. Backends with gui_thread_only set must be called from
+    the Qt GUI thread.
+    """
+    name = None
+    gui_thread_only = False
+
+    def grab(self, rect=None):
+        raise NotImplementedError
+
+    def desktop_geometry(self):
+        """Logical rect covered by grab(None) when it spans several screens, else None"""
+        return None
+
+    def prepare(self):
+        """Work ahead of warm_up() that may run on any thread; nothing by default"""
+
+    def warm_up(self):
+        """Get ready for the first grab ahead of time; backends are ready once created"""
+        return self
+
+    def close(self):
+        """Release threads or handles held by the backend"""
+
+    def probe(self):
+        """Return True if this backend can grab on the current machine"""
+        try:
+            image = self.grab(QRect(0, 0, 1, 1))
+        except Exception as e:
+            log.debug("Capture backend '%s' unavailable: %s", self.name, e)
+            return False
+        return image is not None and not image.isNull()
+
+
+class QtCaptureBackend(CaptureBackend):
+    """QScreen.grabWindow on the primary screen"""
+    name = "qt"
+    gui_thread_only = True
+
+    def grab(self, rect=None):
+        if QGuiApplication.instance() is None:
+            raise RuntimeError("QGuiApplication has not been created")
+        screen = QGuiApplication.primaryScreen()
+        if screen is None:
+            raise RuntimeError("No primary screen found")
+        if rect is None:
+            pixmap = screen.grabWindow(0)
+        else:
+            pixmap = screen.grabWindow(0, rect.x(), rect.y(), rect.width(), rect.height())
+        return pixmap.toImage()
+
+
+class PilCaptureBackend(CaptureBackend):
+    """PIL.ImageGrab"""
+    name = "pil"
+
+    def grab(self, rect=None):
+        from PIL import ImageGrab
+        bbox = None
+        if rect is not None:
+            bbox = (rect.x(), rect.y(), rect.x() + rect.width(), rect.y() + rect.height())
+        return pil_to_qimage(ImageGrab.grab(bbox=bbox))
+
+
+class PyAutoGuiCaptureBackend(CaptureBackend):
+    """pyautogui.screenshot"""
+    name = "pyautogui"
+
+    def grab(self, rect=None):
+        import pyautogui
+        if rect is None:
+            return pil_to_qimage(pyautogui.screenshot())
+        region = (rect.x(), rect.y(), rect.width(), rect.height())
+        return pil_to_qimage(pyautogui.screenshot(region=region))
+
+
+class MssCaptureBackend(CaptureBackend):
+    """The optional mss package (XShm / GDI BitBlt / CoreGraphics), raw BGRA without PIL"""
+    name = "mss"
+
+    def __init__(self):
+        self._mss = None
+
+    def grab(self, rect=None):
+        if self._mss is None:
+            import mss
+            self._mss = mss.mss()
+        if rect is None:
+            monitor = self._mss.monitors[1]
+        else:
+            monitor = {"left": rect.x(), "top": rect.y(), "width": rect.width(), "height": rect.height()}
+        shot = self._mss.grab(monitor)
+        # BGRA bytes match QImage's little-endian 0xAARRGGBB layout
+        image = QImage(shot.raw, shot.width, shot.height, shot.width * 4, QImage.Format.Format_RGB32)
+        return image.copy()
+
+
+class SyntheticCaptureBackend(CaptureBackend):
+    """Deterministic in-memory frames for tests and benchmarks
+
+    Every grab advances a frame counter that moves a block across a fixed
+    gradient, unless static is set, so consecutive frames are reproducible
+    but not identical.
+    """
+    name = "synthetic"
+
+    def __init__(self, width=1920, height=1080, static=False):
+        self.width = width
+        self.height = height
+        self.static = static
+        self.frame_index = 0
+        self._background = self._build_background(width, height)
+
+    @staticmethod
+    def _build_background(width, height):
+        image = QImage(width, height, QImage.Format.Format_RGB32)
+        image.fill(QColor(32, 48, 64))
+        painter = QPainter(image)
+        band = max(1, height // 16)
+        for i, y in enumerate(range(0, height, band)):
+            painter.fillRect(0, y, width, band, QColor(32 + i * 12 % 200, 48 + i * 7 % 180, 64 + i * 5 % 160))
+        painter.end()
+        return image
+
+    def grab(self, rect=None):
+        if rect is None:
+            rect = QRect(0, 0, self.width, self.height)
+        frame = self._background.copy(rect)
+        if not self.static:
+            painter = QPainter(frame)
+            size = max(8, min(self.width, self.height) // 10)
+            x = (self.frame_index * size) % max(1, self.width - size)
+            y = (self.frame_index * size // 2) % max(1, self.height - size)
+            painter.fillRect(x - rect.x(), y - rect.y(), size, size, QColor(240, 80, 40))
+            painter.end()
+        self.frame_index += 1
+        return frame
+
+
+class ScreenInfo:
+    """One monitor: its logical geometry and device pixel ratio
+
+    Qt reports each screen's top-left in native pixels and its size in
+    logical pixels, so the native rect starts at the same point and is
+    device_pixel_ratio times larger.
+    """
+
+    def __init__(self, name, geometry, device_pixel_ratio=1.0, screen=None):
+        self.name = name
+        self.geometry = QRect(geometry)
+        self.device_pixel_ratio = device_pixel_ratio
+        self.screen = screen  # QScreen, when read from the running session
+
+    def native_rect(self, logical_rect):
+        """Native-pixel rect of a logical rect that lies on this screen"""
+        ratio = self.device_pixel_ratio
+        origin = self.geometry.topLeft()
+        return QRect(origin.x() + round((logical_rect.x() - origin.x()) * ratio),
+                     origin.y() + round((logical_rect.y() - origin.y()) * ratio),
+                     round(logical_rect.width() * ratio), round(logical_rect.height() * ratio))
+
+
+def screen_layout():
+    """ScreenInfo for every connected screen (GUI thread only)"""
+    if QGuiApplication.instance() is None:
+        raise RuntimeError("QGuiApplication has not been created")
+    return [ScreenInfo(screen.name(), screen.geometry(), screen.devicePixelRatio(), screen)
+            for screen in QGuiApplication.screens()]
+
+
+def stitch_screens(parts, rect, scale):
+    """Composite (logical rect, image) parts into one image of rect at scale pixels per logical pixel
+
+    Parts grabbed at a different pixel ratio are resampled; areas of rect
+    not covered by any screen stay black.
+    """
+    size = QSize(round(rect.width() * scale), round(rect.height() * scale))
+    if len(parts) == 1 and parts[0][0] == rect and parts[0][1].size() == size:
+        image = parts[0][1]
+    else:
+        image = QImage(size, QImage.Format.Format_RGB32)
+        painter = QPainter(image)
+        # Blacken only the gaps between screens; clearing the whole image costs as much as the stitch
+        gaps = QRegion(QRect(QPoint(0, 0), size))
+        targets = []
+        for logical, _ in parts:
+            target = QRect(round((logical.x() - rect.x()) * scale), round((logical.y() - rect.y()) * scale),
+                           round(logical.width() * scale), round(logical.height() * scale))
+            targets.append(target)
+            gaps = gaps.subtracted(QRegion(target))
+        if not gaps.isEmpty():
+            painter.setClipRegion(gaps)
+            painter.fillRect(gaps.boundingRect(), Qt.GlobalColor.black)
+            painter.setClipping(False)
+        for (_, part), target in zip(parts, targets):
+            part.setDevicePixelRatio(1.0)  # place by device pixels, not by the part's own ratio
+            if part.size() == target.size():
+                painter.drawImage(target.topLeft(), part)
+            else:
+                # Whole-number upscales are exact with pixel replication, which is far cheaper
+                factor = target.width() / max(1, part.width())
+                painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, factor != int(factor))
+                painter.drawImage(target, part)
+        painter.end()
+    image.setDevicePixelRatio(scale)
+    return image
+
+
+class _ScreenWorker:
+    """Thread that owns one screen's backend instance and grabs on request
+
+    Backends such as mss must be used from the thread that created them,
+    so each screen keeps its own thread and backend.
+    """
+
+    def __init__(self, index, backend_factory, results):
+        self._jobs = queue.Queue()
+        self._results = results
+        self._backend_factory = backend_factory
+        self._thread = threading.Thread(target=self._run, name=f"ScreenGrab-{index}", daemon=True)
+        self._thread.start()
+
+    def submit(self, index, native_rect):
+        self._jobs.put((index, native_rect))
+
+    def stop(self):
+        self._jobs.put(None)
+
+    def _run(self):
+        # A backend that cannot be created fails every job instead of leaving the grab waiting
+        try:
+            backend, backend_error = self._backend_factory(), None
+        except Exception as e:
+            backend, backend_error = None, e
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            index, native_rect = job
+            started = time.perf_counter()
+            try:
+                if backend_error is not None:
+                    raise backend_error
+                image, error = backend.grab(native_rect), None
+            except Exception as e:
+                image, error = None, e
+            self._results.put((index, image, error, time.perf_counter() - started))
+
+
+class VirtualDesktopBackend(CaptureBackend):
+    """Every screen grabbed concurrently and stitched into one virtual-desktop image
+
+    rect is in Qt's global logical coordinates; None covers the bounding
+    box of all screens. The result is at the highest device pixel ratio
+    among the grabbed screens and carries it as its devicePixelRatio.
+
+    screen_backend_factory creates a thread-safe backend (mss, pil, ...)
+    for each screen's worker thread, which is given native-pixel rects.
+    Without one, screens are grabbed one after another with
+    QScreen.grabWindow on the calling thread. last_timings holds the
+    per-screen, grab and stitch times of the latest grab.
+    """
+    name = "desktop"
+    gui_thread_only = True
+
+    def __init__(self, screen_backend_factory=None, layout=None, parallel=True):
+        self.screen_backend_factory = screen_backend_factory
+        self.layout = layout  # fixed list of ScreenInfo, or None to read the live screens
+        self.parallel = parallel
+        self.last_timings = {}
+        self._results = queue.Queue()
+        self._workers = []
+
+    def screens(self):
+        return self.layout if self.layout is not None else screen_layout()
+
+    def desktop_geometry(self):
+        bounds = QRect()
+        for info in self.screens():
+            bounds = bounds.united(info.geometry)
+        return bounds
+
+    def close(self):
+        for worker in self._workers:
+            worker.stop()
+        self._workers = []
+
+    def grab(self, rect=None):
+        screens = self.screens()
+        if rect is None:
+            rect = QRect()
+            for info in screens:
+                rect = rect.united(info.geometry)
+        jobs = []
+        for info in screens:
+            part = info.geometry.intersected(rect)
+            if not part.isEmpty():
+                jobs.append((info, part))
+        if not jobs:
+            raise RuntimeError(f"Region {rect} is not on any screen")
+
+        started = time.perf_counter()
+        if self.screen_backend_factory is None:
+            images, screen_seconds = self._grab_with_qt(jobs)
+        elif self.parallel:
+            images, screen_seconds = self._grab_parallel(jobs)
+        else:
+            images, screen_seconds = self._grab_sequential(jobs)
+        grabbed = time.perf_counter()
+        scale = max(info.device_pixel_ratio for info, _ in jobs)
+        image = stitch_screens([(part, images[i]) for i, (_, part) in enumerate(jobs)], rect, scale)
+        finished = time.perf_counter()
+        self.last_timings = {
+            "parallel": self.parallel and self.screen_backend_factory is not None,
+            "screens_ms": [seconds * 1000.0 for seconds in screen_seconds],
+            "grab_ms": (grabbed - started) * 1000.0,
+            "stitch_ms": (finished - grabbed) * 1000.0,
+            "total_ms": (finished - started) * 1000.0,
+        }
+        return image
+
+    def _grab_with_qt(self, jobs):
+        images, seconds = [], []
+        for info, part in jobs:
+            started = time.perf_counter()
+            screen = info.screen
+            if screen is None:
+                raise RuntimeError(f"Screen {info.name} has no QScreen to grab from")
+            # grabWindow(0, ...) takes coordinates relative to the screen
+            local = part.translated(-info.geometry.topLeft())
+            images.append(screen.grabWindow(0, local.x(), local.y(), local.width(), local.height()).toImage())
+            seconds.append(time.perf_counter() - started)
+        return images, seconds
+
+    def _grab_sequential(self, jobs):
+        if not hasattr(self, "_sequential_backend"):
+            self._sequential_backend = self.screen_backend_factory()
+        images, seconds = [], []
+        for info, part in jobs:
+            started = time.perf_counter()
+            images.append(self._sequential_backend.grab(info.native_rect(part)))
+            seconds.append(time.perf_counter() - started)
+        return images, seconds
+
+    def _grab_parallel(self, jobs):
+        while len(self._workers) < len(jobs):
+            self._workers.append(_ScreenWorker(len(self._workers), self.screen_backend_factory, self._results))
+        for index, (info, part) in enumerate(jobs):
+            self._workers[index].submit(index, info.native_rect(part))
+        images, seconds = [None] * len(jobs), [0.0] * len(jobs)
+        errors = []
+        for _ in jobs:
+            index, image, error, elapsed = self._results.get()
+            images[index], seconds[index] = image, elapsed
+            if error is not None:
+                errors.append(error)
+        if errors:
+            raise errors[0]
+        return images, seconds
+
+
+BACKENDS = {
+    "qt": QtCaptureBackend,
+    "pil": PilCaptureBackend,
+    "pyautogui": PyAutoGuiCaptureBackend,
+    "mss": MssCaptureBackend,
+    "synthetic": SyntheticCaptureBackend,
+}
+
+# Real screen backends considered by "auto", in order of preference on ties
+AUTO_CANDIDATES = ["mss", "qt", "pil", "pyautogui"]
+
+
+def time_backend(backend, rect=None, repeat=3):
+    """Return the grab latencies of backend in seconds"""
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        backend.grab(rect)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def fastest_backend(candidates=None, repeat=3):
+    """Benchmark the usable backends on a full grab; returns (fastest instance, its latency) or (None, None)"""
+    best, best_latency = None, None
+    for name in candidates or AUTO_CANDIDATES:
+        backend = BACKENDS[name]()
+        if not backend.probe():
+            continue
+        try:
+            latency = min(time_backend(backend, repeat=repeat))
+        except Exception as e:
+            log.debug("Capture backend '%s' failed benchmark: %s", name, e)
+            continue
+        log.debug("Capture backend '%s': %.1f ms per full grab", name, latency * 1000)
+        if best_latency is None or latency < best_latency:
+            best, best_latency = backend, latency
+    return best, best_latency
+
+
+def select_fastest_backend(candidates=None, repeat=3):
+    """Benchmark the usable backends on a full grab and return the fastest instance"""
+    return fastest_backend(candidates, repeat)[0]
+
+
+def create_backend(name="auto", all_screens=False, benchmarked=None):
+    """Create the configured backend; "auto" benchmarks and falls back to Qt
+
+    benchmarked is the (backend, latency) result of fastest_backend() over
+    the thread-safe AUTO_CANDIDATES, already run on another thread; then
+    only the GUI-thread backends are timed here. With all_screens, real
+    screen backends are wrapped in a VirtualDesktopBackend that grabs
+    every monitor.
+    """
+    if name == "auto":
+        if benchmarked is None:
+            backend = select_fastest_backend()
+        else:
+            gui_only = [candidate for candidate in AUTO_CANDIDATES if BACKENDS[candidate].gui_thread_only]
+            results = [result for result in (benchmarked, fastest_backend(gui_only)) if result[0] is not None]
+            backend = min(results, key=lambda result: result[1])[0] if results else None
+        if backend is None:
+            log.error("No capture backend passed the startup benchmark, using Qt.")
+            backend = QtCaptureBackend()
+        log.info("Selected capture backend: %s", backend.name)
+    elif name not in BACKENDS:
+        log.error("Unknown capture backend '%s', using Qt.", name)
+        backend = QtCaptureBackend()
+    else:
+        backend = BACKENDS[name]()
+    if not all_screens or backend.name == "synthetic":
+        return backend
+    # Qt grabs stay on the GUI thread; the others get one worker thread per screen
+    factory = None if backend.gui_thread_only else type(backend)
+    return VirtualDesktopBackend(factory)
+
+
+class LazyCaptureBackend(CaptureBackend):
+    """Defers create_backend() until the first grab or warm_up()
+
+    Resolving "auto" benchmarks every backend and imports mss/PIL, so the
+    app creates this at startup and warms it once the tray icon is up:
+    prepare() runs the benchmark of the thread-safe backends on a worker
+    thread, and resolve() then only times the Qt backend. Attributes of the
+    real backend (last_timings, screens(), ...) are forwarded. Resolve on
+    the GUI thread: the Qt backends need it.
+    """
+
+    def __init__(self, name="auto", all_screens=False):
+        self.requested = name
+        self.all_screens = all_screens
+        self.resolve_seconds = None
+        self._backend = None
+        self._benchmarked = None  # (backend, latency) from prepare()
+        self._prepare_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def prepare(self):
+        """Benchmark the thread-safe backends for "auto"; safe to call from any thread
+
+        A resolve() that comes in meanwhile waits for the benchmark instead
+        of running its own.
+        """
+        if self.requested != "auto":
+            return
+        with self._lock:
+            if self._backend is None and self._benchmarked is None:
+                started = time.perf_counter()
+                thread_safe = [name for name in AUTO_CANDIDATES if not BACKENDS[name].gui_thread_only]
+                self._benchmarked = fastest_backend(thread_safe)
+                self._prepare_seconds = time.perf_counter() - started
+
+    def resolve(self):
+        """The real backend, created on first use"""
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    started = time.perf_counter()
+                    self._backend = create_backend(self.requested, all_screens=self.all_screens,
+                                                   benchmarked=self._benchmarked)
+                    self.resolve_seconds = self._prepare_seconds + time.perf_counter() - started
+                    log.debug("Capture backend ready in %.1f ms.", self.resolve_seconds * 1000)
+        return self._backend
+
+    def is_resolved(self):
+        return self._backend is not None
+
+    def warm_up(self):
+        """Create the backend and take a 1x1 grab on every screen so per-screen workers are running"""
+        backend = self.resolve()
+        if isinstance(backend, VirtualDesktopBackend):
+            origins = [info.geometry.topLeft() for info in backend.screens()]
+        else:
+            origins = [QPoint(0, 0)]
+        try:
+            for origin in origins:
+                backend.grab(QRect(origin, QSize(1, 1)))
+        except Exception as e:
+            log.debug("Capture backend warm-up grab failed: %s", e)
+        return backend
+
+    @property
+    def name(self):
+        return self.resolve().name
+
+    @property
+    def gui_thread_only(self):
+        return self.resolve().gui_thread_only
+
+    def grab(self, rect=None):
+        return self.resolve().grab(rect)
+
+    def desktop_geometry(self):
+        return self.resolve().desktop_geometry()
+
+    def close(self):
+        if self._backend is not None:
+            self._backend.close()
+
+    def __getattr__(self, attribute):
+        # Only reached for attributes this proxy does not define
+        if attribute.startswith("_"):
+            raise AttributeError(attribute)
+        return getattr(self.resolve(), attribute)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Thin client for the running Screenshot Service's local capture API
+
+Uses only the standard library so a scripted capture does not pay for
+loading Qt, Pillow or pyautogui. Normally invoked through
+screenshot_app.py:
+
+    python screenshot_app.py --capture full
+    python screenshot_app.py --capture region 100,100,640,480 --out shot.png
+    python screenshot_app.py --capture full --bytes > shot.png
+    python screenshot_app.py --metrics
+    python screenshot_app.py --log 50
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+
+SERVER_NAME = "ScreenshotServiceCapture"
+
+
+def server_address(name=SERVER_NAME):
+    """Where QLocalServer listens for name on this platform"""
+    if sys.platform == "win32":
+        return rf"\\.\pipe\{name}"
+    return os.path.join(tempfile.gettempdir(), name)
+
+
+class _PipeConnection:
+    """Windows named pipe with the small socket-like surface the client uses"""
+
+    def __init__(self, path):
+        self._pipe = open(path, "r+b", buffering=0)
+
+    def sendall(self, data):
+        self._pipe.write(data)
+
+    def recv(self, size):
+        return self._pipe.read(size)
+
+    def close(self):
+        self._pipe.close()
+
+
+def connect(name=SERVER_NAME, timeout=10.0):
+    address = server_address(name)
+    if sys.platform == "win32":
+        return _PipeConnection(address)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    sock.connect(address)
+    return sock
+
+
+class CaptureClient:
+    """Sends newline-delimited JSON requests and reads the replies"""
+
+    def __init__(self, name=SERVER_NAME, timeout=10.0):
+        self._conn = connect(name, timeout)
+        self._buffer = b""
+        self._next_id = 0
+
+    def close(self):
+        self._conn.close()
+
+    def _read_exactly(self, size):
+        while len(self._buffer) < size:
+            chunk = self._conn.recv(max(65536, size - len(self._buffer)))
+            if not chunk:
+                raise ConnectionError("Screenshot Service closed the connection")
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def _read_line(self):
+        while b"\n" not in self._buffer:
+            chunk = self._conn.recv(65536)
+            if not chunk:
+                raise ConnectionError("Screenshot Service closed the connection")
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return json.loads(line)
+
+    def capture(self, mode="full", rect=None, out=None, want_bytes=False):
+        """Request one capture; returns (reply dict, image bytes or None)"""
+        self._next_id += 1
+        request = {"id": self._next_id, "capture": mode, "return": "bytes" if want_bytes else "path"}
+        if rect is not None:
+            request["rect"] = list(rect)
+        if out is not None:
+            request["out"] = os.path.abspath(out)
+        self._conn.sendall(json.dumps(request).encode() + b"\n")
+        reply = self._read_line()
+        data = None
+        if reply.get("ok") and reply.get("length"):
+            data = self._read_exactly(reply["length"])
+        return reply, data
+
+    def telemetry(self, kind, lines=None):
+        """Fetch "metrics" or "log" text; returns (reply dict, text or None)"""
+        self._next_id += 1
+        request = {"id": self._next_id, "telemetry": kind}
+        if lines is not None:
+            request["lines"] = lines
+        self._conn.sendall(json.dumps(request).encode() + b"\n")
+        reply = self._read_line()
+        text = None
+        if reply.get("ok"):
+            text = self._read_exactly(reply["length"]).decode("utf-8") if reply.get("length") else ""
+        return reply, text
+
+
+def parse_rect(value):
+    """x,y,w,h as four ints, or None if malformed"""
+    try:
+        parts = [int(part) for part in value.split(",")]
+    except ValueError:
+        return None
+    if len(parts) != 4 or parts[2] <= 0 or parts[3] <= 0:
+        return None
+    return parts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="screenshot_app.py", description="Capture through the running Screenshot Service")
+    parser.add_argument("--capture", nargs="+", metavar="MODE",
+                        help="'full' or 'region x,y,w,h'")
+    parser.add_argument("--metrics", action="store_true", help="print the service's metrics")
+    parser.add_argument("--log", nargs="?", type=int, const=100, metavar="LINES",
+                        help="print the last lines of the service's log (default 100)")
+    parser.add_argument("--out", help="write the screenshot to this path (format from the extension)")
+    parser.add_argument("--bytes", action="store_true", help="write the encoded image to stdout")
+    parser.add_argument("--retries", type=int, default=20, help="retries while the service reports busy")
+    args = parser.parse_args(argv)
+    if args.metrics or args.log is not None:
+        return print_telemetry("metrics" if args.metrics else "log", args.log)
+    if not args.capture:
+        parser.error("one of --capture, --metrics or --log is required")
+
+    mode, rect = args.capture[0], None
+    if mode == "region":
+        if len(args.capture) != 2:
+            parser.error("--capture region needs x,y,w,h")
+        rect = parse_rect(args.capture[1])
+        if rect is None:
+            parser.error("region must be x,y,width,height with a positive size")
+    elif mode != "full" or len(args.capture) != 1:
+        parser.error("--capture must be 'full' or 'region x,y,w,h'")
+
+    try:
+        client = CaptureClient()
+    except OSError as e:
+        print(f"Screenshot Service is not running ({e})", file=sys.stderr)
+        return 2
+    try:
+        delay = 0.01
+        for _ in range(args.retries + 1):
+            reply, data = client.capture(mode, rect, args.out, args.bytes)
+            if reply.get("error") != "busy":
+                break
+            time.sleep(reply.get("retry_after_ms", delay * 1000) / 1000.0)
+            delay = min(delay * 2, 0.5)
+    finally:
+        client.close()
+    if not reply.get("ok"):
+        print(f"Capture failed: {reply.get('error')}", file=sys.stderr)
+        return 1
+    if args.bytes:
+        sys.stdout.buffer.write(data or b"")
+        sys.stdout.buffer.flush()
+    else:
+        print(reply["path"])
+    return 0
+
+
+def print_telemetry(kind, lines=None):
+    try:
+        client = CaptureClient()
+    except OSError as e:
+        print(f"Screenshot Service is not running ({e})", file=sys.stderr)
+        return 2
+    try:
+        reply, text = client.telemetry(kind, lines)
+    finally:
+        client.close()
+    if not reply.get("ok"):
+        print(f"Request failed: {reply.get('error')}", file=sys.stderr)
+        return 1
+    sys.stdout.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
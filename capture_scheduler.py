@@ -0,0 +1,85 @@
+import logging
+import time
+from collections import deque
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+log = logging.getLogger(__name__)
+
+# Actions a hotkey can be bound to
+ACTIONS = ("dialog", "full", "region", "repeat_region", "burst", "record")
+
+
+class CaptureScheduler(QObject):
+    """Serialises hotkey triggers into one capture at a time
+
+    trigger() may be called from any thread (the keyboard hook runs on its
+    own); triggers are handled on the GUI thread and never block it. A
+    trigger repeating the same action within debounce_ms is dropped as key
+    repeat. While a capture is in flight, a trigger for the action in
+    flight or one already queued is merged into it, and at most max_queue
+    other actions wait; the rest are dropped. Actions in immediate_actions
+    (burst and recording start/stop) skip the queue. The app calls capture_finished()
+    when a dispatched capture is over; the next queued one is dispatched on
+    the following event-loop turn, after the finished capture's handlers
+    have returned.
+    """
+    dispatch = pyqtSignal(str, float)  # action, time.perf_counter() of the trigger
+    _triggered = pyqtSignal(str, float)
+
+    def __init__(self, debounce_ms=250, max_queue=2, immediate_actions=("burst", "record"), parent=None):
+        super().__init__(parent)
+        self.debounce = debounce_ms / 1000.0
+        self.max_queue = max_queue
+        self.immediate_actions = set(immediate_actions)
+        self.in_flight = None
+        self._queue = deque()  # (action, triggered_at)
+        self._last_trigger = {}  # action -> triggered_at of the last trigger, repeats included
+        self.counters = {"accepted": 0, "debounced": 0, "coalesced": 0, "dropped": 0}
+        self._triggered.connect(self._on_triggered)
+
+    def trigger(self, action, triggered_at=None):
+        """Request action; safe to call from any thread"""
+        self._triggered.emit(action, triggered_at if triggered_at is not None else time.perf_counter())
+
+    def queued(self):
+        return [action for action, _ in self._queue]
+
+    def capture_finished(self):
+        """The dispatched capture is over; start the next queued one"""
+        self.in_flight = None
+        if self._queue:
+            action, triggered_at = self._queue.popleft()
+            self._start(action, triggered_at, deferred=True)
+
+    def _on_triggered(self, action, triggered_at):
+        last = self._last_trigger.get(action)
+        self._last_trigger[action] = triggered_at
+        if last is not None and triggered_at - last < self.debounce:
+            # Held keys auto-repeat; measuring from the latest repeat keeps a held key debounced
+            self.counters["debounced"] += 1
+            return
+        if action in self.immediate_actions:
+            self.counters["accepted"] += 1
+            self.dispatch.emit(action, triggered_at)
+            return
+        if self.in_flight is None:
+            self._start(action, triggered_at)
+            return
+        if action == self.in_flight or action in self.queued():
+            self.counters["coalesced"] += 1
+            log.debug("Hotkey '%s' merged into the pending capture.", action)
+            return
+        if len(self._queue) >= self.max_queue:
+            self.counters["dropped"] += 1
+            log.debug("Hotkey '%s' dropped, %s captures already queued.", action, len(self._queue))
+            return
+        self._queue.append((action, triggered_at))
+
+    def _start(self, action, triggered_at, deferred=False):
+        self.in_flight = action
+        self.counters["accepted"] += 1
+        if deferred:
+            QTimer.singleShot(0, lambda: self.dispatch.emit(action, triggered_at))
+        else:
+            self.dispatch.emit(action, triggered_at)
@@ -0,0 +1,219 @@
+import json
+import logging
+import os
+import time
+from collections import deque
+
+from PyQt6.QtCore import QObject, QRect, QTimer, pyqtSignal
+from PyQt6.QtNetwork import QLocalServer
+
+from capture_client import SERVER_NAME
+from save_pipeline import capture_timestamp
+from telemetry import metrics, recent_log
+
+log = logging.getLogger(__name__)
+
+
+class CaptureServer(QObject):
+    """Local-socket API that lets scripts trigger captures in the running instance
+
+    Requests are newline-delimited JSON objects:
+        {"id": 1, "capture": "full" | "region", "rect": [x, y, w, h],
+         "out": "/abs/path.png", "return": "path" | "bytes"}
+    Each gets one JSON reply line {"id", "ok", "path", "width", "height"}
+    followed, for "return": "bytes", by "length" raw bytes of the file.
+
+    Grabs run one at a time on the GUI thread; encoding and writing go
+    through the shared SavePipeline. Once max_pending requests are queued or
+    being written, new ones are answered with {"error": "busy"} straight away.
+    A request whose "out" is still being written by an earlier one is
+    refused, and a connection that sends a line longer than max_line_bytes
+    is answered with an error and closed.
+
+    {"id": 1, "telemetry": "metrics" | "log", "lines": 100} is answered at
+    once with the metrics in the Prometheus text format or the last lines
+    of the log, as "length" bytes after the reply line.
+    """
+    _written = pyqtSignal(int, str, int)  # ticket, filepath, bytes written (from save workers)
+
+    def __init__(self, screenshot_capture, max_pending=32, name=SERVER_NAME, max_line_bytes=65536, parent=None):
+        super().__init__(parent)
+        self.screenshot_capture = screenshot_capture
+        self.max_pending = max_pending
+        self.max_line_bytes = max_line_bytes
+        self.name = name
+        self._server = QLocalServer(self)
+        self._server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        self._server.newConnection.connect(self._on_new_connection)
+        self._buffers = {}  # socket -> bytearray of unparsed input
+        self._queue = deque()  # (socket, request) waiting to be grabbed
+        self._in_flight = {}  # ticket -> (socket, request, filepath, width, height)
+        self._next_ticket = 0
+        self._scheduled = False
+        self._written.connect(self._on_written)
+        screenshot_capture.save_pipeline.save_failed.connect(self._on_save_failed)
+
+    def start(self):
+        QLocalServer.removeServer(self.name)  # stale socket left by a crash
+        if not self._server.listen(self.name):
+            log.error("Capture API could not listen on %s: %s", self.name, self._server.errorString())
+            return False
+        log.info("Capture API listening on %s", self._server.fullServerName())
+        return True
+
+    def close(self):
+        self._server.close()
+
+    def pending(self):
+        return len(self._queue) + len(self._in_flight)
+
+    def _on_new_connection(self):
+        while self._server.hasPendingConnections():
+            sock = self._server.nextPendingConnection()
+            self._buffers[sock] = bytearray()
+            sock.readyRead.connect(lambda sock=sock: self._on_ready_read(sock))
+            sock.disconnected.connect(lambda sock=sock: self._on_disconnected(sock))
+
+    def _on_disconnected(self, sock):
+        self._buffers.pop(sock, None)
+        sock.deleteLater()
+
+    def _on_ready_read(self, sock):
+        buffer = self._buffers.get(sock)
+        if buffer is None:
+            return
+        buffer.extend(bytes(sock.readAll()))
+        while True:
+            index = buffer.find(b"\n")
+            if index < 0 and len(buffer) <= self.max_line_bytes:
+                break
+            if index < 0 or index > self.max_line_bytes:
+                self._drop_connection(sock, f"request longer than {self.max_line_bytes} bytes")
+                return
+            line = bytes(buffer[:index])
+            del buffer[:index + 1]
+            try:
+                request = json.loads(line)
+            except ValueError:
+                self._reply(sock, {"ok": False, "error": "invalid JSON"})
+                continue
+            if not isinstance(request, dict):
+                self._reply(sock, {"ok": False, "error": "request must be a JSON object"})
+                continue
+            if "telemetry" in request:
+                self._reply_telemetry(sock, request)
+                continue
+            if self.pending() >= self.max_pending:
+                self._reply(sock, {"id": request.get("id"), "ok": False, "error": "busy", "retry_after_ms": 20})
+                continue
+            self._queue.append((sock, request))
+        self._schedule()
+
+    def _drop_connection(self, sock, error):
+        log.warning("Capture API closing a connection: %s", error)
+        self._buffers.pop(sock, None)
+        self._reply(sock, {"ok": False, "error": error})
+        # Pending replies are written before the connection closes
+        sock.disconnectFromServer()
+
+    def _reply_telemetry(self, sock, request):
+        kind = request["telemetry"]
+        if kind == "metrics":
+            if not metrics.enabled:
+                self._reply(sock, {"id": request.get("id"), "ok": False, "error": "metrics are off"})
+                return
+            text = metrics.render()
+        elif kind == "log":
+            lines = request.get("lines")
+            if lines is not None and (isinstance(lines, bool) or not isinstance(lines, int) or lines < 0):
+                self._reply(sock, {"id": request.get("id"), "ok": False,
+                                   "error": "lines must be a non-negative integer"})
+                return
+            text = "".join(line + "\n" for line in recent_log(lines))
+        else:
+            self._reply(sock, {"id": request.get("id"), "ok": False, "error": f"unknown telemetry '{kind}'"})
+            return
+        data = text.encode("utf-8")
+        self._reply(sock, {"id": request.get("id"), "ok": True, "length": len(data)}, data)
+
+    def _schedule(self):
+        if self._queue and not self._scheduled:
+            self._scheduled = True
+            # One grab per event-loop turn keeps the tray and overlay responsive
+            QTimer.singleShot(0, self._process_next)
+
+    def _process_next(self):
+        self._scheduled = False
+        if not self._queue:
+            return
+        sock, request = self._queue.popleft()
+        if sock in self._buffers:
+            try:
+                self._handle(sock, request)
+            except Exception as e:
+                log.error("Capture API request failed: %s", e)
+                self._reply(sock, {"id": request.get("id"), "ok": False, "error": str(e)})
+        self._schedule()
+
+    def _handle(self, sock, request):
+        capture = self.screenshot_capture
+        mode = request.get("capture", "full")
+        rect = None
+        if mode == "region":
+            x, y, width, height = (int(v) for v in request["rect"])
+            rect = QRect(x, y, width, height)
+        elif mode != "full":
+            raise ValueError(f"unknown capture mode '{mode}'")
+        out = request.get("out")
+        if out:
+            out = os.path.abspath(out)
+            # Both would write out + ".part" and the failure of one would be reported to both
+            if any(path == out for _, _, path, _, _ in self._in_flight.values()):
+                raise ValueError(f"{out} is still being written by an earlier request")
+        captured_at = time.time()
+        with metrics.span("grab", mode="api"):
+            image = capture.backend.grab(rect)
+        if out:
+            filepath, encoder, catalog_mode = out, None, None
+        else:
+            prefix = "full_screenshot" if mode == "full" else "cropped_screenshot"
+            timestamp = capture_timestamp()
+            encoder = capture.encoder
+            filepath = os.path.join(capture.screenshot_dir, f"{prefix}_{timestamp}.{encoder.extension}")
+            catalog_mode = "full" if mode == "full" else "cropped"
+        ticket = self._next_ticket
+        self._next_ticket += 1
+        catalog_write = None
+        if catalog_mode is not None:
+            crop_rect = (rect.x(), rect.y(), rect.width(), rect.height()) if rect is not None else None
+            catalog_write = capture.write_callback(catalog_mode, image, captured_at, crop_rect)
+        def on_written(path, nbytes, seconds):
+            if catalog_write is not None:
+                catalog_write(path, nbytes, seconds)
+            self._written.emit(ticket, path, nbytes)
+        self._in_flight[ticket] = (sock, request, filepath, image.width(), image.height())
+        if not capture.save_pipeline.submit(image, filepath, block=False, on_written=on_written, encoder=encoder):
+            del self._in_flight[ticket]
+            self._reply(sock, {"id": request.get("id"), "ok": False, "error": "busy", "retry_after_ms": 50})
+
+    def _on_written(self, ticket, filepath, nbytes):
+        sock, request, _, width, height = self._in_flight.pop(ticket)
+        if sock not in self._buffers:
+            return
+        reply = {"id": request.get("id"), "ok": True, "path": filepath, "width": width, "height": height}
+        data = b""
+        if request.get("return") == "bytes":
+            with open(filepath, "rb") as f:
+                data = f.read()
+            reply["length"] = len(data)
+        self._reply(sock, reply, data)
+
+    def _on_save_failed(self, filepath, error):
+        for ticket, (sock, request, path, _, _) in list(self._in_flight.items()):
+            if path == filepath:
+                del self._in_flight[ticket]
+                if sock in self._buffers:
+                    self._reply(sock, {"id": request.get("id"), "ok": False, "error": error})
+
+    def _reply(self, sock, reply, data=b""):
+        sock.write(json.dumps(reply).encode() + b"\n" + data)
@@ -0,0 +1,58 @@
+import threading
+import time
+
+from telemetry import metrics
+
+
+class CaptureTimeline:
+    """Timestamps of the stages of one capture, from hotkey to saved file
+
+    Stages are marked in order as they happen (hotkey, dialog, choice,
+    hidden, grabbed, clipboard, saved); "saved" is marked from a save
+    worker thread, so marks are locked. Each mark may carry a note, e.g.
+    why the hidden stage ended. The timeline is complete once every stage
+    in complete_on has been marked, in whichever order they arrive; its
+    total goes into the capture_latency_seconds metric.
+    """
+
+    def __init__(self, mode=None, started_at=None, complete_on=("clipboard", "saved")):
+        self.mode = mode
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.complete_on = set(complete_on)
+        self._lock = threading.Lock()
+        self._marks = []  # (stage, perf_counter time, note)
+        self._complete = False
+
+    def mark(self, stage, note=None, at=None):
+        """Record stage; returns True for the mark that completes the timeline"""
+        with self._lock:
+            self._marks.append((stage, at if at is not None else time.perf_counter(), note))
+            if self._complete or not self.complete_on <= {name for name, _, _ in self._marks}:
+                return False
+            self._complete = True
+            metrics.observe("capture_latency_seconds", self._marks[-1][1] - self.started_at, mode=self.mode or "unknown")
+            return True
+
+    def elapsed_ms(self, stage):
+        """Milliseconds from the start to the first mark of stage, or None"""
+        with self._lock:
+            for name, at, _ in self._marks:
+                if name == stage:
+                    return (at - self.started_at) * 1000.0
+        return None
+
+    def as_dict(self):
+        """Stage -> milliseconds since the start"""
+        with self._lock:
+            return {stage: (at - self.started_at) * 1000.0 for stage, at, _ in self._marks}
+
+    def summary(self):
+        with self._lock:
+            marks = sorted(self._marks, key=lambda mark: mark[1])
+        parts = []
+        for stage, at, note in marks:
+            part = f"{stage} +{(at - self.started_at) * 1000.0:.1f}"
+            if note:
+                part += f" ({note})"
+            parts.append(part)
+        return f"Capture timeline ({self.mode or 'unknown'}): " + " | ".join(parts) + " ms"
@@ -0,0 +1,69 @@
+import logging
+import os
+
+from PyQt6.QtCore import QBuffer, QByteArray, QIODevice, QMimeData, QUrl
+from PyQt6.QtGui import QImageWriter
+
+from telemetry import metrics
+
+log = logging.getLogger(__name__)
+
+IMAGE_MIME_TYPE = "application/x-qt-image"
+
+
+class DeferredImageMimeData(QMimeData):
+    """Clipboard data for a capture that is only converted when a paste asks for it
+
+    Setting a QImage on the clipboard converts it up front; this advertises
+    the image formats and produces one only when it is requested, caching
+    the bytes for later pastes. The platform's own bitmap formats are built
+    from the QImage returned for application/x-qt-image at paste time. When
+    the capture has already been written as a PNG, image/png is served from
+    that file.
+    """
+
+    def __init__(self, image, filepath=None):
+        super().__init__()
+        self.image = image
+        self.filepath = filepath
+        self.encodes = 0  # formats encoded so far, for tests and the log
+        self._cache = {}
+
+    def formats(self):
+        return [IMAGE_MIME_TYPE, "image/png"]
+
+    def hasFormat(self, mime_type):
+        return mime_type in self.formats()
+
+    def retrieveData(self, mime_type, preferred_type):
+        if mime_type == IMAGE_MIME_TYPE:
+            return self.image
+        if mime_type != "image/png":
+            return None
+        if mime_type not in self._cache:
+            self._cache[mime_type] = self._png_bytes()
+        return self._cache[mime_type]
+
+    def _png_bytes(self):
+        if self.filepath and self.filepath.lower().endswith(".png") and not self.filepath.endswith(".delta.png"):
+            try:
+                with open(self.filepath, "rb") as f:
+                    return QByteArray(f.read())
+            except OSError:
+                pass  # not written yet
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+        with metrics.span("clipboard_encode"):
+            QImageWriter(buffer, b"png").write(self.image)
+        self.encodes += 1
+        log.debug("Clipboard image encoded as PNG on paste (%s bytes).", data.size())
+        return data
+
+
+def path_mime_data(filepath):
+    """Clipboard data holding just the capture's file, as a path and a file URL"""
+    data = QMimeData()
+    data.setText(filepath)
+    data.setUrls([QUrl.fromLocalFile(os.path.abspath(filepath))])
+    return data
@@ -0,0 +1,229 @@
+import importlib
+import importlib.util
+import io
+import logging
+import struct
+import zlib
+
+# numpy is imported where it is used so the app starts without loading it
+from PyQt6.QtCore import QBuffer, QByteArray, QIODevice
+from PyQt6.QtGui import QImage, QImageWriter
+
+log = logging.getLogger(__name__)
+
+PNG_FILTERS = {"none": 0, "sub": 1, "up": 2, "average": 3, "paeth": 4}
+
+
+def qimage_to_rgb_array(image, alpha=False):
+    """Copy a QImage into a (height, width, 3 or 4) uint8 RGB(A) array"""
+    import numpy as np
+    fmt = QImage.Format.Format_RGBA8888 if alpha else QImage.Format.Format_RGB888
+    channels = 4 if alpha else 3
+    if image.format() != fmt:
+        image = image.convertToFormat(fmt)
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    rows = np.frombuffer(bits, dtype=np.uint8).reshape(image.height(), image.bytesPerLine())
+    return rows[:, :image.width() * channels].reshape(image.height(), image.width(), channels).copy()
+
+
+def rgb_array_to_qimage(array):
+    """Copy a (height, width, 3 or 4) uint8 array into a new QImage"""
+    import numpy as np
+    array = np.ascontiguousarray(array, dtype=np.uint8)
+    height, width, channels = array.shape
+    fmt = QImage.Format.Format_RGBA8888 if channels == 4 else QImage.Format.Format_RGB888
+    return QImage(array.data, width, height, width * channels, fmt).copy()
+
+
+class ImageEncoder:
+    """Turns a QImage into encoded file bytes
+
+    extension is the file suffix (without the dot) screenshots written with
+    this encoder get. supports_alpha tells callers whether transparency
+    survives the encode. preload lists the modules encode() imports on
+    first use, which warm_up() loads ahead of the first capture.
+    """
+    name = None
+    extension = None
+    supports_alpha = True
+    preload = ()
+
+    def encode(self, image):
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Import the modules encode() needs; safe to call from any thread"""
+        for module in self.preload:
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                pass
+
+    def describe(self):
+        return self.name
+
+
+class QtEncoder(ImageEncoder):
+    """Encode with QImageWriter (libpng / libjpeg / the Qt WebP plugin)"""
+
+    def __init__(self, fmt, extension, quality=-1, name=None, supports_alpha=True):
+        self.fmt = fmt
+        self.extension = extension
+        self.quality = quality
+        self.name = name or fmt
+        self.supports_alpha = supports_alpha
+
+    def encode(self, image):
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+        writer = QImageWriter(buffer, self.fmt.encode())
+        writer.setQuality(self.quality)
+        if not writer.write(image):
+            raise OSError(f"Qt could not encode {self.fmt}: {writer.errorString()}")
+        return bytes(data)
+
+    def describe(self):
+        return self.name if self.quality < 0 else f"{self.name} q={self.quality}"
+
+
+class PngEncoder(ImageEncoder):
+    """PNG with an explicit zlib level and a single scanline filter for every row
+
+    NumPy applies the filter to the whole frame at once; with level 1 and the
+    "up" or "none" filter this is much faster than libpng's adaptive
+    filtering at the cost of somewhat larger files.
+    """
+    name = "png"
+    extension = "png"
+    preload = ("numpy",)
+
+    def __init__(self, level=6, filter="up"):
+        if filter not in PNG_FILTERS:
+            raise ValueError(f"Unknown PNG filter '{filter}', expected one of {sorted(PNG_FILTERS)}")
+        self.level = level
+        self.filter = filter
+
+    def encode(self, image):
+        alpha = image.hasAlphaChannel()
+        pixels = qimage_to_rgb_array(image, alpha=alpha)
+        height, width, _ = pixels.shape
+        header = struct.pack(">IIBBBBB", width, height, 8, 6 if alpha else 2, 0, 0, 0)
+        return b"".join([
+            b"\x89PNG\r\n\x1a\n",
+            png_chunk(b"IHDR", header),
+            png_chunk(b"IDAT", self.compress(pixels)),
+            png_chunk(b"IEND", b""),
+        ])
+
+    def compress(self, pixels):
+        """Filtered, zlib-compressed scanlines of a (height, width, channels) array: the IDAT payload"""
+        import numpy as np
+        height, width, channels = pixels.shape
+        filtered = self._filter_rows(pixels.reshape(height, width * channels), channels)
+        rows = np.empty((height, width * channels + 1), dtype=np.uint8)
+        rows[:, 0] = PNG_FILTERS[self.filter]
+        rows[:, 1:] = filtered
+        return zlib.compress(rows.tobytes(), self.level)
+
+    def _filter_rows(self, raw, bpp):
+        import numpy as np
+        if self.filter == "none":
+            return raw
+        raw16 = raw.astype(np.int16)
+        left = np.zeros_like(raw16)
+        left[:, bpp:] = raw16[:, :-bpp]
+        up = np.zeros_like(raw16)
+        up[1:] = raw16[:-1]
+        if self.filter == "sub":
+            predictor = left
+        elif self.filter == "up":
+            predictor = up
+        elif self.filter == "average":
+            predictor = (left + up) // 2
+        else:
+            upper_left = np.zeros_like(raw16)
+            upper_left[1:, bpp:] = raw16[:-1, :-bpp]
+            estimate = left + up - upper_left
+            distance_left = np.abs(estimate - left)
+            distance_up = np.abs(estimate - up)
+            distance_upper_left = np.abs(estimate - upper_left)
+            predictor = np.where((distance_left <= distance_up) & (distance_left <= distance_upper_left), left,
+                                 np.where(distance_up <= distance_upper_left, up, upper_left))
+        return ((raw16 - predictor) & 0xFF).astype(np.uint8)
+
+    def describe(self):
+        return f"png level={self.level} filter={self.filter}"
+
+
+def png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+class PillowEncoder(ImageEncoder):
+    """Encode through Pillow (WebP, and PNG with adaptive filtering at a chosen level)"""
+    preload = ("numpy", "PIL.Image")
+
+    def __init__(self, fmt, extension, name=None, **options):
+        self.fmt = fmt
+        self.extension = extension
+        self.name = name or fmt.lower()
+        self.options = options
+
+    def encode(self, image):
+        from PIL import Image
+        alpha = image.hasAlphaChannel()
+        pixels = qimage_to_rgb_array(image, alpha=alpha)
+        output = io.BytesIO()
+        Image.fromarray(pixels, "RGBA" if alpha else "RGB").save(output, format=self.fmt, **self.options)
+        return output.getvalue()
+
+    def describe(self):
+        options = " ".join(f"{key}={value}" for key, value in sorted(self.options.items()))
+        return f"{self.name} {options}".strip()
+
+
+class QoiEncoder(ImageEncoder):
+    """The Quite OK Image format via the optional qoi package: lossless and very fast"""
+    name = "qoi"
+    extension = "qoi"
+    preload = ("numpy", "qoi")
+
+    def encode(self, image):
+        try:
+            import qoi
+        except ImportError:
+            raise RuntimeError("The qoi encoder needs the optional 'qoi' package: pip install qoi")
+        return qoi.encode(qimage_to_rgb_array(image, alpha=image.hasAlphaChannel()))
+
+
+def create_encoder(settings):
+    """Build the encoder described by the encoder / *_quality / png_* settings"""
+    name = settings.get("encoder", "png")
+    if name == "png":
+        level = settings.get("png_level")
+        png_filter = settings.get("png_filter", "adaptive")
+        if png_filter == "adaptive":
+            if level is None:
+                return QtEncoder("png", "png", name="png")
+            return PillowEncoder("PNG", "png", name="png", compress_level=int(level))
+        return PngEncoder(level=6 if level is None else int(level), filter=png_filter)
+    if name == "webp":
+        if settings.get("webp_lossless", True):
+            return PillowEncoder("WEBP", "webp", name="webp", lossless=True,
+                                 method=int(settings.get("webp_method", 0)))
+        return PillowEncoder("WEBP", "webp", name="webp", lossless=False,
+                             quality=int(settings.get("webp_quality", 80)),
+                             method=int(settings.get("webp_method", 0)))
+    if name == "jpeg":
+        return QtEncoder("jpeg", "jpg", quality=int(settings.get("jpeg_quality", 90)), name="jpeg",
+                         supports_alpha=False)
+    if name == "qoi":
+        # Looked up without importing, so choosing the encoder does not load numpy
+        if importlib.util.find_spec("qoi") is not None:
+            return QoiEncoder()
+        log.warning("The qoi encoder needs the optional 'qoi' package (pip install qoi), using PNG.")
+        return QtEncoder("png", "png", name="png")
+    log.error("Unknown encoder '%s', using PNG.", name)
+    return QtEncoder("png", "png", name="png")
@@ -0,0 +1,252 @@
+import os
+import threading
+import time
+
+# numpy is imported where it is used so the app starts without it when dedup is off
+from PyQt6.QtGui import QImage, QPainter
+
+# Seed for the fixed odd multipliers of the tile hash, one per pixel position in a tile
+_WEIGHT_SEED = 0x5C2EE5
+
+
+def qimage_to_array(image):
+    """View a 32-bit QImage as a (height, width) uint32 array without copying
+
+    The returned array is only valid while image is alive and unmodified.
+    """
+    import numpy as np
+    if image.format() not in (QImage.Format.Format_RGB32, QImage.Format.Format_ARGB32):
+        image = image.convertToFormat(QImage.Format.Format_RGB32)
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    rows = np.frombuffer(bits, dtype=np.uint32).reshape(image.height(), image.bytesPerLine() // 4)
+    return rows[:, :image.width()], image
+
+
+def array_to_qimage(array):
+    """Copy a (height, width) uint32 ARGB array into a new QImage"""
+    import numpy as np
+    array = np.ascontiguousarray(array, dtype=np.uint32)
+    height, width = array.shape
+    image = QImage(array.data, width, height, width * 4, QImage.Format.Format_ARGB32)
+    return image.copy()
+
+
+class TileHasher:
+    """Vectorized 64-bit hashes of fixed-size tiles over a frame's raw pixel buffer"""
+
+    def __init__(self, tile_size=64):
+        import numpy as np
+        self.tile_size = tile_size
+        rng = np.random.default_rng(_WEIGHT_SEED)
+        weights = rng.integers(1, 2 ** 63, size=tile_size * tile_size, dtype=np.uint64)
+        self._weights = (weights | np.uint64(1)).reshape(tile_size, tile_size)
+
+    def grid_shape(self, width, height):
+        return (-(-height // self.tile_size), -(-width // self.tile_size))
+
+    def hash_image(self, image):
+        """Return a (tiles_y, tiles_x) uint64 array of tile hashes"""
+        import numpy as np
+        pixels, _keepalive = qimage_to_array(image)
+        tile = self.tile_size
+        height, width = pixels.shape
+        tiles_y, tiles_x = self.grid_shape(width, height)
+        if height % tile or width % tile:
+            padded = np.zeros((tiles_y * tile, tiles_x * tile), dtype=np.uint32)
+            padded[:height, :width] = pixels
+            pixels = padded
+        # (tiles_y, tile, tiles_x, tile) -> weighted sum over each tile, wrapping mod 2**64
+        # einsum promotes to uint64 per element, so no widened copy of the frame is made
+        blocks = pixels.reshape(tiles_y, tile, tiles_x, tile)
+        return np.einsum("aybx,yx->ab", blocks, self._weights)
+
+
+class DedupResult:
+    """What the dedup stage decided for one frame"""
+    def __init__(self, action, changed_fraction, changed_tiles=None, keyframe=None, duplicate_of=None,
+                 hashes=None, filepath=None, new_keyframe=False):
+        self.action = action  # "skip", "full" or "delta"
+        self.changed_fraction = changed_fraction
+        self.changed_tiles = changed_tiles  # bool (tiles_y, tiles_x) mask for "delta"
+        self.keyframe = keyframe  # filepath of the keyframe a delta applies to
+        self.duplicate_of = duplicate_of  # filepath of the frame a skipped frame matches
+        self.hashes = hashes  # tile hashes the frame becomes the reference with once committed
+        self.filepath = filepath  # file the frame is written to (the delta name for "delta")
+        self.new_keyframe = new_keyframe
+
+
+class FrameDeduplicator:
+    """Skip unchanged frames and optionally store only changed tiles against a keyframe
+
+    mode is "skip" (drop frames whose changed tile fraction is at most
+    threshold, write everything else in full) or "delta" (additionally write
+    changed frames as a delta image holding only the changed tiles).
+    """
+
+    def __init__(self, mode="skip", tile_size=64, threshold=0.0, keyframe_interval=30, delta_max_fraction=0.5):
+        self.mode = mode
+        self.hasher = TileHasher(tile_size)
+        self.threshold = threshold
+        self.keyframe_interval = keyframe_interval
+        self.delta_max_fraction = delta_max_fraction
+        self._lock = threading.Lock()
+        self._reference = None  # hashes of the last frame that was written
+        self._keyframe_hashes = None
+        self._keyframe_path = None
+        self._since_keyframe = 0
+        self._last_path = None
+        self._stats = {
+            "frames_seen": 0,
+            "frames_skipped": 0,
+            "full_frames": 0,
+            "delta_frames": 0,
+            "hash_seconds": 0.0,
+            "full_written": 0,
+            "full_bytes": 0,
+            "full_encode_seconds": 0.0,
+            "delta_bytes": 0,
+        }
+
+    def decide(self, image, filepath):
+        """Hash image and decide whether to skip it, write it in full, or write a delta
+
+        The reference frame is left as it is until the frame is handed to
+        commit, so a frame that is never written is never skipped against or
+        used as a keyframe.
+        """
+        started = time.perf_counter()
+        hashes = self.hasher.hash_image(image)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._stats["frames_seen"] += 1
+            self._stats["hash_seconds"] += elapsed
+            if self._reference is None or self._reference.shape != hashes.shape:
+                return DedupResult("full", 1.0, hashes=hashes, filepath=filepath, new_keyframe=True)
+            changed = hashes != self._reference
+            fraction = float(changed.mean())
+            if fraction <= self.threshold:
+                self._stats["frames_skipped"] += 1
+                return DedupResult("skip", fraction, duplicate_of=self._last_path)
+            if self.mode != "delta":
+                return DedupResult("full", fraction, hashes=hashes, filepath=filepath)
+            against_keyframe = hashes != self._keyframe_hashes
+            if (self._since_keyframe + 1 >= self.keyframe_interval
+                    or float(against_keyframe.mean()) > self.delta_max_fraction):
+                return DedupResult("full", fraction, hashes=hashes, filepath=filepath, new_keyframe=True)
+            # The caller writes this frame under its delta name
+            return DedupResult("delta", fraction, against_keyframe, self._keyframe_path,
+                               hashes=hashes, filepath=delta_path(filepath))
+
+    def commit(self, result):
+        """Make a decided frame the reference once it has been queued for writing"""
+        if result.action == "skip":
+            return
+        with self._lock:
+            self._reference = result.hashes
+            self._last_path = result.filepath
+            if result.new_keyframe:
+                self._keyframe_hashes = result.hashes
+                self._keyframe_path = result.filepath
+                self._since_keyframe = 0
+            elif result.action == "delta":
+                self._since_keyframe += 1
+            self._stats["delta_frames" if result.action == "delta" else "full_frames"] += 1
+
+    def check(self, image, filepath):
+        """decide and commit in one step, for callers that always write the frame"""
+        result = self.decide(image, filepath)
+        self.commit(result)
+        return result
+
+    def discard(self, filepath):
+        """Forget the reference when a committed frame could not be written
+
+        Skips would otherwise point at, and deltas be built against, a file
+        that does not exist; the next frame starts a new keyframe instead.
+        """
+        with self._lock:
+            if filepath not in (self._keyframe_path, self._last_path):
+                return False
+            self._reference = None
+            self._keyframe_hashes = None
+            self._keyframe_path = None
+            self._last_path = None
+            self._since_keyframe = 0
+            return True
+
+    def build_delta(self, image, result):
+        """Return an ARGB image with every unchanged tile fully transparent
+
+        The keyframe's filename is stored as PNG text so apply_delta can
+        rebuild the frame.
+        """
+        import numpy as np
+        pixels, _keepalive = qimage_to_array(image)
+        tile = self.hasher.tile_size
+        height, width = pixels.shape
+        mask = np.repeat(np.repeat(result.changed_tiles, tile, axis=0), tile, axis=1)[:height, :width]
+        delta = array_to_qimage(np.where(mask, pixels | np.uint32(0xFF000000), np.uint32(0)))
+        delta.setText("keyframe", os.path.basename(result.keyframe))
+        return delta
+
+    def observe_write(self, action, nbytes, seconds):
+        """Record the size and encode time of a written frame (thread-safe)"""
+        with self._lock:
+            if action == "delta":
+                self._stats["delta_bytes"] += nbytes
+            else:
+                self._stats["full_written"] += 1
+                self._stats["full_bytes"] += nbytes
+                self._stats["full_encode_seconds"] += seconds
+
+    def stats(self):
+        """Counters plus per-frame hashing cost and an estimate of what dedup saved"""
+        with self._lock:
+            stats = dict(self._stats)
+        full = stats["full_written"] or 1
+        mean_full_bytes = stats["full_bytes"] / full
+        mean_encode = stats["full_encode_seconds"] / full
+        stats["hash_ms_per_frame"] = 1000.0 * stats["hash_seconds"] / max(1, stats["frames_seen"])
+        stats["encode_ms_per_full_frame"] = 1000.0 * mean_encode
+        stats["bytes_saved"] = int(stats["frames_skipped"] * mean_full_bytes
+                                   + stats["delta_frames"] * mean_full_bytes - stats["delta_bytes"])
+        stats["encode_ms_avoided"] = 1000.0 * stats["frames_skipped"] * mean_encode
+        return stats
+
+
+def delta_path(filepath):
+    """Filename a delta frame is written under; deltas are always PNG to keep their alpha"""
+    base, _ = os.path.splitext(filepath)
+    return f"{base}.delta.png"
+
+
+def create_deduplicator(settings):
+    """Build a FrameDeduplicator from the dedup_* settings, or None when dedup is off"""
+    mode = settings.get("dedup", "off")
+    if mode not in ("skip", "delta"):
+        return None
+    return FrameDeduplicator(
+        mode=mode,
+        tile_size=int(settings.get("dedup_tile_size", 64)),
+        threshold=float(settings.get("dedup_threshold", 0.0)),
+        keyframe_interval=int(settings.get("dedup_keyframe_interval", 30)),
+    )
+
+
+def apply_delta(delta_path):
+    """Rebuild a full frame from a delta image and the keyframe stored beside it"""
+    delta = QImage(delta_path)
+    if delta.isNull():
+        raise OSError(f"Could not read {delta_path}")
+    keyframe_name = delta.text("keyframe")
+    if not keyframe_name:
+        return delta
+    frame = QImage(os.path.join(os.path.dirname(delta_path), keyframe_name))
+    if frame.isNull():
+        raise OSError(f"Keyframe {keyframe_name} for {delta_path} is missing")
+    frame = frame.convertToFormat(QImage.Format.Format_ARGB32)
+    painter = QPainter(frame)
+    painter.drawImage(0, 0, delta)
+    painter.end()
+    return frame
@@ -0,0 +1,128 @@
+import os
+from datetime import datetime
+
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, QSize, Qt, QUrl
+from PyQt6.QtGui import QColor, QDesktopServices, QPixmap
+from PyQt6.QtWidgets import QListView, QPushButton, QHBoxLayout, QVBoxLayout, QWidget
+
+from thumbnail_cache import ThumbnailCache
+
+
+class HistoryModel(QAbstractListModel):
+    """Catalog entries, newest first, fetched a page at a time as the view scrolls"""
+    PAGE_SIZE = 200
+
+    def __init__(self, catalog, thumbnails, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self.thumbnails = thumbnails
+        self.thumbnails.thumbnail_ready.connect(self._on_thumbnail_ready)
+        self._rows = []
+        self._row_by_path = {}
+        self._page_token = None
+        self._exhausted = False
+        self._placeholder = QPixmap(thumbnails.size)
+        self._placeholder.fill(QColor(60, 60, 60))
+
+    def reload(self):
+        self.beginResetModel()
+        self._rows = []
+        self._row_by_path = {}
+        self._page_token = None
+        self._exhausted = False
+        self.thumbnails.clear_pending()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        rows, self._page_token = self.catalog.query(limit=self.PAGE_SIZE, page_token=self._page_token)
+        self._exhausted = self._page_token is None
+        if not rows:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        for offset, row in enumerate(rows):
+            self._row_by_path[row["path"]] = first + offset
+        self._rows.extend(rows)
+        self.endInsertRows()
+
+    def entry(self, index):
+        return self._rows[index.row()]
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return datetime.fromtimestamp(row["captured_at"]).strftime("%Y-%m-%d %H:%M:%S")
+        if role == Qt.ItemDataRole.DecorationRole:
+            # Only called for visible items, so thumbnails load as the view scrolls
+            image = self.thumbnails.get(row["path"], row["mtime"], row["content_hash"])
+            return QPixmap.fromImage(image) if image is not None else self._placeholder
+        if role == Qt.ItemDataRole.ToolTipRole:
+            size = f"{row['width']}x{row['height']}" if row["width"] else "unknown size"
+            return f"{os.path.basename(row['path'])}\n{row['mode']}, {size}, {row['size_bytes'] // 1024} KiB"
+        return None
+
+    def _on_thumbnail_ready(self, path, image):
+        row = self._row_by_path.get(path)
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+
+class HistoryWindow(QWidget):
+    """Grid of recent captures; double-click opens a screenshot"""
+
+    def __init__(self, catalog, screenshot_dir, parent=None):
+        super().__init__(parent)
+        self.setWindowFlags(Qt.WindowType.Window)
+        self.setWindowTitle("Capture History")
+        self.resize(960, 640)
+        self.screenshot_dir = screenshot_dir
+        self.thumbnails = ThumbnailCache(screenshot_dir, parent=self)
+        self.model = HistoryModel(catalog, self.thumbnails, self)
+
+        self.view = QListView()
+        self.view.setViewMode(QListView.ViewMode.IconMode)
+        self.view.setResizeMode(QListView.ResizeMode.Adjust)
+        self.view.setMovement(QListView.Movement.Static)
+        self.view.setUniformItemSizes(True)
+        self.view.setIconSize(self.thumbnails.size)
+        self.view.setGridSize(self.thumbnails.size + QSize(20, 40))
+        self.view.setModel(self.model)
+        self.view.doubleClicked.connect(self.open_entry)
+
+        refresh_btn = QPushButton("Refresh")
+        refresh_btn.clicked.connect(self.model.reload)
+        folder_btn = QPushButton("Open Folder")
+        folder_btn.clicked.connect(self.open_folder)
+        buttons = QHBoxLayout()
+        buttons.addWidget(refresh_btn)
+        buttons.addStretch()
+        buttons.addWidget(folder_btn)
+        layout = QVBoxLayout()
+        layout.addWidget(self.view)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+
+    def showEvent(self, event):
+        self.model.reload()
+        super().showEvent(event)
+
+    def open_entry(self, index):
+        QDesktopServices.openUrl(QUrl.fromLocalFile(self.model.entry(index)["path"]))
+
+    def open_folder(self):
+        QDesktopServices.openUrl(QUrl.fromLocalFile(self.screenshot_dir))
+
+    def closeEvent(self, event):
+        self.thumbnails.clear_pending()
+        super().closeEvent(event)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Perceptual hashes of captures, for finding earlier screenshots of the same screen
+
+Each capture gets a 64-bit DCT hash (pHash) when it is saved; files that
+were saved without one are hashed by an indexing pass. Hashes live in the
+screenshot catalog, split into four indexed 16-bit bands so that a lookup
+only reads the entries that share a band with the query.
+
+Usage:
+    python perceptual_hash.py find <image or capture> [--limit 10] [--max-distance 12]
+    python perceptual_hash.py index
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from itertools import combinations
+
+# numpy is imported where it is used so the app starts without loading it
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QImage, QImageReader
+
+HASH_SIZE = 8  # the hash keeps the lowest HASH_SIZE x HASH_SIZE frequencies
+SAMPLE_SIZE = 32  # images are reduced to SAMPLE_SIZE x SAMPLE_SIZE greyscale first
+BAND_BITS = 16
+# Past this band radius the neighbour lists (2517 values per band at 4, 14893
+# at 6) cost more to look up than reading every hash
+MAX_BAND_RADIUS = 4
+
+_dct_matrix = None
+_dct_lock = threading.Lock()
+
+
+def _dct():
+    """Orthonormal DCT-II matrix for SAMPLE_SIZE samples, built once"""
+    global _dct_matrix
+    with _dct_lock:
+        if _dct_matrix is None:
+            import numpy as np
+            n = SAMPLE_SIZE
+            k = np.arange(n)[:, None]
+            matrix = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+            matrix[0] /= np.sqrt(2.0)
+            _dct_matrix = matrix
+        return _dct_matrix
+
+
+def phash(image):
+    """64-bit DCT hash of a QImage
+
+    The image is shrunk to 32x32 greyscale, transformed with a 2D DCT as two
+    matrix products, and each of the 8x8 lowest frequencies sets a bit when
+    it is above their median (the DC term left out).
+    """
+    import numpy as np
+    small = image.scaled(SAMPLE_SIZE, SAMPLE_SIZE, Qt.AspectRatioMode.IgnoreAspectRatio,
+                         Qt.TransformationMode.SmoothTransformation)
+    small = small.convertToFormat(QImage.Format.Format_Grayscale8)
+    bits = small.constBits()
+    bits.setsize(small.sizeInBytes())
+    pixels = np.frombuffer(bits, dtype=np.uint8).reshape(SAMPLE_SIZE, small.bytesPerLine())[:, :SAMPLE_SIZE]
+    dct = _dct()
+    low = (dct @ pixels.astype(np.float64) @ dct.T)[:HASH_SIZE, :HASH_SIZE].ravel()
+    above = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(above).tobytes(), "big")
+
+
+def hash_file(path):
+    """pHash of an image file, or None if it cannot be read"""
+    reader = QImageReader(path)
+    size = reader.size()
+    if size.isValid() and min(size.width(), size.height()) > 8 * SAMPLE_SIZE:
+        # Lets decoders that support it (JPEG) skip most of the pixels
+        reader.setScaledSize(size.scaled(8 * SAMPLE_SIZE, 8 * SAMPLE_SIZE, Qt.AspectRatioMode.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull():
+        return None
+    return phash(image)
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+def band_neighbours(band, radius):
+    """Every BAND_BITS-bit value within radius bits of band"""
+    values = [band]
+    for flips in range(1, radius + 1):
+        for positions in combinations(range(BAND_BITS), flips):
+            value = band
+            for position in positions:
+                value ^= 1 << position
+            values.append(value)
+    return values
+
+
+def find_similar(catalog, value, limit=10, max_distance=12, exclude=None):
+    """Up to limit cataloged entries nearest to hash value, as (distance, entry), nearest first
+
+    Searches growing radii so close matches only read a handful of rows; by
+    the pigeonhole principle a hash within radius r shares at least one of
+    the four bands within r // 4 bits. Radii that would need a band radius
+    above MAX_BAND_RADIUS compare against every hash instead.
+    """
+    from screenshot_catalog import PERCEPTUAL_HASH_BANDS, hash_bands
+    exclude = os.path.abspath(exclude) if exclude else None
+    bands = hash_bands(value)
+    matches = []
+    searched = -1  # band radius already searched
+    for radius in range(PERCEPTUAL_HASH_BANDS - 1, max_distance + PERCEPTUAL_HASH_BANDS, PERCEPTUAL_HASH_BANDS):
+        radius = min(radius, max_distance)
+        band_radius = radius // PERCEPTUAL_HASH_BANDS
+        if band_radius > searched:
+            if band_radius > MAX_BAND_RADIUS:
+                candidates = catalog.perceptual_hash_candidates()
+                band_radius = BAND_BITS  # everything has been searched
+            else:
+                candidates = catalog.perceptual_hash_candidates(
+                    [band_neighbours(band, band_radius) for band in bands])
+            matches = sorted(
+                ((hamming(value, entry["perceptual_hash"]), entry) for entry in candidates
+                 if entry["path"] != exclude),
+                key=lambda match: (match[0], -match[1]["captured_at"]))
+            searched = band_radius
+        if sum(1 for distance, _ in matches if distance <= radius) >= limit or radius >= max_distance:
+            break
+    return [(distance, entry) for distance, entry in matches if distance <= max_distance][:limit]
+
+
+def index_missing(catalog, batch_size=200, should_stop=None):
+    """Hash every cataloged file that has no perceptual hash yet; returns how many were hashed"""
+    hashed = 0
+    catalog.prune_perceptual_hashes()
+    while should_stop is None or not should_stop():
+        paths = catalog.without_perceptual_hash(batch_size)
+        if not paths:
+            break
+        for path in paths:
+            if should_stop is not None and should_stop():
+                break
+            # Delta frames only hold the changed tiles; they are recorded as unhashable
+            value = None if path.endswith(".delta.png") else hash_file(path)
+            catalog.set_perceptual_hash(path, value)
+            hashed += value is not None
+    return hashed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find earlier captures of the same screen")
+    parser.add_argument("--dir", help="screenshot directory (default: the app's)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    find_parser = commands.add_parser("find", help="list the captures nearest to an image")
+    find_parser.add_argument("image", help="an image file or a capture in the catalog")
+    find_parser.add_argument("--limit", type=int, default=10)
+    find_parser.add_argument("--max-distance", type=int, default=12, help="largest Hamming distance (of 64 bits)")
+    commands.add_parser("index", help="hash every capture that has no hash yet")
+    args = parser.parse_args()
+
+    from PyQt6.QtGui import QGuiApplication
+    from screenshot_catalog import ScreenshotCatalog
+
+    app = QGuiApplication(sys.argv)
+    screenshot_dir = args.dir or os.path.join(os.path.expanduser("~"), "Documents", "ScreenshotService")
+    catalog = ScreenshotCatalog(screenshot_dir)
+    try:
+        if args.command == "index":
+            started = time.perf_counter()
+            catalog.sync_directory()
+            hashed = index_missing(catalog)
+            print(f"Hashed {hashed} captures in {time.perf_counter() - started:.2f}s")
+            return 0
+        value = catalog.perceptual_hash(args.image)
+        if value is None:
+            value = hash_file(args.image)
+        if value is None:
+            print(f"[ERROR] Could not read {args.image}")
+            return 1
+        started = time.perf_counter()
+        matches = find_similar(catalog, value, args.limit, args.max_distance, exclude=args.image)
+        elapsed = (time.perf_counter() - started) * 1000.0
+        for distance, entry in matches:
+            captured = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["captured_at"]))
+            print(f"{distance:>3}  {captured}  {entry['mode']:<8} {entry['path']}")
+        print(f"{len(matches)} matches in {elapsed:.1f} ms")
+        return 0
+    finally:
+        catalog.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+"""
+Retention, quota and background compaction for the screenshot directory
+
+Policies, all off by default (0), applied oldest capture first:
+  1. delete captures and archives older than retention_max_age_days
+  2. re-encode captures older than retention_recompress_after_days to
+     retention_recompress_format
+  3. pack captures older than retention_archive_after_days into one zip
+     per capture day under archive/
+  4. delete the oldest archives, then the oldest captures, ROI captures,
+     recordings and cached thumbnails, while the directory holds more than
+     retention_max_total_mb
+
+A keyframe that delta frames are rebuilt from is kept as long as any of
+those deltas is kept, and the quota removes it together with its deltas.
+
+Usage:
+    python retention.py [--dir DIR] [--dry-run]
+"""
+
+import argparse
+import heapq
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import zipfile
+from datetime import datetime
+
+from encoders import create_encoder
+from save_pipeline import write_image
+from screenshot_catalog import ScreenshotCatalog
+from settings import load_settings
+from telemetry import configure_logging
+
+log = logging.getLogger(__name__)
+
+ARCHIVE_DIRNAME = "archive"
+STATE_FILENAME = "retention_state.json"
+# screenshots_2024-01-31.zip, screenshots_2024-01-31_2.zip
+_ARCHIVE_PATTERN = re.compile(r"^screenshots_(\d{4}-\d{2}-\d{2})(?:_\d+)?\.zip$")
+# Fraction of wall-clock time the worker may spend working; it sleeps the rest
+DUTY_CYCLE = 0.25
+# How long to back off while a capture is being taken or written
+BUSY_BACKOFF = 0.5
+DAY = 24 * 60 * 60
+
+
+def lower_thread_priority():
+    """Put the calling thread in background mode: lowest CPU and, on Windows, I/O priority"""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_MODE_BACKGROUND_BEGIN)
+        elif hasattr(os, "setpriority"):
+            # Linux schedules threads as tasks, so this renices just this thread
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except (OSError, AttributeError) as e:
+        log.debug("Could not lower background thread priority: %s", e)
+
+
+def delta_keyframe(path):
+    """Name of the keyframe a *.delta.png file is rebuilt from, or None"""
+    if not path.endswith(".delta.png"):
+        return None
+    from PyQt6.QtGui import QImageReader
+    # Reads only the PNG header and text chunks
+    return QImageReader(path).text("keyframe") or None
+
+class RetentionManager:
+    """Applies the retention_* settings to a screenshot directory on a background thread
+
+    Every pass works from the catalog and the files on disk, one file at a
+    time, so it is incremental and a pass interrupted at any point is
+    simply continued by the next one. Files are replaced atomically:
+    re-encoded captures and archives are written under a temporary name
+    and renamed into place before the originals are removed. Between files
+    the worker checks is_busy() and waits while a capture is in progress,
+    and it sleeps so it uses at most DUTY_CYCLE of the time.
+    """
+
+    def __init__(self, settings, screenshot_dir, catalog, is_busy=None, dry_run=False):
+        self.settings = settings
+        self.screenshot_dir = screenshot_dir
+        self.archive_dir = os.path.join(screenshot_dir, ARCHIVE_DIRNAME)
+        self.catalog = catalog
+        self.is_busy = is_busy
+        self.dry_run = dry_run
+        self.stats = {}
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._state_path = os.path.join(screenshot_dir, STATE_FILENAME)
+        self._state = self._load_state()
+
+    def enabled(self):
+        return any(float(self.settings[key] or 0) > 0 for key in (
+            "retention_max_total_mb", "retention_max_age_days",
+            "retention_recompress_after_days", "retention_archive_after_days"))
+
+    def start(self):
+        """Run a pass now and then every retention_interval_minutes"""
+        if self._thread is not None or not self.enabled():
+            return
+        self._thread = threading.Thread(target=self._run, name="Retention", daemon=True)
+        self._thread.start()
+
+    def run_now(self):
+        self._wake.set()
+
+    def stop(self, wait=True):
+        self._stop.set()
+        self._wake.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        lower_thread_priority()
+        interval = max(60.0, float(self.settings["retention_interval_minutes"]) * 60.0)
+        # Resume the schedule across restarts instead of starting a pass on every launch
+        delay = max(0.0, self._state.get("last_pass", 0.0) + interval - time.time())
+        while not self._stop.is_set():
+            self._wake.wait(delay)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.run_pass()
+            except Exception as e:
+                log.error("Retention pass failed: %s", e)
+            delay = interval
+
+    def run_pass(self, now=None):
+        """Apply every policy once; returns the counters of this pass"""
+        now = now if now is not None else time.time()
+        started = time.perf_counter()
+        self.stats = {"deleted": 0, "recompressed": 0, "archived": 0, "archives_deleted": 0,
+                      "bytes_freed": 0, "errors": 0}
+        try:
+            self._expire(now)
+            self._recompress(now)
+            self._archive(now)
+            self._enforce_quota()
+        except _Stopped:
+            return self.stats
+        if not self.dry_run:
+            self._state["last_pass"] = now
+            self._save_state()
+        log.info("Retention pass done in %.1fs: %s", time.perf_counter() - started, self.stats)
+        return self.stats
+
+    # --- policies ---
+
+    def _expire(self, now):
+        days = float(self.settings["retention_max_age_days"] or 0)
+        if days <= 0:
+            return
+        cutoff = now - days * DAY
+        for path, day in self._archives():
+            # An archive holds one day; it goes once the whole day is past the cutoff
+            if day + DAY <= cutoff:
+                self._pace(self._delete_archive, path)
+        rows = list(self._rows(until=cutoff))
+        expiring = {row["path"] for row in rows}
+        # A keyframe stays until every delta rebuilt from it has expired too
+        kept = {keyframe for path, keyframe in self._deltas().items() if path not in expiring}
+        for row in rows:
+            if os.path.basename(row["path"]) not in kept:
+                self._pace(self._delete, row)
+
+    def _recompress(self, now):
+        days = float(self.settings["retention_recompress_after_days"] or 0)
+        if days <= 0:
+            return
+        encoder = create_encoder(self._recompress_settings())
+        skipped = set(self._state.get("recompress_skipped", []))
+        rows = [row for row in self._rows(until=now - days * DAY)
+                if not row["path"].endswith("." + encoder.extension) and row["path"] not in skipped]
+        if not rows:
+            return
+        # Deltas are rebuilt from their keyframe by filename, so neither may change format
+        keyframes = set(self._deltas().values())
+        for row in rows:
+            name = os.path.basename(row["path"])
+            if name.endswith(".delta.png") or name in keyframes:
+                continue
+            self._pace(self._recompress_one, row, encoder, skipped)
+        self._state["recompress_skipped"] = sorted(path for path in skipped if os.path.exists(path))
+
+    def _recompress_one(self, row, encoder, skipped):
+        from PyQt6.QtGui import QImage
+        source = row["path"]
+        target = os.path.splitext(source)[0] + "." + encoder.extension
+        if self.dry_run:
+            log.info("Would re-encode %s as %s", source, encoder.describe())
+            return
+        image = QImage(source)
+        if image.isNull():
+            raise OSError(f"Could not read {source}")
+        nbytes = write_image(image, target, encoder)
+        if nbytes >= row["size_bytes"]:
+            # Not smaller: keep the original and do not try it again
+            os.remove(target)
+            skipped.add(source)
+            return
+        crop = None
+        if row["crop_width"] is not None:
+            crop = (row["crop_x"], row["crop_y"], row["crop_width"], row["crop_height"])
+        self.catalog.record(target, row["mode"], captured_at=row["captured_at"], width=row["width"],
+                            height=row["height"], crop_rect=crop, size_bytes=nbytes)
+        os.remove(source)
+        self.catalog.remove(source)
+        self.stats["recompressed"] += 1
+        self.stats["bytes_freed"] += row["size_bytes"] - nbytes
+
+    def _archive(self, now):
+        days = float(self.settings["retention_archive_after_days"] or 0)
+        if days <= 0:
+            return
+        by_day = {}
+        for row in self._rows(until=now - days * DAY):
+            day = datetime.fromtimestamp(row["captured_at"]).strftime("%Y-%m-%d")
+            by_day.setdefault(day, []).append(row)
+        if not by_day:
+            return
+        # Files already in an archive were packed by a pass that stopped before removing them
+        archived = {}
+        for path, _ in self._archives():
+            with zipfile.ZipFile(path) as archive:
+                for info in archive.infolist():
+                    archived[info.filename] = info.file_size
+        deltas = self._deltas()
+        for day, rows in sorted(by_day.items()):
+            # A keyframe is only archived in the same zip as all of its deltas
+            packed = {row["path"] for row in rows}
+            kept = {keyframe for path, keyframe in deltas.items() if path not in packed}
+            rows = [row for row in rows if os.path.basename(row["path"]) not in kept]
+            if rows:
+                self._archive_day(day, rows, archived)
+
+    def _archive_day(self, day, rows, archived):
+        pending = []
+        for row in rows:
+            name = os.path.basename(row["path"])
+            if archived.get(name) == row["size_bytes"]:
+                self._pace(self._delete, row, "archived")
+            else:
+                pending.append(row)
+        if not pending:
+            return
+        target = self._new_archive_path(day)
+        if self.dry_run:
+            log.info("Would archive %s files into %s", len(pending), target)
+            return
+        os.makedirs(self.archive_dir, exist_ok=True)
+        part = target + ".part"
+        written = []
+        try:
+            # Captures are already compressed images, so they are stored as they are
+            with zipfile.ZipFile(part, "w", zipfile.ZIP_STORED) as archive:
+                def add(row):
+                    archive.write(row["path"], os.path.basename(row["path"]))
+                    written.append(row)
+                for row in pending:
+                    self._pace(add, row)
+            if written:
+                os.replace(part, target)
+            else:
+                os.remove(part)
+        except BaseException:
+            if os.path.exists(part):
+                os.remove(part)
+            raise
+        # Only once the archive is in place are the originals removed
+        for row in written:
+            self._pace(self._delete, row, "archived")
+
+    def _enforce_quota(self):
+        limit = float(self.settings["retention_max_total_mb"] or 0) * 1024 * 1024
+        if limit <= 0:
+            return
+        archives = self._archives()
+        files, files_bytes = self._extra_files()
+        total = self.catalog.total_bytes() + sum(os.path.getsize(path) for path, _ in archives) + files_bytes
+        # Archives hold the oldest captures, so they go first
+        for path, _ in archives:
+            if total <= limit:
+                return
+            total -= self._pace(self._delete_archive, path) or 0
+        deltas_of = {}
+        for path, keyframe in self._deltas().items():
+            deltas_of.setdefault(keyframe, []).append(path)
+        removed = set()
+        captures = ((row["captured_at"], row["path"], row, row["size_bytes"]) for row in self._rows())
+        for _, path, row, size in heapq.merge(captures, files, key=lambda entry: entry[0]):
+            if total <= limit:
+                return
+            if path in removed:
+                continue
+            if row is None:
+                self._pace(self._delete_file, path, size)
+                total -= size
+                continue
+            # Deltas cannot be rebuilt without their keyframe, so they go with it
+            rows = [row] + [self.catalog.get(delta) for delta in deltas_of.get(os.path.basename(path), [])]
+            for row in rows:
+                if row is not None and row["path"] not in removed:
+                    self._pace(self._delete, row)
+                    removed.add(row["path"])
+                    total -= row["size_bytes"]
+
+    # --- helpers ---
+
+    def _rows(self, until=None):
+        """Catalog entries oldest first, fetched a page at a time as the pass goes"""
+        after = None
+        while True:
+            rows, after = self.catalog.oldest(until=until, limit=200, after=after)
+            for row in rows:
+                yield row
+            if after is None:
+                return
+
+    def _deltas(self):
+        """{delta frame path: name of its keyframe} for every delta frame in the catalog"""
+        deltas = {}
+        for row in self._rows():
+            keyframe = delta_keyframe(row["path"])
+            if keyframe:
+                deltas[row["path"]] = keyframe
+        return deltas
+
+    def _extra_files(self):
+        """Files outside the catalog that count towards the quota, and their total size
+
+        These are ROI captures, recordings and the thumbnail store. The
+        files come back as (mtime, path, None, size), oldest first. Files
+        still being written (*.part) count towards the total but are never
+        listed for deletion.
+        """
+        from roi_capture import ROI_DIRNAME
+        from screen_recorder import RECORDINGS_DIRNAME
+        from thumbnail_cache import THUMBNAIL_DIRNAME
+        files, total = [], 0
+        for dirname in (ROI_DIRNAME, RECORDINGS_DIRNAME, THUMBNAIL_DIRNAME):
+            for root, _, names in os.walk(os.path.join(self.screenshot_dir, dirname)):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        info = os.stat(path)
+                    except OSError:
+                        continue
+                    total += info.st_size
+                    if not name.endswith(".part"):
+                        files.append((info.st_mtime, path, None, info.st_size))
+        return sorted(files, key=lambda entry: (entry[0], entry[1])), total
+
+    def _archives(self):
+        """(path, start of day timestamp) of every archive, oldest first"""
+        if not os.path.isdir(self.archive_dir):
+            return []
+        archives = []
+        for name in os.listdir(self.archive_dir):
+            match = _ARCHIVE_PATTERN.match(name)
+            if match:
+                day = datetime.strptime(match.group(1), "%Y-%m-%d").timestamp()
+                archives.append((os.path.join(self.archive_dir, name), day))
+        return sorted(archives, key=lambda archive: (archive[1], archive[0]))
+
+    def _new_archive_path(self, day):
+        path = os.path.join(self.archive_dir, f"screenshots_{day}.zip")
+        index = 2
+        while os.path.exists(path):
+            path = os.path.join(self.archive_dir, f"screenshots_{day}_{index}.zip")
+            index += 1
+        return path
+
+    def _delete(self, row, reason="deleted"):
+        if self.dry_run:
+            log.info("Would remove (%s) %s", reason, row['path'])
+            return
+        try:
+            os.remove(row["path"])
+        except FileNotFoundError:
+            pass
+        self.catalog.remove(row["path"])
+        self.stats[reason] += 1
+        if reason == "deleted":
+            self.stats["bytes_freed"] += row["size_bytes"]
+
+    def _delete_file(self, path, size):
+        if self.dry_run:
+            log.info("Would remove (deleted) %s", path)
+            return
+        os.remove(path)
+        self.stats["deleted"] += 1
+        self.stats["bytes_freed"] += size
+
+    def _delete_archive(self, path):
+        if self.dry_run:
+            log.info("Would delete archive %s", path)
+            return os.path.getsize(path)
+        size = os.path.getsize(path)
+        os.remove(path)
+        self.stats["archives_deleted"] += 1
+        self.stats["bytes_freed"] += size
+        return size
+
+    def _pace(self, work, *args):
+        """Run one unit of work once no capture is busy, then rest to keep within DUTY_CYCLE"""
+        while self.is_busy is not None and self.is_busy():
+            if self._stop.wait(BUSY_BACKOFF):
+                break
+        if self._stop.is_set():
+            raise _Stopped()
+        started = time.perf_counter()
+        try:
+            result = work(*args)
+        except OSError as e:
+            log.error("Retention could not process %s: %s", args[0] if args else '', e)
+            self.stats["errors"] += 1
+            return None
+        elapsed = time.perf_counter() - started
+        self._stop.wait(elapsed * (1.0 - DUTY_CYCLE) / DUTY_CYCLE)
+        return result
+
+    def _recompress_settings(self):
+        quality = self.settings["retention_recompress_quality"]
+        return {
+            "encoder": self.settings["retention_recompress_format"],
+            "webp_lossless": quality is None,
+            "webp_quality": quality or 80,
+            "webp_method": 4,
+            "jpeg_quality": quality or 90,
+        }
+
+    def _load_state(self):
+        try:
+            with open(self._state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        tmp_path = self._state_path + ".part"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._state, f)
+            os.replace(tmp_path, self._state_path)
+        except OSError as e:
+            log.error("Could not save retention state: %s", e)
+
+
+class _Stopped(Exception):
+    """Raised inside a pass when the manager is stopped"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply the retention settings to the screenshot directory once")
+    parser.add_argument("--dir", help="screenshot directory (default: the app's)")
+    parser.add_argument("--dry-run", action="store_true", help="print what would change")
+    args = parser.parse_args()
+
+    screenshot_dir = args.dir or os.path.join(os.path.expanduser("~"), "Documents", "ScreenshotService")
+    settings = load_settings()
+    configure_logging(settings["log_level"], buffer_lines=0, background=False)
+    catalog = ScreenshotCatalog(screenshot_dir)
+    catalog.sync_directory()
+    manager = RetentionManager(settings, screenshot_dir, catalog, dry_run=args.dry_run)
+    if not manager.enabled():
+        print("No retention policy is enabled in settings.json")
+    else:
+        print(manager.run_pass())
+    catalog.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Scheduled region-of-interest captures driven by a config file
+
+Each region is grabbed on its own interval straight from the capture
+backend as a sub-rectangle, without the overlay or any other UI. Regions
+that come due together and overlap are served by one grab of their
+bounding rectangle.
+
+Config (JSON):
+    {
+        "group_window_ms": 100,
+        "regions": [
+            {"name": "status-bar", "rect": [0, 1040, 1920, 40], "interval_s": 5},
+            {"name": "clock", "rect": [1800, 1040, 120, 40], "interval_s": 60}
+        ]
+    }
+
+Captures are written to <screenshot dir>/roi/<name>/<name>_YYYYMMDD_HHMMSS_ffffff.png
+
+Usage:
+    python roi_capture.py --config roi_schedules.json [--backend qt] [--once]
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import re
+import signal
+import sys
+import time
+from datetime import datetime
+
+from PyQt6.QtCore import QObject, QRect, QTimer, pyqtSignal
+
+from telemetry import metrics
+
+log = logging.getLogger(__name__)
+
+ROI_DIRNAME = "roi"
+CONFIG_FILENAME = "roi_schedules.json"
+_NAME_PATTERN = re.compile(r"^[A-Za-z0-9-]+$")
+
+
+class RoiRegion:
+    """A named screen rectangle captured every interval seconds"""
+
+    def __init__(self, name, rect, interval):
+        self.name = name
+        self.rect = rect  # QRect in global logical coordinates
+        self.interval = interval
+        self.next_due = None  # time.monotonic() of the next capture
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def load_roi_config(path):
+    """Regions and the grouping window (ms) from a config file; raises ValueError if it is invalid"""
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            config = json.load(f)
+        except ValueError as e:
+            raise ValueError(f"{path} is not valid JSON: {e}")
+    if not isinstance(config, dict):
+        raise ValueError(f"{path} must hold a JSON object")
+    entries = config.get("regions", [])
+    if not isinstance(entries, list):
+        raise ValueError(f"{path}: regions must be a list")
+    regions, names = [], set()
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise ValueError(f"Region {index}: must be an object")
+        name = entry.get("name", "")
+        if not isinstance(name, str) or not _NAME_PATTERN.match(name) or name in names:
+            raise ValueError(f"Region {index}: name must be unique letters, digits and '-', got '{name}'")
+        rect = entry.get("rect")
+        if (not isinstance(rect, list) or len(rect) != 4 or not all(_is_number(v) for v in rect)
+                or rect[2] <= 0 or rect[3] <= 0):
+            raise ValueError(f"Region {index} ('{name}'): rect must be [x, y, width, height] with a positive size")
+        interval = entry.get("interval_s", 0)
+        if not _is_number(interval) or interval <= 0:
+            raise ValueError(f"Region {index} ('{name}'): interval_s must be a positive number")
+        names.add(name)
+        regions.append(RoiRegion(name, QRect(*(int(v) for v in rect)), float(interval)))
+    group_window_ms = config.get("group_window_ms", 100)
+    if not _is_number(group_window_ms) or group_window_ms < 0:
+        raise ValueError(f"{path}: group_window_ms must be a non-negative number")
+    return regions, int(group_window_ms)
+
+
+def group_regions(regions):
+    """Split regions into groups of transitively overlapping rects; returns [(bounding QRect, regions)]"""
+    groups = []  # [bounding rect, members]
+    for region in regions:
+        merged = [region]
+        bounds = QRect(region.rect)
+        # Growing the bounds can make them reach groups that were checked already
+        changed = True
+        while changed:
+            changed = False
+            for group in groups[:]:
+                if group[0].intersects(bounds):
+                    groups.remove(group)
+                    merged.extend(group[1])
+                    bounds = bounds.united(group[0])
+                    changed = True
+        groups.append([bounds, merged])
+    return [(bounds, members) for bounds, members in groups]
+
+
+def crop_region(image, bounds, rect):
+    """The part of image (a grab of bounds) that shows rect, in the image's pixels"""
+    scale = image.width() / bounds.width() if bounds.width() else 1.0
+    local = rect.translated(-bounds.topLeft())
+    if scale == 1.0:
+        return image.copy(local)
+    return image.copy(QRect(round(local.x() * scale), round(local.y() * scale),
+                            round(local.width() * scale), round(local.height() * scale)))
+
+
+class RoiScheduler(QObject):
+    """Captures the configured regions on their intervals, grouping overlapping due regions into one grab
+
+    Grabs run on the thread that owns the scheduler (the GUI thread, so
+    every backend can be used); encoding and writing go through the save
+    pipeline. Regions due within group_window_ms of each other are
+    grabbed together. While is_paused() returns True (an interactive
+    capture is on screen) due regions wait. Missed intervals are skipped
+    rather than caught up.
+    """
+    captured = pyqtSignal(str, str)  # region name, filepath
+
+    def __init__(self, backend, regions, output_dir, save_pipeline, encoder=None, group_window_ms=100,
+                 is_paused=None, parent=None):
+        super().__init__(parent)
+        self.backend = backend
+        self.regions = regions
+        self.output_dir = output_dir
+        self.save_pipeline = save_pipeline
+        self.encoder = encoder
+        self.group_window = group_window_ms / 1000.0
+        self.is_paused = is_paused
+        self.stats = {"grabs": 0, "regions_captured": 0, "saves_dropped": 0, "grab_errors": 0, "grab_ms": 0.0}
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._on_timer)
+
+    def start(self):
+        now = time.monotonic()
+        for region in self.regions:
+            os.makedirs(os.path.join(self.output_dir, region.name), exist_ok=True)
+            region.next_due = now
+        self._arm()
+
+    def stop(self):
+        self._timer.stop()
+
+    def capture_due(self, now=None):
+        """Grab every region due by now (plus the grouping window); returns the groups grabbed"""
+        now = now if now is not None else time.monotonic()
+        due = [region for region in self.regions if region.next_due <= now + self.group_window]
+        groups = group_regions(due)
+        for bounds, members in groups:
+            self._capture_group(bounds, members)
+        for region in due:
+            region.next_due += region.interval
+            if region.next_due <= now:
+                region.next_due = now + region.interval
+        return groups
+
+    def _arm(self):
+        if not self.regions:
+            return
+        delay = min(region.next_due for region in self.regions) - time.monotonic()
+        self._timer.start(max(0, int(delay * 1000)))
+
+    def _on_timer(self):
+        if self.is_paused is not None and self.is_paused():
+            self._timer.start(100)
+            return
+        self.capture_due()
+        self._arm()
+
+    def _capture_group(self, bounds, members):
+        started = time.perf_counter()
+        try:
+            with metrics.span("grab", mode="roi"):
+                image = self.backend.grab(bounds)
+        except Exception as e:
+            log.error("Region capture of %s failed: %s", bounds, e)
+            self.stats["grab_errors"] += 1
+            return
+        self.stats["grabs"] += 1
+        self.stats["grab_ms"] += (time.perf_counter() - started) * 1000.0
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        extension = self.encoder.extension if self.encoder is not None else "png"
+        for region in members:
+            crop = image if len(members) == 1 else crop_region(image, bounds, region.rect)
+            filepath = os.path.join(self.output_dir, region.name, f"{region.name}_{timestamp}.{extension}")
+            on_written = lambda path, nbytes, seconds, name=region.name: self.captured.emit(name, path)
+            if self.save_pipeline.submit(crop, filepath, block=False, on_written=on_written, encoder=self.encoder):
+                self.stats["regions_captured"] += 1
+            else:
+                self.stats["saves_dropped"] += 1
+
+
+def default_config_path(screenshot_dir):
+    return os.path.join(screenshot_dir, CONFIG_FILENAME)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Capture screen regions on a schedule without any UI")
+    parser.add_argument("--config", help="region config (default: roi_schedules.json in the screenshot directory)")
+    parser.add_argument("--backend", help="capture backend (default: the capture_backend setting)")
+    parser.add_argument("--once", action="store_true", help="capture every region once and exit")
+    args = parser.parse_args()
+
+    from PyQt6.QtGui import QGuiApplication
+    from capture_backends import create_backend
+    from encoders import create_encoder
+    from save_pipeline import SavePipeline
+    from settings import load_settings
+    from telemetry import configure_logging
+
+    app = QGuiApplication(sys.argv)
+    settings = load_settings()
+    configure_logging(settings["log_level"], buffer_lines=0, background=False)
+    screenshot_dir = os.path.join(os.path.expanduser("~"), "Documents", "ScreenshotService")
+    config_path = args.config or default_config_path(screenshot_dir)
+    try:
+        regions, group_window_ms = load_roi_config(config_path)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] {e}")
+        return 1
+    backend = create_backend(args.backend or settings["capture_backend"], all_screens=settings["capture_all_screens"])
+    pipeline = SavePipeline()
+    scheduler = RoiScheduler(backend, regions, os.path.join(screenshot_dir, ROI_DIRNAME), pipeline,
+                             create_encoder(settings), group_window_ms)
+    scheduler.captured.connect(lambda name, path: print(f"{name}: {path}"))
+    if args.once:
+        # start() makes every region due now
+        scheduler.start()
+        scheduler.stop()
+        groups = scheduler.capture_due()
+        pipeline.shutdown(wait=True)
+        app.processEvents()
+        print(f"Captured {len(regions)} regions with {len(groups)} grabs")
+        return 0
+    scheduler.start()
+    print(f"Capturing {len(regions)} regions, Ctrl+C to stop")
+    signal.signal(signal.SIGINT, lambda *_: app.quit())
+    # Wake the interpreter regularly so the Ctrl+C handler gets to run
+    keepalive = QTimer()
+    keepalive.timeout.connect(lambda: None)
+    keepalive.start(200)
+    app.exec()
+    pipeline.shutdown(wait=True)
+    print(scheduler.stats)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
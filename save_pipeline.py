@@ -0,0 +1,159 @@
+import io
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from PyQt6.QtCore import QBuffer, QByteArray, QIODevice, QObject, pyqtSignal
+
+from telemetry import metrics
+
+log = logging.getLogger(__name__)
+
+_stamp_lock = threading.Lock()
+_last_stamp = None
+_stamp_repeats = 0
+
+
+class SavePipeline(QObject):
+    """Encode and write captured images on background worker threads
+
+    Images are handed over in memory (QImage or PIL Image) and written to a
+    temporary file that is renamed into place once complete, so a partially
+    written screenshot is never visible in the screenshot directory.
+    """
+    saved = pyqtSignal(str)  # filepath
+    save_failed = pyqtSignal(str, str)  # filepath, error message
+
+    def __init__(self, max_workers=2, max_pending=8, parent=None):
+        super().__init__(parent)
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._workers = []
+        self._closed = False
+        for index in range(max_workers):
+            worker = threading.Thread(target=self._run, name=f"SaveWorker-{index}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, image, filepath, block=True, timeout=None, on_written=None, encoder=None):
+        """Queue an image for saving; returns False if the queue is full or closed
+
+        encoder is an encoders.ImageEncoder; without one the format follows
+        the file extension. on_written, if given, is called from the worker thread with
+        (filepath, bytes written, seconds spent encoding and writing).
+        """
+        if self._closed:
+            return False
+        try:
+            self._queue.put((image, filepath, on_written, encoder), block=block, timeout=timeout)
+        except queue.Full:
+            metrics.inc("save_queue_full_total")
+            log.error("Save queue full, dropping: %s", filepath)
+            return False
+        return True
+
+    def pending(self):
+        """Number of images waiting to be written"""
+        return self._queue.unfinished_tasks
+
+    def wait_idle(self):
+        """Block until every queued image has been written"""
+        self._queue.join()
+
+    def shutdown(self, wait=True):
+        """Stop accepting work and let the workers drain the queue"""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._workers:
+            self._queue.put(None)
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                image, filepath, on_written, encoder = job
+                started = time.perf_counter()
+                try:
+                    nbytes = write_image(image, filepath, encoder)
+                except Exception as e:
+                    metrics.inc("save_failures_total")
+                    log.error("Failed to save %s: %s", filepath, e)
+                    self.save_failed.emit(filepath, str(e))
+                else:
+                    if on_written is not None:
+                        try:
+                            on_written(filepath, nbytes, time.perf_counter() - started)
+                        except Exception as e:
+                            log.error("on_written callback failed for %s: %s", filepath, e)
+                    metrics.inc("saves_total")
+                    log.info("Screenshot saved: %s", filepath)
+                    self.saved.emit(filepath)
+            finally:
+                self._queue.task_done()
+
+
+def capture_timestamp():
+    """Timestamp for a capture filename, down to the microsecond and unique within this process
+
+    Saves are pipelined, so two captures can be taken in the same clock
+    tick; a repeated timestamp gets a counter appended rather than
+    replacing the earlier file.
+    """
+    global _last_stamp, _stamp_repeats
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    with _stamp_lock:
+        if stamp == _last_stamp:
+            _stamp_repeats += 1
+            return f"{stamp}_{_stamp_repeats}"
+        _last_stamp, _stamp_repeats = stamp, 0
+        return stamp
+
+
+def write_image(image, filepath, encoder=None):
+    """Encode an in-memory image to filepath via a temporary file; returns the file size"""
+    directory = os.path.dirname(filepath)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+    fmt = os.path.splitext(filepath)[1].lstrip(".").upper() or "PNG"
+    if fmt == "JPG":
+        fmt = "JPEG"
+    with metrics.span("encode", format=encoder.name if encoder is not None else fmt.lower()):
+        data = encode_image(image, fmt, encoder)
+    tmp_path = filepath + ".part"
+    try:
+        with metrics.span("write"):
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, filepath)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    metrics.inc("bytes_written_total", len(data))
+    return len(data)
+
+
+def encode_image(image, fmt, encoder=None):
+    """Encoded bytes of a QImage or PIL Image, with encoder or else in fmt"""
+    if encoder is not None:
+        return encoder.encode(image)
+    if hasattr(image, "bits"):
+        # QImage (QPixmap must not be used off the GUI thread)
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+        if not image.save(buffer, fmt):
+            raise OSError(f"Qt could not encode {fmt}")
+        return data.data()
+    # PIL Image
+    output = io.BytesIO()
+    image.save(output, format=fmt)
+    return output.getvalue()
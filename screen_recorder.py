@@ -0,0 +1,387 @@
+"""
+Screen recording to an animated PNG, an animated WebP or a video file
+
+Frames are grabbed from the capture backend on a timer in the GUI thread
+and handed to one encoder thread through a bounded queue; a frame that
+arrives while the queue is full is dropped, so memory stays flat however
+far behind the encoder falls. The encoder hashes each frame's tiles and
+skips frames where nothing changed; between keyframes an APNG stores only
+the bounding box of the changed tiles.
+
+Formats:
+    apng  animated PNG, written with the NumPy PNG encoder
+    webp  animated WebP through Pillow's libwebp animation encoder
+    mp4   H.264 video through an ffmpeg found on PATH
+
+Recordings are written to <screenshot dir>/recordings/recording_YYYYMMDD_HHMMSS.<ext>
+"""
+
+import logging
+import os
+import queue
+import shutil
+import struct
+import subprocess
+import threading
+import time
+from datetime import datetime
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from encoders import PngEncoder, png_chunk, qimage_to_rgb_array
+from frame_dedup import TileHasher
+from telemetry import metrics
+
+log = logging.getLogger(__name__)
+
+RECORDINGS_DIRNAME = "recordings"
+RECORD_FORMATS = {"apng": "png", "webp": "webp", "mp4": "mp4"}  # format -> file extension
+
+
+class ApngWriter:
+    """Streams an animated PNG to disk one frame at a time
+
+    A frame may cover any sub-rectangle of the canvas; it is drawn over the
+    previous one. A frame's display time is only known when the next one
+    arrives, so each frame is compressed right away and written out with
+    the following add_frame() or close().
+    """
+
+    def __init__(self, path, width, height, level=1, png_filter="up"):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.frames = 0
+        self._encoder = PngEncoder(level, png_filter)
+        self._sequence = 0
+        self._pending = None  # (x, y, width, height, started, compressed rows)
+        self._file = open(path, "wb")
+        self._file.write(b"\x89PNG\r\n\x1a\n")
+        self._file.write(png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        # The frame count is patched in by close()
+        self._actl_offset = self._file.tell()
+        self._file.write(png_chunk(b"acTL", struct.pack(">II", 0, 0)))
+
+    def add_frame(self, pixels, box, timestamp):
+        """Append a (height, width, 3) RGB frame shown from timestamp (seconds); box is the (x, y, w, h) to store"""
+        x, y, width, height = box
+        if self.frames == 0:
+            # The first frame doubles as the still image and must cover the canvas
+            x, y, width, height = 0, 0, self.width, self.height
+        data = self._encoder.compress(pixels[y:y + height, x:x + width])
+        self._flush(timestamp)
+        self._pending = (x, y, width, height, timestamp, data)
+        self.frames += 1
+
+    def close(self, timestamp):
+        """Write the last frame, shown until timestamp, and finish the file"""
+        self._flush(timestamp)
+        self._file.write(png_chunk(b"IEND", b""))
+        self._file.seek(self._actl_offset)
+        self._file.write(png_chunk(b"acTL", struct.pack(">II", self.frames, 0)))
+        self._file.close()
+
+    def _flush(self, until):
+        if self._pending is None:
+            return
+        x, y, width, height, started, data = self._pending
+        self._pending = None
+        delay_num, delay_den = _frame_delay(until - started)
+        # dispose_op NONE and blend_op SOURCE: the frame replaces its rectangle and stays
+        self._file.write(png_chunk(b"fcTL", struct.pack(">IIIIIHHBB", self._sequence, width, height, x, y,
+                                                        delay_num, delay_den, 0, 0)))
+        self._sequence += 1
+        if self._sequence == 1:
+            self._file.write(png_chunk(b"IDAT", data))
+        else:
+            self._file.write(png_chunk(b"fdAT", struct.pack(">I", self._sequence) + data))
+            self._sequence += 1
+
+
+def _frame_delay(seconds):
+    """APNG delay_num / delay_den for seconds, in milliseconds or coarser if it does not fit"""
+    for denominator in (1000, 100, 10, 1):
+        numerator = round(max(0.0, seconds) * denominator)
+        if numerator <= 0xFFFF:
+            return numerator, denominator
+    return 0xFFFF, 1
+
+
+class WebpWriter:
+    """Animated WebP through Pillow's libwebp animation encoder
+
+    Frames are compressed as they are added; libwebp itself stores only
+    the changed part of each frame. kmin/kmax bound the distance between
+    keyframes. Pillow's public save_all API wants every frame in memory at
+    once, so this drives the encoder directly, in the form Pillow 11 and 12
+    expose it (requirements.txt pins Pillow below 13). A Pillow without it
+    raises RuntimeError and the recorder falls back to APNG.
+    """
+
+    def __init__(self, path, width, height, keyframe_interval=50, lossless=True, quality=80, method=0):
+        try:
+            from PIL import _webp
+        except ImportError:
+            raise RuntimeError("Recording to WebP needs Pillow built with WebP support")
+        import PIL
+        from PIL import Image
+        if not hasattr(Image.Image, "getim") or not hasattr(_webp, "WebPAnimEncoder"):
+            raise RuntimeError(f"Recording to WebP is not supported with Pillow {PIL.__version__}")
+        self.path = path
+        self.frames = 0
+        self.lossless = lossless
+        self.quality = quality
+        self.method = method
+        kmax = max(2, keyframe_interval)
+        # libwebp wants kmin > kmax / 2
+        try:
+            self._encoder = _webp.WebPAnimEncoder((width, height), 0, 0, False, kmax // 2 + 1, kmax, False, False)
+        except TypeError as e:
+            raise RuntimeError(f"Recording to WebP is not supported with Pillow {PIL.__version__}: {e}")
+
+    def add_frame(self, pixels, box, timestamp):
+        from PIL import Image
+        frame = Image.fromarray(pixels, "RGB").convert("RGBA")
+        self._encoder.add(frame.getim(), round(timestamp * 1000), self.lossless, self.quality, 100, self.method)
+        self.frames += 1
+
+    def close(self, timestamp):
+        self._encoder.add(None, round(timestamp * 1000), self.lossless, self.quality, 100, 0)
+        data = self._encoder.assemble("", "", "")
+        if data is None:
+            raise OSError("libwebp could not assemble the animation")
+        with open(self.path, "wb") as f:
+            f.write(data)
+
+
+class FfmpegWriter:
+    """H.264 video through a local ffmpeg, fed raw frames at a constant frame rate
+
+    Skipped and dropped frames are filled in by repeating the frame that
+    was on screen, so the video keeps real time.
+    """
+
+    def __init__(self, path, width, height, fps):
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            raise RuntimeError("Recording to mp4 needs ffmpeg on PATH")
+        self.path = path
+        self.fps = fps
+        self.frames = 0
+        self._written = 0  # video frames sent to ffmpeg
+        self._pending = None  # (started, raw frame)
+        self._process = subprocess.Popen(
+            [ffmpeg, "-loglevel", "error", "-y",
+             "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+             # yuv420p needs even dimensions
+             "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+             "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", path],
+            stdin=subprocess.PIPE
+        )
+
+    def add_frame(self, pixels, box, timestamp):
+        self._flush(timestamp, minimum=0)
+        self._pending = (timestamp, pixels.tobytes())
+        self.frames += 1
+
+    def close(self, timestamp):
+        self._flush(timestamp, minimum=1)
+        self._process.stdin.close()
+        if self._process.wait() != 0:
+            raise OSError(f"ffmpeg exited with status {self._process.returncode}")
+
+    def _flush(self, until, minimum):
+        if self._pending is None:
+            return
+        _, raw = self._pending
+        count = max(minimum, round(until * self.fps) - self._written)
+        for _ in range(count):
+            self._process.stdin.write(raw)
+        self._written += count
+
+
+def changed_box(changed, tile_size, width, height):
+    """Pixel (x, y, w, h) bounding the True tiles of a (tiles_y, tiles_x) mask"""
+    import numpy as np
+    rows = np.flatnonzero(changed.any(axis=1))
+    cols = np.flatnonzero(changed.any(axis=0))
+    x, y = int(cols[0]) * tile_size, int(rows[0]) * tile_size
+    right = min(width, (int(cols[-1]) + 1) * tile_size)
+    bottom = min(height, (int(rows[-1]) + 1) * tile_size)
+    return x, y, right - x, bottom - y
+
+
+class ScreenRecorder(QObject):
+    """Records the screen into one animated image or video file until stopped
+
+    Grabs run on a QTimer in the calling (GUI) thread so GUI-thread-only
+    backends work. Frames go through a queue of at most max_queue frames
+    to one encoder thread; frames that do not fit are dropped and counted.
+    Every keyframe_interval stored frames one is stored in full.
+    """
+    finished = pyqtSignal(str, dict)  # filepath ("" if the recording failed), stats
+    _encode_failed = pyqtSignal()
+
+    def __init__(self, backend, output_dir, fmt="apng", fps=10, max_queue=4, keyframe_interval=50,
+                 tile_size=64, png_level=1, webp_options=None, parent=None):
+        super().__init__(parent)
+        if fmt not in RECORD_FORMATS:
+            raise ValueError(f"Unknown recording format '{fmt}', expected one of {sorted(RECORD_FORMATS)}")
+        self.backend = backend
+        self.output_dir = output_dir
+        self.fmt = fmt
+        self.fps = fps
+        self.max_queue = max_queue
+        self.keyframe_interval = keyframe_interval
+        self.tile_size = tile_size
+        self.png_level = png_level
+        self.webp_options = webp_options or {}
+        self.filepath = None
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.capture_frame)
+        # Emitted on the encoder thread, so stop() runs on the thread that owns the timer
+        self._encode_failed.connect(self.stop)
+        self._queue = None
+        self._worker = None
+        self._running = False
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def is_running(self):
+        return self._running
+
+    def start(self):
+        """Start recording; returns the output filepath"""
+        if self._running:
+            return self.filepath
+        first = self.backend.grab()
+        os.makedirs(self.output_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.filepath = os.path.join(self.output_dir, f"recording_{timestamp}.{RECORD_FORMATS[self.fmt]}")
+        writer = self._create_writer(first.width(), first.height())
+        self._stats = {
+            "frames_captured": 0,
+            "frames_dropped": 0,
+            "frames_unchanged": 0,
+            "frames_encoded": 0,
+            "keyframes": 0,
+            "encode_errors": 0,
+            "max_queue_depth": 0,
+            "encode_lag_ms": 0.0,
+            "max_encode_lag_ms": 0.0,
+        }
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._started_at = time.perf_counter()
+        self._worker = threading.Thread(target=self._encode, args=(writer, first.width(), first.height()),
+                                        name="RecordEncoder", daemon=True)
+        self._worker.start()
+        self._running = True
+        self._enqueue(first, self._started_at)
+        self._timer.start(max(1, int(round(1000.0 / self.fps))))
+        log.debug("Recording %sx%s at %s fps to %s", first.width(), first.height(), self.fps, self.filepath)
+        return self.filepath
+
+    def stop(self, wait=False):
+        """Stop grabbing; queued frames are still encoded before finished is emitted"""
+        if not self._running:
+            return
+        self._timer.stop()
+        self._running = False
+        # The encoder always drains the queue, so this cannot block for long
+        self._queue.put((None, time.perf_counter()))
+        if wait:
+            self._worker.join()
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _create_writer(self, width, height):
+        if self.fmt == "apng":
+            return ApngWriter(self.filepath, width, height, level=self.png_level)
+        if self.fmt == "webp":
+            try:
+                return WebpWriter(self.filepath, width, height, keyframe_interval=self.keyframe_interval,
+                                  **self.webp_options)
+            except RuntimeError as e:
+                log.warning("%s, recording to APNG instead.", e)
+                self.filepath = os.path.splitext(self.filepath)[0] + "." + RECORD_FORMATS["apng"]
+                return ApngWriter(self.filepath, width, height, level=self.png_level)
+        return FfmpegWriter(self.filepath, width, height, self.fps)
+
+    def capture_frame(self):
+        """Grab one frame now and queue it for the encoder; the timer calls this at the frame rate"""
+        try:
+            with metrics.span("grab", mode="record"):
+                image = self.backend.grab()
+        except Exception as e:
+            log.error("Recording grab failed: %s", e)
+            self.stop()
+            return
+        self._enqueue(image, time.perf_counter())
+
+    def _enqueue(self, image, captured_at):
+        try:
+            self._queue.put_nowait((image, captured_at))
+        except queue.Full:
+            with self._stats_lock:
+                self._stats["frames_dropped"] += 1
+            return
+        with self._stats_lock:
+            self._stats["frames_captured"] += 1
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._queue.qsize())
+
+    def _encode(self, writer, width, height):
+        hasher = TileHasher(self.tile_size)
+        previous = None  # tile hashes of the last stored frame
+        since_keyframe = 0
+        failed = False
+        while True:
+            image, captured_at = self._queue.get()
+            if image is None:
+                break
+            if failed:
+                continue
+            try:
+                if image.width() != width or image.height() != height:
+                    # The screen layout changed; keep the canvas size
+                    image = image.scaled(width, height)
+                hashes = hasher.hash_image(image)
+                if previous is not None and since_keyframe < self.keyframe_interval:
+                    changed = hashes != previous
+                    if not changed.any():
+                        with self._stats_lock:
+                            self._stats["frames_unchanged"] += 1
+                        continue
+                    box = changed_box(changed, self.tile_size, width, height)
+                    since_keyframe += 1
+                else:
+                    box = (0, 0, width, height)
+                    since_keyframe = 1
+                    with self._stats_lock:
+                        self._stats["keyframes"] += 1
+                previous = hashes
+                writer.add_frame(qimage_to_rgb_array(image), box, captured_at - self._started_at)
+                lag = (time.perf_counter() - captured_at) * 1000.0
+                with self._stats_lock:
+                    self._stats["frames_encoded"] += 1
+                    self._stats["encode_lag_ms"] = lag
+                    self._stats["max_encode_lag_ms"] = max(self._stats["max_encode_lag_ms"], lag)
+            except Exception as e:
+                log.error("Failed to encode recording frame, stopping: %s", e)
+                with self._stats_lock:
+                    self._stats["encode_errors"] += 1
+                failed = True
+                self._encode_failed.emit()
+        filepath = self.filepath
+        try:
+            # After an encode error this still finishes the frames stored so far
+            writer.close(captured_at - self._started_at)
+        except Exception as e:
+            log.error("Failed to finish recording %s: %s", filepath, e)
+            failed = True
+        stats = self.stats()
+        stats["elapsed"] = time.perf_counter() - self._started_at
+        stats["frames_written"] = writer.frames
+        log.info("Recording finished: %s", stats)
+        self.finished.emit("" if failed else filepath, stats)
@@ -1,18 +1,41 @@
 import sys
+
+if __name__ == "__main__" and {"--capture", "--metrics", "--log"} & set(sys.argv):
+    # Scripted capture or telemetry: ask the running instance without loading Qt
+    from capture_client import main as capture_client_main
+    sys.exit(capture_client_main(sys.argv[1:]))
+
+import logging
 import os
 import threading
 import time
-from datetime import datetime
+
+# Taken before the Qt imports so the startup report covers loading them
+IMPORT_STARTED = time.perf_counter()
+
+from collections import deque
 from PyQt6.QtWidgets import (QApplication, QSystemTrayIcon, QMenu, QWidget, 
                              QVBoxLayout, QPushButton, QLabel, QMessageBox,
                              QDialog, QHBoxLayout, QFileDialog)
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer, QRect, QEventLoop, QCoreApplication, QSharedMemory
-from PyQt6.QtGui import QIcon, QPixmap, QPainter, QPen, QColor, QGuiApplication, QPainter, QPaintEvent, QClipboard
-import pyautogui
-import keyboard
-from PIL import Image, ImageGrab
-import tkinter as tk
-from tkinter import messagebox
+from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer, QRect, QEventLoop, QCoreApplication, QSharedMemory, QUrl
+from PyQt6.QtGui import QIcon, QPixmap, QPainter, QPen, QColor, QGuiApplication, QPainter, QPaintEvent, QClipboard, QImage, QDesktopServices
+from save_pipeline import SavePipeline, capture_timestamp, write_image
+from capture_backends import LazyCaptureBackend
+from burst_capture import BurstCapture
+from frame_dedup import create_deduplicator
+from encoders import create_encoder
+from screenshot_catalog import ScreenshotCatalog
+from capture_server import CaptureServer
+from capture_timeline import CaptureTimeline
+from clipboard_data import DeferredImageMimeData, path_mime_data
+from capture_scheduler import CaptureScheduler
+from retention import RetentionManager
+from roi_capture import ROI_DIRNAME, RoiScheduler, default_config_path, load_roi_config
+from window_readiness import WindowHiddenWaiter
+from settings import DEFAULT_SETTINGS, load_settings
+from telemetry import METRICS_FILENAME, MetricsExporter, configure_logging, metrics, shutdown_logging
+
+log = logging.getLogger(__name__)
 
 # --- Single instance check ---
 shared_memory = QSharedMemory('ScreenshotServiceUniqueKey')
@@ -22,115 +45,342 @@ if not shared_memory.create(1):
     sys.exit(0)
 # --- End single instance check ---
 
+class CaptureResult:
+    """An in-memory capture and the path it is being saved to"""
+    def __init__(self, image, filepath, mode, region=None):
+        self.image = image  # QImage
+        self.filepath = filepath
+        self.mode = mode  # "full" or "cropped"
+        self.region = region  # QRect in global desktop coordinates, for cropped captures
+
 class CroppingWidget(QWidget):
     cropped = pyqtSignal(int, int, int, int)
-    cropped_and_saved = pyqtSignal(str)  # filepath
+    cropped_and_saved = pyqtSignal(object)  # CaptureResult, or None on failure
+    cancelled = pyqtSignal()  # closed (Escape, the window manager, ...) before a selection was made
 
-    def __init__(self, screen_pixmap, parent=None):
+    def __init__(self, screen_pixmap=None, parent=None, desktop_geometry=None):
         super().__init__(parent)
-        print("[DEBUG] CroppingWidget created.")
+        log.debug("CroppingWidget created.")
         self.setWindowFlags(Qt.WindowType.WindowStaysOnTopHint | Qt.WindowType.FramelessWindowHint | Qt.WindowType.Tool | Qt.WindowType.SplashScreen)
-        self.setWindowState(Qt.WindowState.WindowFullScreen)
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
         self.setStyleSheet("background: transparent;")
-        self.screen_pixmap = screen_pixmap
+        self.setCursor(Qt.CursorShape.CrossCursor)
+        self.screen_pixmap = None
+        self._dimmed_pixmap = None
+        self.desktop_geometry = None
+        self.captured_at = None
+        self.timeline = None  # CaptureTimeline of the capture in progress
         self.origin = None
         self.crop_rect = None
-        self.setCursor(Qt.CursorShape.CrossCursor)
-        self.show()
-        self.activateWindow()
-        self.raise_()
-        print("[DEBUG] CroppingWidget shown and raised.")
+        self._awaiting_first_paint = False
+        self._awaiting_result = False  # shown and neither cropped_and_saved nor cancelled emitted yet
         # Set screenshot_dir attribute
+        self.save_pipeline = None
+        self.encoder = None
+        self.screenshot_capture = None
         if parent and hasattr(parent, 'screenshot_capture'):
+            self.screenshot_capture = parent.screenshot_capture
             self.screenshot_dir = parent.screenshot_capture.screenshot_dir
+            self.save_pipeline = parent.screenshot_capture.save_pipeline
+            self.encoder = parent.screenshot_capture.encoder
         else:
             documents_dir = os.path.join(os.path.expanduser("~"), "Documents")
             self.screenshot_dir = os.path.join(documents_dir, "ScreenshotService")
         if not os.path.exists(self.screenshot_dir):
             os.makedirs(self.screenshot_dir)
+        if screen_pixmap is not None:
+            self.begin(screen_pixmap, desktop_geometry)
+
+    def prewarm(self):
+        """Polish the widget and create its native window ahead of the first capture"""
+        self.ensurePolished()
+        self.winId()
+
+    def begin(self, screen_pixmap, desktop_geometry=None, timeline=None):
+        """Show the overlay over a new screen grab, clearing the previous selection"""
+        # Span every monitor when the pixmap covers the virtual desktop; full screen only covers one
+        self.desktop_geometry = desktop_geometry
+        if desktop_geometry is not None:
+            self.setWindowState(Qt.WindowState.WindowNoState)
+            self.setGeometry(desktop_geometry)
+        else:
+            self.setWindowState(Qt.WindowState.WindowFullScreen)
+        self.screen_pixmap = screen_pixmap
+        self._dimmed_pixmap = self._build_dimmed_pixmap(screen_pixmap)
+        self.captured_at = time.time()
+        self.timeline = timeline
+        self.origin = None
+        self.crop_rect = None
+        self._awaiting_first_paint = True
+        self._awaiting_result = True
+        self.show()
+        self.activateWindow()
+        self.raise_()
+        log.debug("CroppingWidget shown and raised.")
 
     def showEvent(self, event):
-        print("[DEBUG] CroppingWidget showEvent triggered.")
+        log.debug("CroppingWidget showEvent triggered.")
         super().showEvent(event)
 
+    def hideEvent(self, event):
+        # Drop the grab (hundreds of MB on large desktops) while the overlay waits for reuse
+        self.screen_pixmap = None
+        self._dimmed_pixmap = None
+        self.origin = None
+        self.crop_rect = None
+        super().hideEvent(event)
+        if self._awaiting_result:
+            # Closed some other way than a selection or Escape; the capture still has to end
+            log.debug("Cropping overlay closed without a selection.")
+            self._awaiting_result = False
+            self.cancelled.emit()
+
+    BORDER_PEN = QPen(QColor(255, 0, 0), 2, Qt.PenStyle.SolidLine)
+    BORDER_MARGIN = 2  # how far the border pen reaches outside crop_rect
+
+    @staticmethod
+    def _build_dimmed_pixmap(screen_pixmap):
+        """Composite the translucent overlay onto the screenshot once"""
+        dimmed = QPixmap(screen_pixmap)
+        painter = QPainter(dimmed)
+        painter.fillRect(QRect(0, 0, dimmed.width(), dimmed.height()), QColor(0, 0, 0, int(255 * 0.5)))
+        painter.end()
+        return dimmed
+
+    def _source_rect(self, rect):
+        """Map a widget rect to pixmap pixel coordinates"""
+        ratio = self.screen_pixmap.devicePixelRatio()
+        if ratio == 1.0:
+            return rect
+        return QRect(int(rect.x() * ratio), int(rect.y() * ratio),
+                     int(rect.width() * ratio), int(rect.height() * ratio))
+
+    def _selection_bounds(self, rect):
+        """Area touched by drawing the selection, including its border"""
+        if rect is None:
+            return QRect()
+        margin = self.BORDER_MARGIN
+        return rect.adjusted(-margin, -margin, margin, margin)
+
     def paintEvent(self, event):
-        painter = QPainter(self)
-        # Draw the full screenshot
-        painter.drawPixmap(0, 0, self.screen_pixmap)
-        # Draw a translucent overlay over the whole screen
-        overlay_color = QColor(0, 0, 0, int(255 * 0.5))
-        painter.fillRect(self.rect(), overlay_color)
-        # If cropping, draw the crop area as a direct copy of the screenshot
-        if self.crop_rect is not None:
-            # Draw the original screenshot in the crop area (makes it look transparent)
-            crop = self.screen_pixmap.copy(self.crop_rect)
-            painter.drawPixmap(self.crop_rect.topLeft(), crop)
-            # Draw a red border around the crop area
-            pen = QPen(QColor(255, 0, 0), 2, Qt.PenStyle.SolidLine)
-            painter.setPen(pen)
-            painter.drawRect(self.crop_rect)
+        if self._dimmed_pixmap is None:
+            return
+        if self._awaiting_first_paint:
+            self._awaiting_first_paint = False
+            if self.timeline is not None:
+                self.timeline.mark("overlay_painted")
+        with metrics.span("overlay_paint"):
+            painter = QPainter(self)
+            dirty = event.rect()
+            # Blit the pre-dimmed screenshot for the dirty area only
+            painter.drawPixmap(dirty, self._dimmed_pixmap, self._source_rect(dirty))
+            # If cropping, draw the crop area straight from the undimmed screenshot
+            if self.crop_rect is not None:
+                visible = self.crop_rect.intersected(dirty)
+                if not visible.isEmpty():
+                    painter.drawPixmap(visible, self.screen_pixmap, self._source_rect(visible))
+                # Draw a red border around the crop area
+                painter.setPen(self.BORDER_PEN)
+                painter.drawRect(self.crop_rect)
+            painter.end()
+
+    def _set_crop_rect(self, crop_rect):
+        """Update the selection and repaint only the area it moved across"""
+        dirty = self._selection_bounds(self.crop_rect).united(self._selection_bounds(crop_rect))
+        self.crop_rect = crop_rect
+        if not dirty.isEmpty():
+            self.update(dirty)
 
     def mousePressEvent(self, event):
-        print(f"[DEBUG] Mouse press at {event.pos()}")
+        log.debug("Mouse press at %s", event.pos())
         self.origin = event.pos()
-        self.crop_rect = None
-        self.update()
+        self._set_crop_rect(None)
 
     def mouseMoveEvent(self, event):
         if self.origin is not None:
-            self.crop_rect = QRect(self.origin, event.pos()).normalized()
-            self.update()
+            self._set_crop_rect(QRect(self.origin, event.pos()).normalized())
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key.Key_Escape:
+            log.debug("Cropping cancelled.")
+            self._awaiting_result = False
+            self.close()
+            self.cancelled.emit()
+            return
+        super().keyPressEvent(event)
 
     def mouseReleaseEvent(self, event):
-        print(f"[DEBUG] Mouse release at {event.pos()}")
+        log.debug("Mouse release at %s", event.pos())
         if self.origin is not None and self.crop_rect is not None:
             x1 = self.crop_rect.left()
             y1 = self.crop_rect.top()
             x2 = self.crop_rect.right()
             y2 = self.crop_rect.bottom()
-            print(f"[DEBUG] Emitting cropped: ({x1}, {y1}, {x2}, {y2})")
+            log.debug("Emitting cropped: (%s, %s, %s, %s)", x1, y1, x2, y2)
+            if self.timeline is not None:
+                self.timeline.mark("selected")
             self.cropped.emit(x1, y1, x2, y2)
-            # Save the cropped image and emit the path
-            crop = self.screen_pixmap.copy(self.crop_rect)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"cropped_screenshot_{timestamp}.png"
+            # Hand the cropped image to the save pipeline and emit the path
+            crop = self.screen_pixmap.copy(self._source_rect(self.crop_rect)).toImage()
+            timestamp = capture_timestamp()
+            extension = self.encoder.extension if self.encoder is not None else "png"
+            filename = f"cropped_screenshot_{timestamp}.{extension}"
             filepath = os.path.join(self.screenshot_dir, filename)
-            crop.save(filepath)
-            print(f"[DEBUG] Cropped screenshot saved: {filepath}")
-            self.cropped_and_saved.emit(filepath)
+            if self.save_pipeline is not None:
+                crop_rect = (x1, y1, self.crop_rect.width(), self.crop_rect.height())
+                if self.desktop_geometry is not None:
+                    # Record the selection in global desktop coordinates
+                    crop_rect = (x1 + self.desktop_geometry.x(), y1 + self.desktop_geometry.y()) + crop_rect[2:]
+                on_written = self.screenshot_capture.write_callback("cropped", crop, self.captured_at, crop_rect,
+                                                                    timeline=self.timeline)
+                if not self.screenshot_capture.submit(crop, filepath, on_written=on_written, encoder=self.encoder):
+                    filepath = None
+                else:
+                    log.debug("Cropped screenshot queued: %s", filepath)
+            else:
+                write_image(crop, filepath, self.encoder)
+                log.debug("Cropped screenshot saved: %s", filepath)
+            region = QRect(self.crop_rect)
+            if self.desktop_geometry is not None:
+                region.translate(self.desktop_geometry.topLeft())
+            self._awaiting_result = False
+            self.cropped_and_saved.emit(CaptureResult(crop, filepath, "cropped", region))
             self.close()
 
     def closeEvent(self, event):
-        print("[DEBUG] CroppingWidget closeEvent triggered.")
+        log.debug("CroppingWidget closeEvent triggered.")
         super().closeEvent(event)
 
 class ScreenshotCapture:
-    def __init__(self):
+    def __init__(self, settings=None, backend=None):
+        self.settings = settings if settings is not None else load_settings()
+        # Created on the first grab or when the app warms it up after the tray icon is shown
+        self.backend = backend if backend is not None else LazyCaptureBackend(
+            self.settings["capture_backend"], all_screens=self.settings["capture_all_screens"])
         documents_dir = os.path.join(os.path.expanduser("~"), "Documents")
         self.screenshot_dir = os.path.join(documents_dir, "ScreenshotService")
         self.ensure_screenshot_dir()
+        self.save_pipeline = SavePipeline()
+        self.deduplicator = create_deduplicator(self.settings)
+        if self.deduplicator is not None:
+            # A failed write must not stay the frame later captures are compared with
+            self.save_pipeline.save_failed.connect(self.on_save_failed)
+        self.encoder = create_encoder(self.settings)
+        self.catalog = ScreenshotCatalog(self.screenshot_dir)
+        # Pick up files written or deleted while the app was not running
+        threading.Thread(target=self.sync_catalog, name="CatalogSync", daemon=True).start()
+
+    def sync_catalog(self):
+        """Catalog files changed while the app was not running, then hash any capture without a perceptual hash"""
+        self.catalog.sync_directory()
+        if self.settings["perceptual_hash"]:
+            from perceptual_hash import index_missing
+            from retention import lower_thread_priority
+            lower_thread_priority()
+            hashed = index_missing(self.catalog)
+            if hashed:
+                log.info("Perceptual hashes added for %s earlier captures.", hashed)
         
     def ensure_screenshot_dir(self):
         """Ensure the screenshots directory exists"""
         if not os.path.exists(self.screenshot_dir):
             os.makedirs(self.screenshot_dir)
     
-    def take_full_screenshot(self):
-        """Take a full screen screenshot"""
-        print("[DEBUG] Taking full screenshot...")
+    def take_full_screenshot(self, timeline=None):
+        """Take a full screen screenshot; returns a CaptureResult, the file is written in the background"""
+        log.debug("Taking full screenshot...")
         try:
-            screenshot = pyautogui.screenshot()
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"full_screenshot_{timestamp}.png"
+            captured_at = time.time()
+            with metrics.span("grab", mode="full"):
+                screenshot = self.backend.grab()
+            if timeline is not None:
+                timeline.mark("grabbed")
+            timestamp = capture_timestamp()
+            filename = f"full_screenshot_{timestamp}.{self.encoder.extension}"
             filepath = os.path.join(self.screenshot_dir, filename)
-            screenshot.save(filepath)
-            print(f"[DEBUG] Full screenshot saved: {filepath}")
-            return filepath
+            to_save, action, encoder = screenshot, "full", self.encoder
+            if self.deduplicator is not None:
+                decision = self.deduplicator.decide(screenshot, filepath)
+                action = decision.action
+                if action == "skip":
+                    metrics.inc("dedup_skipped_total")
+                    log.debug("Full screenshot unchanged, reusing: %s", decision.duplicate_of)
+                    log.debug("Dedup stats: %s", self.deduplicator.stats())
+                    if timeline is not None and timeline.mark("saved", "unchanged, reused"):
+                        log.info("%s", timeline.summary())
+                    return CaptureResult(screenshot, decision.duplicate_of, "full")
+                if action == "delta":
+                    to_save = self.deduplicator.build_delta(screenshot, decision)
+                    filepath = decision.filepath
+                    encoder = None
+            on_written = self.write_callback("full", screenshot, captured_at, dedup_action=action, timeline=timeline)
+            if not self.submit(to_save, filepath, on_written=on_written, encoder=encoder):
+                filepath = None
+            else:
+                if self.deduplicator is not None:
+                    self.deduplicator.commit(decision)
+                log.debug("Full screenshot queued: %s", filepath)
+            metrics.inc("captures_total", mode="full")
+            return CaptureResult(screenshot, filepath, "full")
         except Exception as e:
-            print(f"[ERROR] Error taking full screenshot: {e}")
+            metrics.inc("capture_failures_total", mode="full")
+            log.error("Error taking full screenshot: %s", e)
             return None
     
+    def take_region_screenshot(self, rect, timeline=None):
+        """Grab just rect (global desktop coordinates) without the overlay; returns a CaptureResult"""
+        log.debug("Taking region screenshot of %s...", rect)
+        try:
+            captured_at = time.time()
+            with metrics.span("grab", mode="cropped"):
+                image = self.backend.grab(rect)
+            if timeline is not None:
+                timeline.mark("grabbed")
+            timestamp = capture_timestamp()
+            filepath = os.path.join(self.screenshot_dir, f"cropped_screenshot_{timestamp}.{self.encoder.extension}")
+            crop_rect = (rect.x(), rect.y(), rect.width(), rect.height())
+            on_written = self.write_callback("cropped", image, captured_at, crop_rect, timeline=timeline)
+            if not self.submit(image, filepath, on_written=on_written, encoder=self.encoder):
+                filepath = None
+            metrics.inc("captures_total", mode="cropped")
+            return CaptureResult(image, filepath, "cropped", QRect(rect))
+        except Exception as e:
+            metrics.inc("capture_failures_total", mode="cropped")
+            log.error("Error taking region screenshot: %s", e)
+            return None
+
+    def submit(self, image, filepath, on_written=None, encoder=None):
+        """Queue a capture for saving without blocking the GUI thread
+
+        When the queue is full (ROI captures and the capture API share it)
+        the capture is dropped and reported through save_failed.
+        """
+        if self.save_pipeline.submit(image, filepath, block=False, on_written=on_written, encoder=encoder):
+            return True
+        self.save_pipeline.save_failed.emit(filepath, "too many captures are waiting to be saved")
+        return False
+
+    def on_save_failed(self, filepath, error):
+        if self.deduplicator.discard(filepath):
+            log.debug("Dedup reference %s was not written, starting a new keyframe.", filepath)
+
+    def write_callback(self, mode, image, captured_at, crop_rect=None, dedup_action=None, timeline=None):
+        """Build the save pipeline's on_written callback that catalogs the file"""
+        width, height = image.width(), image.height()
+        catalog, dedup = self.catalog, self.deduplicator
+        hash_image = self.settings["perceptual_hash"]
+        def on_written(filepath, nbytes, seconds):
+            if timeline is not None and timeline.mark("saved"):
+                log.info("%s", timeline.summary())
+            if dedup is not None and dedup_action is not None:
+                dedup.observe_write(dedup_action, nbytes, seconds)
+            catalog.record(filepath, mode, captured_at, width, height, crop_rect, nbytes)
+            if hash_image:
+                # Hashed from the captured image, also when the file holds a delta frame
+                from perceptual_hash import phash
+                catalog.set_perceptual_hash(filepath, phash(image))
+        return on_written
+
     def take_cropped_screenshot_pyqt(self, parent=None, tray_icon=None):
         # Deprecated: now handled asynchronously
         return None
@@ -138,14 +388,13 @@ class ScreenshotCapture:
 class ScreenshotDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
-        print("[DEBUG] ScreenshotDialog created.")
+        log.debug("ScreenshotDialog created.")
         self.setWindowTitle("Screenshot Options")
         self.setFixedSize(300, 150)
         self.setWindowFlags(Qt.WindowType.WindowStaysOnTopHint | Qt.WindowType.Window)
         self.setWindowModality(Qt.WindowModality.ApplicationModal)
-        self.activateWindow()
-        self.raise_()
-        self.show()
+        self.timeline = None
+        self._awaiting_first_paint = False
 
         layout = QVBoxLayout()
         instruction_label = QLabel("Choose screenshot type:")
@@ -162,43 +411,143 @@ class ScreenshotDialog(QDialog):
         layout.addWidget(cancel_btn)
         self.setLayout(layout)
         self.choice = None
+        self._first_button = full_screenshot_btn
 
         # For debugging: auto-select full screenshot after 2 seconds
         # from PyQt6.QtCore import QTimer
         # QTimer.singleShot(2000, self.accept_full)
 
+    def prewarm(self):
+        """Polish and lay out the dialog and create its native window while hidden"""
+        self.ensurePolished()
+        self.layout().activate()
+        self.winId()
+
+    def present(self, timeline=None):
+        """Show the dialog again with the previous choice cleared"""
+        self.choice = None
+        self.timeline = timeline
+        self._awaiting_first_paint = True
+        self._first_button.setFocus()
+        self.show()
+        self.activateWindow()
+        self.raise_()
+
+    def paintEvent(self, event):
+        if self._awaiting_first_paint:
+            self._awaiting_first_paint = False
+            if self.timeline is not None:
+                self.timeline.mark("dialog_painted")
+        super().paintEvent(event)
+
     def accept_full(self):
-        print("[DEBUG] Full Screen Screenshot button clicked.")
+        log.debug("Full Screen Screenshot button clicked.")
         self.choice = "full"
         self.accept()
     def accept_cropped(self):
-        print("[DEBUG] Cropped Screenshot button clicked.")
+        log.debug("Cropped Screenshot button clicked.")
         self.choice = "cropped"
         self.accept()
     def reject(self):
-        print("[DEBUG] ScreenshotDialog cancelled.")
+        log.debug("ScreenshotDialog cancelled.")
         super().reject()
 
 class HotkeyListener(QThread):
-    screenshot_triggered = pyqtSignal()
-    
+    triggered = pyqtSignal(str, float)  # action, time.perf_counter() of the key press
+
+    def __init__(self, bindings, parent=None):
+        super().__init__(parent)
+        self.bindings = bindings  # action -> key combination, e.g. {"region": "shift+f12"}
+
     def run(self):
-        """Listen for F12 key press"""
-        keyboard.on_press_key("F12", lambda _: self.screenshot_triggered.emit())
+        """Register the configured hotkeys and wait for key presses"""
+        # Imported here so installing the keyboard hook does not delay the tray icon
+        try:
+            import keyboard
+            for action, combination in self.bindings.items():
+                if combination:
+                    keyboard.add_hotkey(combination, self._on_hotkey, args=(action,))
+        except Exception as e:
+            # An exception escaping run() would abort the whole app
+            log.error("Could not install the keyboard hook, hotkeys are disabled: %r", e)
+            return
         keyboard.wait()
 
+    def _on_hotkey(self, action):
+        self.triggered.emit(action, time.perf_counter())
+
 class ScreenshotApp(QWidget):
-    def __init__(self):
+    _prepared = pyqtSignal(float)  # time.perf_counter() the background warm-up started
+
+    def __init__(self, startup_report=None, settings=None):
         super().__init__()
-        self.screenshot_capture = ScreenshotCapture()
-        self.hotkey_listener = HotkeyListener()
-        self.hotkey_listener.screenshot_triggered.connect(self.show_screenshot_dialog)
-        print("[DEBUG] ScreenshotApp initialized.")
+        self.startup_report = startup_report  # path to write startup measurements to, then quit
+        self.screenshot_capture = ScreenshotCapture(settings)
+        settings = self.screenshot_capture.settings
+        self.scheduler = CaptureScheduler(
+            debounce_ms=int(settings["hotkey_debounce_ms"]),
+            max_queue=int(settings["hotkey_max_queue"]),
+            parent=self
+        )
+        self.scheduler.dispatch.connect(self.run_action)
+        self.hotkey_listener = HotkeyListener({**DEFAULT_SETTINGS["hotkeys"], **settings["hotkeys"]})
+        self.hotkey_listener.triggered.connect(self.scheduler.trigger)
+        self.burst_capture = BurstCapture(
+            self.screenshot_capture.backend,
+            self.screenshot_capture.screenshot_dir,
+            buffer_bytes=int(settings["burst_buffer_mb"]) * 1024 * 1024,
+            deduplicator_factory=lambda: create_deduplicator(settings),
+            encoder=self.screenshot_capture.encoder,
+            catalog=self.screenshot_capture.catalog,
+            parent=self
+        )
+        self.burst_capture.finished.connect(self.on_burst_finished)
+        self.screen_recorder = None  # created on the first recording
+        self.screenshot_capture.save_pipeline.saved.connect(self.on_screenshot_saved)
+        self.screenshot_capture.save_pipeline.save_failed.connect(self.on_screenshot_save_failed)
+        self.capture_server = CaptureServer(
+            self.screenshot_capture,
+            max_pending=int(settings["capture_api_max_pending"]),
+            parent=self
+        )
+        if settings["capture_api"]:
+            self.capture_server.start()
+        self.retention = RetentionManager(
+            settings,
+            self.screenshot_capture.screenshot_dir,
+            self.screenshot_capture.catalog,
+            is_busy=self.capture_busy
+        )
+        self.roi_scheduler = None
+        self.metrics_exporter = None
+        if settings["metrics"]:
+            self.metrics_exporter = MetricsExporter(
+                metrics,
+                settings["metrics_file"] or os.path.join(self.screenshot_capture.screenshot_dir, METRICS_FILENAME),
+                interval=float(settings["metrics_interval_seconds"])
+            )
+        log.debug("ScreenshotApp initialized.")
         self.hotkey_listener.start()
         self.create_system_tray()
         self.hide()
-        self._cropping_widget = None
-        self._original_pos = None
+        # Created once and reused so a capture does not pay for building windows
+        self.screenshot_dialog = ScreenshotDialog(self)
+        self.screenshot_dialog.finished.connect(self.on_dialog_finished)
+        self.screenshot_dialog.prewarm()
+        self._cropping_widget = CroppingWidget(None, self)
+        self._cropping_widget.cropped_and_saved.connect(self.on_cropped_and_saved)
+        self._cropping_widget.cancelled.connect(self.finish_capture)
+        self._cropping_widget.prewarm()
+        self._last_region = None
+        self._restore_main_window = False
+        self._history_window = None
+        self._hidden_waiter = None
+        self._timeline = None
+        self.recent_timelines = deque(maxlen=50)
+        self._quitting = False
+        self._prepared.connect(self.finish_warm_up)
+        # Let the event loop show the tray icon before loading the capture backend
+        QTimer.singleShot(0, self.warm_up)
 
     def create_system_tray(self):
         self.tray_icon = QSystemTrayIcon(self)
@@ -207,60 +556,195 @@ class ScreenshotApp(QWidget):
         tray_menu = QMenu()
         open_folder_action = tray_menu.addAction("Open Screenshots Folder")
         open_folder_action.triggered.connect(self.open_screenshots_folder)
+        history_action = tray_menu.addAction("Capture History")
+        history_action.triggered.connect(self.show_history)
         tray_menu.addSeparator()
         take_screenshot_action = tray_menu.addAction("Take Screenshot Now")
-        take_screenshot_action.triggered.connect(self.show_screenshot_dialog)
+        take_screenshot_action.triggered.connect(lambda: self.scheduler.trigger("dialog"))
+        burst_action = tray_menu.addAction("Start/Stop Burst Capture")
+        burst_action.triggered.connect(lambda: self.scheduler.trigger("burst"))
+        record_action = tray_menu.addAction("Start/Stop Recording")
+        record_action.triggered.connect(lambda: self.scheduler.trigger("record"))
         tray_menu.addSeparator()
         quit_action = tray_menu.addAction("Quit")
         quit_action.triggered.connect(self.quit_app)
         self.tray_icon.setContextMenu(tray_menu)
         self.tray_icon.setToolTip("Screenshot Service (Press F12 to capture)")
         self.tray_icon.show()
+        self._tray_shown = (time.time(), time.perf_counter())
         self.tray_icon.showMessage(
             "Screenshot Service",
             "Service is running. Press F12 to take a screenshot.",
             QSystemTrayIcon.MessageIcon.Information,
             3000
         )
-        print("[DEBUG] System tray created.")
+        log.debug("System tray created.")
     
-    def show_screenshot_dialog(self):
-        print("[DEBUG] show_screenshot_dialog called.")
+    def warm_up(self):
+        """Benchmark the capture backends and load the encoder's modules on a background thread
+
+        The GUI thread stays free for the tray; finish_warm_up() gets the
+        result through a queued signal.
+        """
+        started = time.perf_counter()
+        def prepare():
+            try:
+                self.screenshot_capture.backend.prepare()
+            except Exception as e:
+                log.error("Capture backend benchmark failed: %s", e)
+            self.screenshot_capture.encoder.warm_up()
+            try:
+                self._prepared.emit(started)
+            except RuntimeError:
+                pass  # the app was deleted meanwhile
+        threading.Thread(target=prepare, name="WarmUp", daemon=True).start()
+
+    def finish_warm_up(self, started):
+        """Create the backend on the GUI thread from the benchmark result and start the background services"""
+        if self._quitting:
+            return
+        self.screenshot_capture.backend.warm_up()
+        log.info("Tray shown %.1f ms after import, capture backend warmed in %.1f ms.",
+                 (self._tray_shown[1] - IMPORT_STARTED) * 1000, (time.perf_counter() - started) * 1000)
+        self.retention.start()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.start()
+        self.start_roi_capture()
+        if self.startup_report:
+            from startup_report import write_startup_report
+            write_startup_report(
+                self.startup_report,
+                tray_shown_at=self._tray_shown[0],
+                import_to_tray_ms=(self._tray_shown[1] - IMPORT_STARTED) * 1000.0,
+                import_to_warm_ms=(time.perf_counter() - IMPORT_STARTED) * 1000.0,
+                backend=self.screenshot_capture.backend.name,
+            )
+            self.quit_app()
+
+    def start_roi_capture(self):
+        """Start the scheduled region captures from the config file, if there is one"""
+        capture = self.screenshot_capture
+        config_path = capture.settings["roi_config"] or default_config_path(capture.screenshot_dir)
+        if not os.path.exists(config_path):
+            return
+        try:
+            regions, group_window_ms = load_roi_config(config_path)
+        except (OSError, ValueError) as e:
+            log.error("Region captures disabled: %s", e)
+            return
+        self.roi_scheduler = RoiScheduler(
+            capture.backend,
+            regions,
+            os.path.join(capture.screenshot_dir, ROI_DIRNAME),
+            capture.save_pipeline,
+            encoder=capture.encoder,
+            group_window_ms=group_window_ms,
+            # Wait while the dialog or overlay is up so they never end up in a region capture
+            is_paused=lambda: self.scheduler.in_flight is not None,
+            parent=self
+        )
+        self.roi_scheduler.start()
+        log.info("Capturing %s regions on a schedule from %s", len(regions), config_path)
+
+    def capture_busy(self):
+        """True while a capture is being taken or written; background maintenance waits for it"""
+        return (self.scheduler.in_flight is not None or self.burst_capture.is_running()
+                or (self.screen_recorder is not None and self.screen_recorder.is_running())
+                or self.screenshot_capture.save_pipeline.pending() > 0)
+
+    def run_action(self, action, triggered_at):
+        """Start a capture dispatched by the scheduler"""
+        log.debug("run_action: %s", action)
+        if action == "burst":
+            self.toggle_burst_capture()
+        elif action == "record":
+            self.toggle_recording()
+        elif action == "dialog":
+            self.show_screenshot_dialog(triggered_at)
+        elif action == "full":
+            self.start_capture("full", triggered_at, self.take_full_screenshot_and_restore)
+        elif action == "repeat_region" and self._last_region is not None:
+            self.start_capture("cropped", triggered_at, self.capture_last_region)
+        else:
+            # "region", or "repeat_region" before any region was selected
+            self.start_capture("cropped", triggered_at, self.start_cropping_async)
+
+    def show_screenshot_dialog(self, triggered_at=None):
+        """Show the capture type dialog; on_dialog_finished continues without nesting the event loop"""
+        log.debug("show_screenshot_dialog called.")
+        timeline = CaptureTimeline(started_at=triggered_at)
+        timeline.mark("hotkey", at=timeline.started_at)
+        self._timeline = timeline
         self.activateWindow()
         self.raise_()
-        dialog = ScreenshotDialog(self)
-        result = dialog.exec()
-        print(f"[DEBUG] ScreenshotDialog result: {result}, choice: {dialog.choice}")
-        if result == QDialog.DialogCode.Accepted:
-            if dialog.choice == "full":
-                self._original_pos = self.pos()
-                print(f"[DEBUG] Moving main window off-screen from {self._original_pos} for full screenshot.")
-                self.move(-10000, -10000)
-                QTimer.singleShot(250, self.take_full_screenshot_and_restore)
-            elif dialog.choice == "cropped":
-                self._original_pos = self.pos()
-                print(f"[DEBUG] Moving main window off-screen from {self._original_pos}.")
-                self.move(-10000, -10000)
-                QTimer.singleShot(250, self.start_cropping_async)
+        self.screenshot_dialog.present(timeline)
+        timeline.mark("dialog")
+
+    def on_dialog_finished(self, result):
+        dialog = self.screenshot_dialog
+        log.debug("ScreenshotDialog result: %s, choice: %s", result, dialog.choice)
+        timeline = self._timeline
+        if result != QDialog.DialogCode.Accepted or dialog.choice not in ("full", "cropped"):
+            self.finish_capture()
+            return
+        timeline.mode = dialog.choice
+        timeline.mark("choice")
+        self.recent_timelines.append(timeline)
+        next_step = self.take_full_screenshot_and_restore if dialog.choice == "full" else self.start_cropping_async
+        self.wait_until_hidden(dialog, next_step)
+
+    def start_capture(self, mode, triggered_at, next_step):
+        """Begin a capture that skips the dialog"""
+        timeline = CaptureTimeline(mode, started_at=triggered_at)
+        timeline.mark("hotkey", at=timeline.started_at)
+        self._timeline = timeline
+        self.recent_timelines.append(timeline)
+        self.wait_until_hidden(None, next_step)
+
+    def finish_capture(self):
+        """The current capture is over: restore the window and let the scheduler start the next"""
+        self._timeline = None
+        self.restore_main_window()
+        self.scheduler.capture_finished()
+
+    def wait_until_hidden(self, dialog, next_step):
+        """Run next_step once the dialog and main window are off the screen"""
+        self._restore_main_window = self.isVisible()
+        widgets = [widget for widget in (dialog, self if self._restore_main_window else None) if widget is not None]
+        if not widgets:
+            next_step()
+            return
+        waiter = WindowHiddenWaiter(widgets, timeout_ms=int(self.screenshot_capture.settings["hide_timeout_ms"]),
+                                    parent=self)
+        def on_ready(reason):
+            self._timeline.mark("hidden", reason)
+            log.debug("Windows hidden (%s), capturing.", reason)
+            self._hidden_waiter = None
+            waiter.deleteLater()
+            next_step()
+        waiter.ready.connect(on_ready)
+        self._hidden_waiter = waiter
+        waiter.start()
 
     def start_cropping_async(self):
-        print("[DEBUG] start_cropping_async called.")
-        app = QApplication.instance()
-        screen = QGuiApplication.primaryScreen()
-        if screen is None:
-            print("[ERROR] No primary screen found.")
-            self.showNormal()
+        log.debug("start_cropping_async called.")
+        backend = self.screenshot_capture.backend
+        try:
+            desktop_geometry = backend.desktop_geometry()
+            with metrics.span("grab", mode="overlay"):
+                pixmap = QPixmap.fromImage(backend.grab(desktop_geometry))
+        except Exception as e:
+            metrics.inc("capture_failures_total", mode="cropped")
+            log.error("Error grabbing screen for cropping: %s", e)
+            self.finish_capture()
             return
-        pixmap = screen.grabWindow(0)
-        self._cropping_widget = CroppingWidget(pixmap, self)
-        self._cropping_widget.cropped_and_saved.connect(self.on_cropped_and_saved)
-        self._cropping_widget.show()
-        self._cropping_widget.activateWindow()
-        self._cropping_widget.raise_()
+        if self._timeline is not None:
+            self._timeline.mark("grabbed")
+        self._cropping_widget.begin(pixmap, desktop_geometry, self._timeline)
 
-    def on_cropped_and_saved(self, filepath):
-        print(f"[DEBUG] on_cropped_and_saved: {filepath}")
-        if not filepath:
+    def on_cropped_and_saved(self, result):
+        log.debug("on_cropped_and_saved: %s", result.filepath if result else None)
+        if result is None:
             self.tray_icon.showMessage(
                 "Error",
                 "Failed to capture cropped screenshot",
@@ -268,30 +752,161 @@ class ScreenshotApp(QWidget):
                 3000
             )
         else:
-            # Copy cropped screenshot to clipboard
-            clipboard = QGuiApplication.clipboard()
-            pixmap = QPixmap(filepath)
-            clipboard.setPixmap(pixmap, QClipboard.Mode.Clipboard)
-            print(f"[DEBUG] Cropped screenshot copied to clipboard: {filepath}")
-        # Move main window back to original position
-        if self._original_pos is not None:
-            print(f"[DEBUG] Restoring main window to {self._original_pos}.")
-            self.move(self._original_pos)
-            self._original_pos = None
-        if self._cropping_widget is not None:
-            self._cropping_widget.deleteLater()
-            self._cropping_widget = None
+            self.copy_to_clipboard(result)
+            if self._timeline is not None and self._timeline.mark("clipboard", self._clipboard_mode()):
+                log.info("%s", self._timeline.summary())
+            self._last_region = result.region
+        self.finish_capture()
+
+    def capture_last_region(self):
+        """Repeat-region hotkey: grab the previously selected area again"""
+        result = self.screenshot_capture.take_region_screenshot(self._last_region, self._timeline)
+        if result is None:
+            self.tray_icon.showMessage(
+                "Error",
+                "Failed to capture the last region",
+                QSystemTrayIcon.MessageIcon.Warning,
+                3000
+            )
+        else:
+            self.copy_to_clipboard(result)
+            if self._timeline is not None and self._timeline.mark("clipboard", self._clipboard_mode()):
+                log.info("%s", self._timeline.summary())
+        self.finish_capture()
+
+    def _clipboard_mode(self):
+        return self.screenshot_capture.settings["clipboard"]
+
+    def copy_to_clipboard(self, result):
+        """Publish a capture on the clipboard as set by the clipboard setting
+
+        In image mode nothing is encoded here: the clipboard gets the
+        in-memory image and converts it only if something is pasted.
+        """
+        mode = self._clipboard_mode()
+        if mode == "none":
+            return
+        with metrics.span("clipboard", mode=mode):
+            if mode == "path":
+                if result.filepath is None:
+                    return
+                data = path_mime_data(result.filepath)
+            else:
+                data = DeferredImageMimeData(result.image, result.filepath)
+            QGuiApplication.clipboard().setMimeData(data, QClipboard.Mode.Clipboard)
+        log.debug("Screenshot published to the clipboard (%s).", mode)
+
+    def on_screenshot_saved(self, filepath):
+        log.debug("on_screenshot_saved: %s", filepath)
+
+    def on_screenshot_save_failed(self, filepath, error):
+        self.tray_icon.showMessage(
+            "Error",
+            f"Failed to save screenshot: {error}",
+            QSystemTrayIcon.MessageIcon.Warning,
+            3000
+        )
+
+    def toggle_burst_capture(self):
+        """Start a burst with the configured rate and duration, or stop the running one"""
+        if self.burst_capture.is_running():
+            log.debug("Stopping burst capture.")
+            self.burst_capture.stop()
+            return
+        settings = self.screenshot_capture.settings
+        try:
+            self.burst_capture.start(float(settings["burst_rate"]), float(settings["burst_duration"]))
+        except Exception as e:
+            log.error("Error starting burst capture: %s", e)
+            self.tray_icon.showMessage(
+                "Error",
+                "Failed to start burst capture",
+                QSystemTrayIcon.MessageIcon.Warning,
+                3000
+            )
+
+    def on_burst_finished(self, stats):
+        message = f"Saved {stats['frames_written']} frames"
+        if stats["frames_deduplicated"]:
+            message += f", skipped {stats['frames_deduplicated']} unchanged"
+        if stats["frames_dropped"]:
+            message += f", dropped {stats['frames_dropped']} (encoder could not keep up)"
+        self.tray_icon.showMessage(
+            "Burst Capture",
+            message,
+            QSystemTrayIcon.MessageIcon.Information,
+            3000
+        )
+
+    def toggle_recording(self):
+        """Start recording the screen with the record_* settings, or stop the running recording"""
+        if self.screen_recorder is not None and self.screen_recorder.is_running():
+            log.debug("Stopping recording.")
+            self.screen_recorder.stop()
+            return
+        capture = self.screenshot_capture
+        settings = capture.settings
+        try:
+            from screen_recorder import RECORDINGS_DIRNAME, ScreenRecorder
+            self.screen_recorder = ScreenRecorder(
+                capture.backend,
+                os.path.join(capture.screenshot_dir, RECORDINGS_DIRNAME),
+                fmt=settings["record_format"],
+                fps=float(settings["record_fps"]),
+                max_queue=int(settings["record_queue_frames"]),
+                keyframe_interval=int(settings["record_keyframe_interval"]),
+                png_level=int(settings["record_png_level"]),
+                webp_options={
+                    "lossless": bool(settings["webp_lossless"]),
+                    "quality": int(settings["webp_quality"]),
+                    "method": int(settings["webp_method"]),
+                },
+                parent=self
+            )
+            self.screen_recorder.finished.connect(self.on_recording_finished)
+            self.screen_recorder.start()
+        except Exception as e:
+            log.error("Error starting recording: %s", e)
+            self.screen_recorder = None
+            self.tray_icon.showMessage(
+                "Error",
+                f"Failed to start recording: {e}",
+                QSystemTrayIcon.MessageIcon.Warning,
+                3000
+            )
+            return
+        self.tray_icon.setToolTip("Screenshot Service (recording, Ctrl+Shift+F12 to stop)")
+
+    def on_recording_finished(self, filepath, stats):
+        self.tray_icon.setToolTip("Screenshot Service (Press F12 to capture)")
+        if not filepath:
+            self.tray_icon.showMessage(
+                "Error",
+                "Recording failed",
+                QSystemTrayIcon.MessageIcon.Warning,
+                3000
+            )
+            return
+        message = f"Saved {stats['frames_written']} frames to {os.path.basename(filepath)}"
+        if stats["frames_dropped"]:
+            message += f", dropped {stats['frames_dropped']} (encoder could not keep up)"
+        self.tray_icon.showMessage(
+            "Recording",
+            message,
+            QSystemTrayIcon.MessageIcon.Information,
+            3000
+        )
 
     def showNormal(self):
-        print("[DEBUG] showNormal called.")
+        log.debug("showNormal called.")
         super().showNormal()
 
     def hide(self):
-        print("[DEBUG] hide called.")
+        log.debug("hide called.")
         super().hide()
 
     def setVisible(self, visible):
-        print(f"[DEBUG] setVisible({visible}) called.")
+        log.debug("setVisible(%s) called.", visible)
         super().setVisible(visible)
     
     def take_full_screenshot(self):
@@ -303,25 +918,51 @@ class ScreenshotApp(QWidget):
         pass
     
     def open_screenshots_folder(self):
-        """Open the screenshots folder in file explorer"""
-        os.startfile(self.screenshot_capture.screenshot_dir)
+        """Open the screenshots folder in the platform's file manager"""
+        QDesktopServices.openUrl(QUrl.fromLocalFile(self.screenshot_capture.screenshot_dir))
+
+    def show_history(self):
+        """Show the thumbnail history window, creating it on first use"""
+        if self._history_window is None:
+            from history_window import HistoryWindow
+            self._history_window = HistoryWindow(
+                self.screenshot_capture.catalog, self.screenshot_capture.screenshot_dir, self
+            )
+        self._history_window.show()
+        self._history_window.raise_()
+        self._history_window.activateWindow()
     
     def quit_app(self):
         """Quit the application"""
+        self._quitting = True
         self.hotkey_listener.terminate()
         self.hotkey_listener.wait()
+        self.capture_server.close()
+        self.retention.stop()
+        if self.roi_scheduler is not None:
+            self.roi_scheduler.stop()
+        self.burst_capture.stop(wait=True)
+        if self.screen_recorder is not None:
+            self.screen_recorder.stop(wait=True)
+        if self._history_window is not None:
+            self._history_window.thumbnails.shutdown()
+        self.screenshot_capture.save_pipeline.shutdown(wait=True)
+        self.screenshot_capture.catalog.close()
+        self.screenshot_capture.backend.close()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
+        shutdown_logging()
         QApplication.quit()
 
     def take_full_screenshot_and_restore(self):
-        print("[DEBUG] take_full_screenshot_and_restore called.")
-        # Take screenshot and save to file
-        filepath = self.screenshot_capture.take_full_screenshot()
-        if filepath:
-            # Copy to clipboard
-            clipboard = QGuiApplication.clipboard()
-            pixmap = QPixmap(filepath)
-            clipboard.setPixmap(pixmap, QClipboard.Mode.Clipboard)
-            print(f"[DEBUG] Full screenshot saved and copied to clipboard: {filepath}")
+        log.debug("take_full_screenshot_and_restore called.")
+        # Take screenshot; the file is written by the save pipeline
+        result = self.screenshot_capture.take_full_screenshot(self._timeline)
+        if result is not None:
+            self.copy_to_clipboard(result)
+            if self._timeline is not None and self._timeline.mark("clipboard", self._clipboard_mode()):
+                log.info("%s", self._timeline.summary())
+            log.debug("Full screenshot saving to: %s", result.filepath)
         else:
             self.tray_icon.showMessage(
                 "Error",
@@ -329,18 +970,28 @@ class ScreenshotApp(QWidget):
                 QSystemTrayIcon.MessageIcon.Warning,
                 3000
             )
-        if self._original_pos is not None:
-            print(f"[DEBUG] Restoring main window to {self._original_pos} after full screenshot.")
-            self.move(self._original_pos)
-            self._original_pos = None
+        self.finish_capture()
+
+    def restore_main_window(self):
+        """Show the main window again if it was visible before the capture"""
+        if self._restore_main_window:
+            log.debug("Restoring main window after capture.")
+            self._restore_main_window = False
+            self.showNormal()
 
 def main():
     # Create application without showing console window
     app = QApplication(sys.argv)
     app.setQuitOnLastWindowClosed(False)
+    settings = load_settings()
+    configure_logging(settings["log_level"], int(settings["log_buffer_lines"]))
+    metrics.enabled = bool(settings["metrics"])
     
-    # Create and show the main application
-    screenshot_app = ScreenshotApp()
+    # Create and show the main application; --startup-report PATH measures startup, then quits
+    report_path = None
+    if "--startup-report" in sys.argv[1:-1]:
+        report_path = sys.argv[sys.argv.index("--startup-report") + 1]
+    screenshot_app = ScreenshotApp(startup_report=report_path, settings=settings)
     
     # Run the application
     sys.exit(app.exec())
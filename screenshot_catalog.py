@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Indexed SQLite catalog of the screenshots in the screenshot directory
+
+Usage:
+    python screenshot_catalog.py list [--since 2024-01-31] [--until 2024-02-01T12:00] [--mode full] [--limit 50] [--page-token TOKEN]
+    python screenshot_catalog.py rebuild
+    python screenshot_catalog.py stats
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+log = logging.getLogger(__name__)
+
+CATALOG_FILENAME = "catalog.sqlite3"
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".qoi", ".bmp"}
+
+# full_screenshot_20240131_093000.png, cropped_screenshot_..., burst_20240131_093000_123456_000042.png
+_FILENAME_PATTERN = re.compile(r"^(full_screenshot|cropped_screenshot|burst)_(\d{8}_\d{6})")
+_FILENAME_MODES = {"full_screenshot": "full", "cropped_screenshot": "cropped", "burst": "burst"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS screenshots (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    captured_at REAL NOT NULL,
+    mode TEXT NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    crop_x INTEGER,
+    crop_y INTEGER,
+    crop_width INTEGER,
+    crop_height INTEGER,
+    size_bytes INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS screenshots_captured_at ON screenshots (captured_at, id);
+CREATE INDEX IF NOT EXISTS screenshots_mode_captured_at ON screenshots (mode, captured_at, id);
+CREATE TABLE IF NOT EXISTS perceptual_hashes (
+    screenshot_id INTEGER PRIMARY KEY,
+    hash INTEGER,
+    b0 INTEGER,
+    b1 INTEGER,
+    b2 INTEGER,
+    b3 INTEGER
+);
+CREATE INDEX IF NOT EXISTS perceptual_hashes_b0 ON perceptual_hashes (b0);
+CREATE INDEX IF NOT EXISTS perceptual_hashes_b1 ON perceptual_hashes (b1);
+CREATE INDEX IF NOT EXISTS perceptual_hashes_b2 ON perceptual_hashes (b2);
+CREATE INDEX IF NOT EXISTS perceptual_hashes_b3 ON perceptual_hashes (b3);
+"""
+
+# A 64-bit perceptual hash is stored with its four 16-bit bands indexed separately
+# (multi-index hashing): two hashes within distance d share a band within d // 4 bits
+PERCEPTUAL_HASH_BANDS = 4
+# Deleting an entry deletes its perceptual hash in the same transaction; ids of
+# deleted rows can be reused, and a new entry must not inherit a stale hash
+_DELETE_PERCEPTUAL_HASH = "DELETE FROM perceptual_hashes WHERE screenshot_id IN (SELECT id FROM screenshots WHERE path = ?)"
+_DELETE_SCREENSHOT = "DELETE FROM screenshots WHERE path = ?"
+# Values bound per query; SQLite before 3.32 allows no more than 999 variables
+_MAX_SQL_VARIABLES = 900
+
+_COLUMNS = ("id", "path", "captured_at", "mode", "width", "height", "crop_x", "crop_y",
+            "crop_width", "crop_height", "size_bytes", "content_hash", "mtime")
+
+
+def file_hash(path):
+    """BLAKE2b digest of a file's bytes"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def image_size(path):
+    """Width and height read from the image header, or (None, None)"""
+    from PyQt6.QtGui import QImageReader
+    size = QImageReader(path).size()
+    if size.isValid():
+        return size.width(), size.height()
+    return None, None
+
+
+def hash_bands(value):
+    """The 16-bit bands of a 64-bit perceptual hash, lowest first"""
+    return [(value >> (16 * band)) & 0xFFFF for band in range(PERCEPTUAL_HASH_BANDS)]
+
+
+def parse_filename(name):
+    """Mode and capture time encoded in a screenshot filename, or (None, None)"""
+    match = _FILENAME_PATTERN.match(name)
+    if not match:
+        return None, None
+    captured = datetime.strptime(match.group(2), "%Y%m%d_%H%M%S")
+    return _FILENAME_MODES[match.group(1)], captured.timestamp()
+
+
+class ScreenshotCatalog:
+    """Thread-safe catalog of saved screenshots backed by one SQLite file"""
+
+    def __init__(self, screenshot_dir, db_path=None):
+        self.screenshot_dir = screenshot_dir
+        self.db_path = db_path or os.path.join(screenshot_dir, CATALOG_FILENAME)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def record(self, path, mode, captured_at=None, width=None, height=None, crop_rect=None,
+               size_bytes=None, content_hash=None):
+        """Add or update the entry for a file that has just been written
+
+        crop_rect is an (x, y, width, height) tuple for cropped captures.
+        Size and hash are read from the file when not given.
+        """
+        stat = os.stat(path)
+        if size_bytes is None:
+            size_bytes = stat.st_size
+        if content_hash is None:
+            content_hash = file_hash(path)
+        crop_x, crop_y, crop_width, crop_height = crop_rect if crop_rect else (None, None, None, None)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO screenshots (path, captured_at, mode, width, height, crop_x, crop_y, crop_width,"
+                " crop_height, size_bytes, content_hash, mtime) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(path) DO UPDATE SET captured_at=excluded.captured_at, mode=excluded.mode,"
+                " width=excluded.width, height=excluded.height, crop_x=excluded.crop_x, crop_y=excluded.crop_y,"
+                " crop_width=excluded.crop_width, crop_height=excluded.crop_height,"
+                " size_bytes=excluded.size_bytes, content_hash=excluded.content_hash, mtime=excluded.mtime",
+                (os.path.abspath(path), captured_at if captured_at is not None else stat.st_mtime, mode,
+                 width, height, crop_x, crop_y, crop_width, crop_height, size_bytes, content_hash,
+                 stat.st_mtime),
+            )
+
+    def remove(self, path):
+        path = os.path.abspath(path)
+        with self._lock, self._conn:
+            self._conn.execute(_DELETE_PERCEPTUAL_HASH, (path,))
+            self._conn.execute(_DELETE_SCREENSHOT, (path,))
+
+    def query(self, since=None, until=None, mode=None, limit=50, page_token=None):
+        """Newest-first page of entries and the token for the next page (None at the end)
+
+        since / until are Unix timestamps (inclusive / exclusive). Pages use
+        keyset pagination on (captured_at, id), so deep pages cost the same
+        as the first one.
+        """
+        clauses, params = [], []
+        if since is not None:
+            clauses.append("captured_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("captured_at < ?")
+            params.append(until)
+        if mode is not None:
+            clauses.append("mode = ?")
+            params.append(mode)
+        if page_token:
+            captured_at, row_id = page_token.split(":")
+            clauses.append("(captured_at < ? OR (captured_at = ? AND id < ?))")
+            params.extend([float(captured_at), float(captured_at), int(row_id)])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT * FROM screenshots {where} ORDER BY captured_at DESC, id DESC LIMIT ?"
+        with self._lock:
+            rows = [dict(row) for row in self._conn.execute(sql, params + [limit + 1])]
+        next_token = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_token = f"{rows[-1]['captured_at']!r}:{rows[-1]['id']}"
+        return rows, next_token
+
+    def oldest(self, until=None, limit=200, after=None):
+        """Oldest-first page of entries captured before until, and the key to pass as after
+
+        after is the (captured_at, id) key returned by the previous call;
+        None is returned once there are no more entries.
+        """
+        clauses, params = [], []
+        if until is not None:
+            clauses.append("captured_at < ?")
+            params.append(until)
+        if after is not None:
+            clauses.append("(captured_at > ? OR (captured_at = ? AND id > ?))")
+            params.extend([after[0], after[0], after[1]])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT * FROM screenshots {where} ORDER BY captured_at, id LIMIT ?"
+        with self._lock:
+            rows = [dict(row) for row in self._conn.execute(sql, params + [limit])]
+        next_key = (rows[-1]["captured_at"], rows[-1]["id"]) if len(rows) == limit else None
+        return rows, next_key
+
+    def total_bytes(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM screenshots").fetchone()[0]
+
+    def get(self, path):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM screenshots WHERE path = ?",
+                                     (os.path.abspath(path),)).fetchone()
+        return dict(row) if row else None
+
+    def set_perceptual_hash(self, path, value):
+        """Store the 64-bit perceptual hash of a cataloged file; None marks a file that could not be hashed"""
+        bands = hash_bands(value) if value is not None else [None] * PERCEPTUAL_HASH_BANDS
+        # SQLite integers are signed
+        stored = value - (1 << 64) if value is not None and value >= 1 << 63 else value
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO perceptual_hashes (screenshot_id, hash, b0, b1, b2, b3)"
+                " SELECT id, ?, ?, ?, ?, ? FROM screenshots WHERE path = ?",
+                [stored] + bands + [os.path.abspath(path)],
+            )
+
+    def perceptual_hash(self, path):
+        """Stored perceptual hash of a file, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT h.hash FROM perceptual_hashes h JOIN screenshots s ON s.id = h.screenshot_id"
+                " WHERE s.path = ?", (os.path.abspath(path),)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return row[0] & 0xFFFFFFFFFFFFFFFF
+
+    def without_perceptual_hash(self, limit=200):
+        """Paths of up to limit cataloged files that have not been hashed yet, newest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT s.path FROM screenshots s LEFT JOIN perceptual_hashes h ON h.screenshot_id = s.id"
+                " WHERE h.screenshot_id IS NULL ORDER BY s.captured_at DESC LIMIT ?", (limit,)).fetchall()
+        return [row[0] for row in rows]
+
+    def perceptual_hash_candidates(self, band_values=None):
+        """Entries whose hash has band i in band_values[i] for some i, with their hash
+
+        Each band is looked up through its own index, so the cost follows the
+        number of matches rather than the size of the catalog. Long value
+        lists are split across queries to stay under SQLite's variable
+        limit. band_values=None returns every hashed entry.
+        """
+        select = ("SELECT s.*, h.hash AS perceptual_hash FROM perceptual_hashes h"
+                  " JOIN screenshots s ON s.id = h.screenshot_id")
+        queries = []
+        if band_values is None:
+            queries.append((select + " WHERE h.hash IS NOT NULL", []))
+        else:
+            clauses, params = [], []
+            for band, values in enumerate(band_values):
+                for start in range(0, len(values), _MAX_SQL_VARIABLES):
+                    chunk = values[start:start + _MAX_SQL_VARIABLES]
+                    if len(params) + len(chunk) > _MAX_SQL_VARIABLES:
+                        queries.append((f"{select} WHERE {' OR '.join(clauses)}", params))
+                        clauses, params = [], []
+                    clauses.append(f"h.b{band} IN ({', '.join('?' * len(chunk))})")
+                    params.extend(chunk)
+            if clauses:
+                queries.append((f"{select} WHERE {' OR '.join(clauses)}", params))
+        rows = {}
+        with self._lock:
+            for sql, params in queries:
+                for row in self._conn.execute(sql, params):
+                    rows[row["id"]] = row
+        results = []
+        for row in rows.values():
+            entry = dict(row)
+            entry["perceptual_hash"] &= 0xFFFFFFFFFFFFFFFF
+            results.append(entry)
+        return results
+
+    def prune_perceptual_hashes(self):
+        """Drop hashes of files that are no longer cataloged; returns how many"""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "DELETE FROM perceptual_hashes WHERE screenshot_id NOT IN (SELECT id FROM screenshots)").rowcount
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT mode, COUNT(*) AS count, COALESCE(SUM(size_bytes), 0) AS bytes,"
+                " MIN(captured_at) AS first, MAX(captured_at) AS last FROM screenshots GROUP BY mode"
+            ).fetchall()
+        return {row["mode"]: dict(row) for row in rows}
+
+    def sync_directory(self, batch_size=200):
+        """Bring the catalog in line with the files on disk
+
+        Only files whose size or mtime differ from their entry are read, and
+        changes are committed in batches, so an interrupted sync resumes
+        where it stopped. Returns (added_or_updated, removed).
+        """
+        with self._lock:
+            known = {row["path"]: (row["size_bytes"], row["mtime"])
+                     for row in self._conn.execute("SELECT path, size_bytes, mtime FROM screenshots")}
+        updated = 0
+        seen = set()
+        pending = []
+        for entry in os.scandir(self.screenshot_dir):
+            if not entry.is_file() or os.path.splitext(entry.name)[1].lower() not in IMAGE_EXTENSIONS:
+                continue
+            path = os.path.abspath(entry.path)
+            seen.add(path)
+            stat = entry.stat()
+            if known.get(path) == (stat.st_size, stat.st_mtime):
+                continue
+            pending.append((path, entry.name))
+            if len(pending) >= batch_size:
+                updated += self._index_files(pending)
+                pending = []
+        updated += self._index_files(pending)
+        missing = [path for path in known if path not in seen]
+        with self._lock, self._conn:
+            self._conn.executemany(_DELETE_PERCEPTUAL_HASH, [(path,) for path in missing])
+            self._conn.executemany(_DELETE_SCREENSHOT, [(path,) for path in missing])
+        return updated, len(missing)
+
+    def _index_files(self, files):
+        indexed = 0
+        for path, name in files:
+            try:
+                mode, captured_at = parse_filename(name)
+                width, height = image_size(path)
+                self.record(path, mode or "unknown", captured_at=captured_at, width=width, height=height)
+                indexed += 1
+            except OSError as e:
+                log.error("Could not index %s: %s", path, e)
+        return indexed
+
+
+def _parse_time(value):
+    if value is None:
+        return None
+    return datetime.fromisoformat(value).timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the screenshot catalog")
+    parser.add_argument("--dir", help="screenshot directory (default: the app's)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_parser = commands.add_parser("list", help="list screenshots, newest first")
+    list_parser.add_argument("--since", help="ISO date/time, inclusive")
+    list_parser.add_argument("--until", help="ISO date/time, exclusive")
+    list_parser.add_argument("--mode", choices=["full", "cropped", "burst", "unknown"])
+    list_parser.add_argument("--limit", type=int, default=50)
+    list_parser.add_argument("--page-token", help="token printed at the end of the previous page")
+    commands.add_parser("rebuild", help="index new, changed and removed files")
+    commands.add_parser("stats", help="counts and sizes per mode")
+    args = parser.parse_args()
+
+    screenshot_dir = args.dir or os.path.join(os.path.expanduser("~"), "Documents", "ScreenshotService")
+    catalog = ScreenshotCatalog(screenshot_dir)
+    if args.command == "rebuild":
+        started = time.perf_counter()
+        updated, removed = catalog.sync_directory()
+        print(f"Indexed {updated} files, removed {removed} entries in {time.perf_counter() - started:.2f}s")
+    elif args.command == "stats":
+        for mode, row in sorted(catalog.stats().items()):
+            print(f"{mode:<8} {row['count']:>8} files {row['bytes'] / 1024 / 1024:>10.1f} MiB")
+    else:
+        rows, next_token = catalog.query(_parse_time(args.since), _parse_time(args.until), args.mode,
+                                         args.limit, args.page_token)
+        for row in rows:
+            captured = datetime.fromtimestamp(row["captured_at"]).isoformat(sep=" ", timespec="seconds")
+            size = f"{row['width']}x{row['height']}" if row["width"] else "?"
+            print(f"{captured}  {row['mode']:<8} {size:>10} {row['size_bytes']:>10}  {row['path']}")
+        if next_token:
+            print(f"Next page: --page-token {next_token}")
+    catalog.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import json
+import logging
+import os
+
+log = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    # Capture backend name from capture_backends.BACKENDS, or "auto" to
+    # benchmark the available backends at startup and keep the fastest
+    "capture_backend": "auto",
+    # Grab every monitor (concurrently where the backend allows) and stitch
+    # them into one virtual-desktop image; false grabs the primary screen only
+    "capture_all_screens": True,
+    # Longest wait for the dialog to leave the screen before capturing anyway
+    "hide_timeout_ms": 200,
+    # Hotkey bindings: action -> key combination in the keyboard package's
+    # syntax ("f12", "shift+f12", ...); empty to leave an action unbound.
+    # repeat_region grabs the last selected area again without the overlay
+    "hotkeys": {
+        "dialog": "f12",
+        "full": "",
+        "region": "shift+f12",
+        "repeat_region": "alt+f12",
+        "burst": "ctrl+f12",
+        "record": "ctrl+shift+f12",
+    },
+    # Presses of the same hotkey closer together than this are key repeats
+    "hotkey_debounce_ms": 250,
+    # Captures allowed to wait while another is in progress; further
+    # hotkeys are dropped, and a repeat of a waiting one is merged into it
+    "hotkey_max_queue": 2,
+    # Burst mode (Ctrl+F12): frames per second, seconds, and the memory
+    # budget for frames waiting to be written
+    "burst_rate": 10,
+    "burst_duration": 5,
+    "burst_buffer_mb": 256,
+    # Screen recording (Ctrl+Shift+F12): "apng", "webp" (uses the webp_*
+    # settings) or "mp4" (needs ffmpeg on PATH). Frames waiting for the
+    # encoder are capped at record_queue_frames, later ones are dropped;
+    # every record_keyframe_interval stored frames one is stored in full
+    "record_format": "apng",
+    "record_fps": 10,
+    "record_queue_frames": 4,
+    "record_keyframe_interval": 50,
+    "record_png_level": 1,
+    # Frame dedup for full-screen and burst captures: "off", "skip" (do not
+    # write frames whose changed tile fraction is at most dedup_threshold) or
+    # "delta" (also write changed frames as only their changed tiles)
+    "dedup": "off",
+    "dedup_tile_size": 64,
+    "dedup_threshold": 0.0,
+    "dedup_keyframe_interval": 30,
+    # Output encoder: "png", "webp", "jpeg" or "qoi" (needs the qoi package).
+    # png_filter "adaptive" uses libpng/Pillow filtering at png_level (None
+    # keeps Qt's default); "none", "sub", "up", "average" or "paeth" use one
+    # filter for every row, which encodes much faster
+    "encoder": "png",
+    "png_level": None,
+    "png_filter": "adaptive",
+    "webp_lossless": True,
+    "webp_quality": 80,
+    "webp_method": 0,
+    "jpeg_quality": 90,
+    # Local capture API for scripts (screenshot_app.py --capture ...). Requests
+    # beyond capture_api_max_pending are answered "busy" instead of queueing
+    "capture_api": True,
+    "capture_api_max_pending": 32,
+    # Retention for the screenshot directory; 0 turns a policy off. Captures
+    # older than recompress_after_days are re-encoded to recompress_format
+    # (at recompress_quality, None for lossless), older than
+    # archive_after_days packed into one zip per day under archive/, and
+    # older than max_age_days deleted; beyond max_total_mb the oldest
+    # archives and captures are deleted. Runs in the background at low
+    # priority every interval_minutes
+    "retention_max_total_mb": 0,
+    "retention_max_age_days": 0,
+    "retention_recompress_after_days": 0,
+    "retention_recompress_format": "webp",
+    "retention_recompress_quality": 85,
+    "retention_archive_after_days": 0,
+    "retention_interval_minutes": 60,
+    # What a capture puts on the clipboard: "image" (converted to the
+    # requested format only when pasted), "path" (the saved file's path and
+    # URL) or "none"
+    "clipboard": "image",
+    # Store a perceptual hash of every capture in the catalog so earlier
+    # captures of the same screen can be found (see perceptual_hash.py)
+    "perceptual_hash": True,
+    # Log output: records at log_level ("debug", "info", "warning", "error"
+    # or "off") and above are written to stdout from a background thread,
+    # and the last log_buffer_lines are kept in memory for
+    # screenshot_app.py --log
+    "log_level": "info",
+    "log_buffer_lines": 1000,
+    # Capture counters and latency histograms (grab, encode, write,
+    # clipboard, ...) in the Prometheus text format, written every
+    # metrics_interval_seconds to metrics_file (None for metrics.prom in the
+    # screenshot directory) and returned by screenshot_app.py --metrics.
+    # While off, the instrumented code pays nothing for them
+    "metrics": False,
+    "metrics_file": None,
+    "metrics_interval_seconds": 15,
+    # Scheduled region captures (see roi_capture.py); None reads
+    # roi_schedules.json from the screenshot directory if it exists
+    "roi_config": None,
+}
+
+
+def default_settings_path():
+    """Location of settings.json, overridable with SCREENSHOT_SERVICE_SETTINGS"""
+    override = os.environ.get("SCREENSHOT_SERVICE_SETTINGS")
+    if override:
+        return override
+    documents_dir = os.path.join(os.path.expanduser("~"), "Documents")
+    return os.path.join(documents_dir, "ScreenshotService", "settings.json")
+
+
+def load_settings(path=None):
+    """Load user settings merged over the defaults; a missing or broken file yields the defaults"""
+    settings = dict(DEFAULT_SETTINGS)
+    path = path or default_settings_path()
+    if not os.path.exists(path):
+        return settings
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            user_settings = json.load(f)
+    except (OSError, ValueError) as e:
+        log.error("Could not read settings from %s: %s", path, e)
+        return settings
+    if isinstance(user_settings, dict):
+        settings.update(user_settings)
+    return settings
@@ -0,0 +1,303 @@
+"""
+Logging and metrics for the capture path
+
+Log calls go through the standard logging module with %-style arguments,
+so a record below the configured level costs one level check. Records
+that pass are handed to a background thread, which writes them to stdout
+and keeps the most recent ones in a ring buffer that the capture API can
+return.
+
+Metrics are counters and latency histograms kept in memory and rendered in
+the Prometheus text format, to a file on an interval (for node_exporter's
+textfile collector or anything else that reads it) or through the capture
+API. Spans time a block of code into a histogram:
+
+    with metrics.span("grab", mode="full"):
+        image = backend.grab()
+
+While metrics are disabled every call returns straight away and span()
+returns a shared do-nothing context manager.
+"""
+
+import bisect
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = "[%(levelname)s] %(message)s"
+LOG_LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+    "off": logging.CRITICAL + 10,
+}
+METRIC_PREFIX = "screenshot_"
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_FILENAME = "metrics.prom"
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the last capacity log lines in memory"""
+
+    def __init__(self, capacity=1000):
+        super().__init__()
+        self.setFormatter(logging.Formatter("%(asctime)s " + LOG_FORMAT))
+        self._lines = deque(maxlen=capacity)
+
+    def emit(self, record):
+        self._lines.append(self.format(record))
+
+    def lines(self, count=None):
+        """The most recent count lines (all kept lines if None), oldest first"""
+        lines = list(self._lines)
+        if count is None:
+            return lines
+        return lines[-count:] if count > 0 else []
+
+
+class _LevelCounter(logging.Handler):
+    """Counts log records per level into the metrics"""
+
+    def __init__(self, registry):
+        super().__init__()
+        self.registry = registry
+
+    def emit(self, record):
+        self.registry.inc("log_records_total", level=record.levelname.lower())
+
+
+_listener = None
+_installed = []  # handlers configure_logging added to the root logger
+ring_buffer = None
+
+
+def configure_logging(level="info", buffer_lines=1000, stream=None, background=True):
+    """Route log records at level and above to stream (stdout by default) and the ring buffer
+
+    With background=True the records are formatted and written by a
+    listener thread, so a log call never waits on the console.
+    """
+    global _listener, ring_buffer
+    shutdown_logging()
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVELS.get(str(level).lower(), logging.INFO))
+    output = logging.StreamHandler(stream if stream is not None else sys.stdout)
+    output.setFormatter(logging.Formatter(LOG_FORMAT))
+    ring_buffer = RingBufferHandler(buffer_lines) if buffer_lines else None
+    handlers = [h for h in (output, ring_buffer, _LevelCounter(metrics)) if h is not None]
+    if background:
+        records = queue.SimpleQueue()
+        _listener = QueueListener(records, *handlers)
+        _listener.start()
+        handlers = [QueueHandler(records)]
+    for handler in handlers:
+        root.addHandler(handler)
+        _installed.append(handler)
+
+
+def shutdown_logging():
+    """Write out the records still waiting for the listener thread and detach the handlers"""
+    global _listener
+    root = logging.getLogger()
+    while _installed:
+        root.removeHandler(_installed.pop())
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def recent_log(count=None):
+    """The most recent lines of the ring buffer, or [] when it is off"""
+    return ring_buffer.lines(count) if ring_buffer is not None else []
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("registry", "name", "labels", "started")
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name + "_seconds", time.perf_counter() - self.started, **self.labels)
+        if exc_type is not None:
+            self.registry.inc(self.name + "_failures_total", **self.labels)
+        return False
+
+
+class Metrics:
+    """Counters and latency histograms, rendered in the Prometheus text format
+
+    Names are given without the screenshot_ prefix, which is added when
+    rendering; labels are keyword arguments. Safe to use from any thread.
+    """
+
+    def __init__(self, enabled=False, buckets=LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [count per bucket..., count above the last, sum]
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            histogram[index] += 1
+            histogram[-1] += seconds
+
+    def span(self, name, **labels):
+        """Context manager that records the block's duration as name_seconds
+
+        A block that raises also counts name_failures_total.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, labels)
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def histogram(self, name, **labels):
+        """{"count", "sum", "buckets": [(upper bound, cumulative count), ...]} or None"""
+        with self._lock:
+            histogram = self._histograms.get((name, tuple(sorted(labels.items()))))
+            histogram = list(histogram) if histogram is not None else None
+        if histogram is None:
+            return None
+        cumulative, total = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), histogram[:-1]):
+            total += count
+            cumulative.append((bound, total))
+        return {"count": total, "sum": histogram[-1], "buckets": cumulative}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, list(value)) for key, value in self._histograms.items())
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            name = METRIC_PREFIX + name
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        for (name, labels), histogram in histograms:
+            name = METRIC_PREFIX + name
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            total = 0
+            for bound, count in zip(self.buckets + (float("inf"),), histogram[:-1]):
+                total += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {total}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(histogram[-1])}")
+            lines.append(f"{name}_count{_labels(labels)} {total}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def write(self, path):
+        """Write render() to path through a temporary file, so readers never see half of it"""
+        tmp_path = path + ".part"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# The process-wide registry the app's modules record into
+metrics = Metrics()
+
+
+class MetricsExporter:
+    """Writes a registry to a file every interval seconds on a background thread"""
+
+    def __init__(self, registry, path, interval=15.0):
+        self.registry = registry
+        self.path = path
+        self.interval = max(1.0, float(interval))
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="MetricsExporter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the thread and write the final values"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._export()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._export()
+
+    def _export(self):
+        try:
+            self.registry.write(self.path)
+        except OSError as e:
+            logging.getLogger(__name__).error("Could not write metrics to %s: %s", self.path, e)
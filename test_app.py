@@ -1,118 +1,284 @@
 #!/usr/bin/env python3
 """
-Test script for the Screenshot Service application
+Tests for the Screenshot Service application: captures, the cropping overlay and the dialog flow
+
+Runs headless (QT_QPA_PLATFORM=offscreen) against the synthetic capture
+backend, with the screenshot folder under a temporary home directory.
 """
 
 import os
-import sys
+import threading
 import time
-from datetime import datetime
-
-def test_screenshot_capture():
-    """Test the screenshot capture functionality"""
-    
-    print("Testing Screenshot Service...")
-    print("=" * 40)
-    
-    # Test 1: Check if required modules can be imported
-    print("1. Testing module imports...")
-    try:
-        from screenshot_app import ScreenshotCapture
-        print("   ✓ ScreenshotCapture imported successfully")
-    except ImportError as e:
-        print(f"   ✗ Failed to import ScreenshotCapture: {e}")
-        return False
-    
-    # Test 2: Test screenshot directory creation
-    print("2. Testing screenshot directory creation...")
-    try:
-        capture = ScreenshotCapture()
-        if os.path.exists(capture.screenshot_dir):
-            print(f"   ✓ Screenshot directory exists: {capture.screenshot_dir}")
-        else:
-            print(f"   ✗ Screenshot directory not found: {capture.screenshot_dir}")
-            return False
-    except Exception as e:
-        print(f"   ✗ Failed to create ScreenshotCapture: {e}")
-        return False
-    
-    # Test 3: Test full screenshot capture
-    print("3. Testing full screenshot capture...")
-    try:
-        filepath = capture.take_full_screenshot()
-        if filepath and os.path.exists(filepath):
-            print(f"   ✓ Full screenshot saved: {os.path.basename(filepath)}")
-            # Clean up test file
-            os.remove(filepath)
-            print("   ✓ Test file cleaned up")
-        else:
-            print("   ✗ Full screenshot failed")
-            return False
-    except Exception as e:
-        print(f"   ✗ Full screenshot error: {e}")
-        return False
-    
-    # Test 4: Test PyQt6 imports (for GUI components)
-    print("4. Testing PyQt6 imports...")
-    try:
-        from PyQt6.QtWidgets import QApplication, QSystemTrayIcon
-        from PyQt6.QtCore import QThread, pyqtSignal
-        print("   ✓ PyQt6 components imported successfully")
-    except ImportError as e:
-        print(f"   ✗ Failed to import PyQt6: {e}")
-        return False
-    
-    # Test 5: Test keyboard module
-    print("5. Testing keyboard module...")
+
+import pytest
+from PyQt6.QtCore import QPoint, QPointF, QRect, Qt
+from PyQt6.QtGui import QImage, QKeyEvent, QMouseEvent, QPixmap
+from PyQt6.QtWidgets import QApplication, QDialog, QWidget
+
+from capture_backends import SyntheticCaptureBackend
+from settings import DEFAULT_SETTINGS
+
+
+def _app():
+    return QApplication.instance() or QApplication([])
+
+
+def _settings(**overrides):
+    return {**DEFAULT_SETTINGS, "capture_backend": "synthetic", "capture_api": False, **overrides}
+
+
+def _wait_for(condition, timeout=10.0):
+    """Spin the event loop until condition() holds"""
+    app = _app()
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        app.processEvents()
+        time.sleep(0.005)
+
+
+def _join_catalog_sync():
+    for thread in threading.enumerate():
+        if thread.name == "CatalogSync":
+            thread.join()
+
+
+def _mouse_event(event_type, point):
+    button = Qt.MouseButton.NoButton if event_type == QMouseEvent.Type.MouseMove else Qt.MouseButton.LeftButton
+    return QMouseEvent(event_type, QPointF(point), QPointF(point), button, Qt.MouseButton.LeftButton,
+                       Qt.KeyboardModifier.NoModifier)
+
+
+def _drag(widget, start, end):
+    widget.mousePressEvent(_mouse_event(QMouseEvent.Type.MouseButtonPress, start))
+    widget.mouseMoveEvent(_mouse_event(QMouseEvent.Type.MouseMove, end))
+    widget.mouseReleaseEvent(_mouse_event(QMouseEvent.Type.MouseButtonRelease, end))
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    """A temporary home directory, so captures land in tmp_path/Documents/ScreenshotService"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("USERPROFILE", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def capture(home):
+    from screenshot_app import ScreenshotCapture
+    capture = ScreenshotCapture(_settings(), backend=SyntheticCaptureBackend(640, 400, static=True))
+    yield capture
+    capture.save_pipeline.shutdown()
+    _join_catalog_sync()
+    capture.catalog.close()
+
+
+def test_full_screenshot_is_saved_and_cataloged(capture, home):
+    result = capture.take_full_screenshot()
+    capture.save_pipeline.wait_idle()
+    assert result.mode == "full"
+    assert os.path.dirname(result.filepath) == str(home / "Documents" / "ScreenshotService")
+    saved = QImage(result.filepath)
+    assert (saved.width(), saved.height()) == (640, 400)
+    entry = capture.catalog.get(result.filepath)
+    assert entry["mode"] == "full" and entry["size_bytes"] == os.path.getsize(result.filepath)
+    assert capture.catalog.perceptual_hash(result.filepath) is not None
+
+
+def test_region_screenshot_holds_only_the_rect(capture):
+    rect = QRect(100, 50, 200, 120)
+    result = capture.take_region_screenshot(rect)
+    capture.save_pipeline.wait_idle()
+    expected = capture.backend.grab(rect).convertToFormat(QImage.Format.Format_RGB32)
+    assert result.region == rect
+    assert QImage(result.filepath).convertToFormat(QImage.Format.Format_RGB32) == expected
+    entry = capture.catalog.get(result.filepath)
+    assert (entry["crop_x"], entry["crop_y"], entry["crop_width"], entry["crop_height"]) == (100, 50, 200, 120)
+
+
+def test_captures_in_the_same_second_get_their_own_files(capture):
+    results = [capture.take_full_screenshot() for _ in range(3)]
+    results.append(capture.take_region_screenshot(QRect(0, 0, 50, 50)))
+    capture.save_pipeline.wait_idle()
+    paths = [result.filepath for result in results]
+    assert len(set(paths)) == 4 and all(os.path.exists(path) for path in paths)
+
+
+def test_a_full_save_queue_drops_the_capture_without_blocking(capture, monkeypatch):
+    from save_pipeline import SavePipeline
+    # No workers, so the one queue slot stays taken
+    monkeypatch.setattr(capture, "save_pipeline", SavePipeline(max_workers=0, max_pending=1))
+    failures = []
+    capture.save_pipeline.save_failed.connect(lambda path, error: failures.append(path))
+    assert capture.take_full_screenshot().filepath is not None
+    started = time.monotonic()
+    dropped = capture.take_region_screenshot(QRect(0, 0, 50, 50))
+    assert time.monotonic() - started < 1.0
+    assert dropped.filepath is None and len(failures) == 1
+
+
+def test_unchanged_full_screenshot_is_reused_with_dedup(home):
+    from screenshot_app import ScreenshotCapture
+    capture = ScreenshotCapture(_settings(dedup="skip"), backend=SyntheticCaptureBackend(640, 400, static=True))
     try:
-        import keyboard
-        print("   ✓ Keyboard module imported successfully")
-    except ImportError as e:
-        print(f"   ✗ Failed to import keyboard: {e}")
-        return False
-    
-    print("\n" + "=" * 40)
-    print("All tests passed! The application should work correctly.")
-    print("\nTo run the application:")
-    print("1. python screenshot_app.py")
-    print("2. Or build the executable: python build.py")
-    return True
-
-def test_build_process():
-    """Test the build process"""
-    print("\nTesting build process...")
-    print("=" * 40)
-    
-    # Check if PyInstaller is available
+        first = capture.take_full_screenshot()
+        capture.save_pipeline.wait_idle()
+        second = capture.take_full_screenshot()
+        assert second.filepath == first.filepath
+    finally:
+        capture.save_pipeline.shutdown()
+        _join_catalog_sync()
+        capture.catalog.close()
+
+
+def test_a_dropped_capture_is_not_reused_with_dedup(home, monkeypatch):
+    from save_pipeline import SavePipeline
+    from screenshot_app import ScreenshotCapture
+    capture = ScreenshotCapture(_settings(dedup="skip"), backend=SyntheticCaptureBackend(640, 400, static=True))
+    working = capture.save_pipeline
     try:
-        import PyInstaller
-        print("✓ PyInstaller is available")
-    except ImportError:
-        print("✗ PyInstaller not found. Install with: pip install pyinstaller")
-        return False
-    
-    # Check if all required files exist
-    required_files = ['screenshot_app.py', 'requirements.txt', 'build.py']
-    for file in required_files:
-        if os.path.exists(file):
-            print(f"✓ {file} exists")
-        else:
-            print(f"✗ {file} not found")
-            return False
-    
-    print("✓ Build process should work correctly")
-    return True
-
-if __name__ == "__main__":
-    print("Screenshot Service Test Suite")
-    print("=" * 50)
-    
-    success = test_screenshot_capture()
-    build_success = test_build_process()
-    
-    if success and build_success:
-        print("\n🎉 All tests passed! Your application is ready to use.")
-        sys.exit(0)
-    else:
-        print("\n❌ Some tests failed. Please check the errors above.")
-        sys.exit(1) 
\ No newline at end of file
+        full = SavePipeline(max_workers=0, max_pending=1)
+        full.submit(QImage(1, 1, QImage.Format.Format_RGB32), os.path.join(str(home), "queued.png"))
+        monkeypatch.setattr(capture, "save_pipeline", full)
+        assert capture.take_full_screenshot().filepath is None
+        monkeypatch.setattr(capture, "save_pipeline", working)
+        second = capture.take_full_screenshot()
+        capture.save_pipeline.wait_idle()
+        assert second.filepath is not None and os.path.exists(second.filepath)
+    finally:
+        working.shutdown()
+        _join_catalog_sync()
+        capture.catalog.close()
+
+
+def test_cropping_widget_saves_the_dragged_selection(capture):
+    from screenshot_app import CroppingWidget
+    app = _app()
+    host = QWidget()
+    host.screenshot_capture = capture
+    widget = CroppingWidget(None, host)
+    selections, results = [], []
+    widget.cropped.connect(lambda *corners: selections.append(corners))
+    widget.cropped_and_saved.connect(results.append)
+    screen = QPixmap.fromImage(capture.backend.grab())
+    widget.begin(screen, QRect(0, 0, 640, 400))
+    app.processEvents()
+    assert widget.isVisible()
+
+    _drag(widget, QPoint(40, 30), QPoint(300, 200))
+    capture.save_pipeline.wait_idle()
+    assert selections == [(40, 30, 300, 200)]
+    result, = results
+    assert result.mode == "cropped" and result.region == QRect(40, 30, 261, 171)
+    assert not widget.isVisible()
+    saved = QImage(result.filepath).convertToFormat(QImage.Format.Format_RGB32)
+    assert saved == screen.toImage().copy(QRect(40, 30, 261, 171)).convertToFormat(QImage.Format.Format_RGB32)
+    assert capture.catalog.get(result.filepath)["crop_width"] == 261
+    host.deleteLater()
+
+
+def test_cropping_widget_escape_cancels_without_saving(capture):
+    from screenshot_app import CroppingWidget
+    app = _app()
+    host = QWidget()
+    host.screenshot_capture = capture
+    widget = CroppingWidget(None, host)
+    cancelled, results = [], []
+    widget.cancelled.connect(lambda: cancelled.append(True))
+    widget.cropped_and_saved.connect(results.append)
+    widget.begin(QPixmap.fromImage(capture.backend.grab()), QRect(0, 0, 640, 400))
+    app.processEvents()
+    widget.keyPressEvent(QKeyEvent(QKeyEvent.Type.KeyPress, Qt.Key.Key_Escape, Qt.KeyboardModifier.NoModifier))
+    assert cancelled == [True] and results == []
+    assert not widget.isVisible() and widget.screen_pixmap is None
+    host.deleteLater()
+
+
+def test_dialog_reports_the_choice_and_clears_it_when_shown_again():
+    from screenshot_app import ScreenshotDialog
+    app = _app()
+    dialog = ScreenshotDialog()
+    finished = []
+    dialog.finished.connect(lambda result: finished.append((result, dialog.choice)))
+    for respond in (dialog.accept_full, dialog.accept_cropped, dialog.reject):
+        dialog.present()
+        app.processEvents()
+        assert dialog.isVisible() and dialog.choice is None
+        respond()
+    assert finished == [(QDialog.DialogCode.Accepted, "full"), (QDialog.DialogCode.Accepted, "cropped"),
+                        (QDialog.DialogCode.Rejected, None)]
+    dialog.deleteLater()
+
+
+@pytest.fixture
+def screenshot_app(home, monkeypatch):
+    import screenshot_app
+    # No global keyboard hook in tests
+    monkeypatch.setattr(screenshot_app.HotkeyListener, "run", lambda self: None)
+    qt_app = _app()
+    # clipboard "none" keeps the tests off the system clipboard
+    app = screenshot_app.ScreenshotApp(settings=_settings(clipboard="none", hide_timeout_ms=50))
+    yield app
+    _join_catalog_sync()
+    app.quit_app()
+    app.deleteLater()
+    qt_app.processEvents()
+
+
+def test_dialog_flow_full_capture(screenshot_app):
+    app = screenshot_app
+    saved = []
+    app.screenshot_capture.save_pipeline.saved.connect(saved.append)
+    app.scheduler.trigger("dialog", time.perf_counter())
+    _wait_for(lambda: app.screenshot_dialog.isVisible())
+    app.screenshot_dialog.accept_full()
+    _wait_for(lambda: saved and app.scheduler.in_flight is None)
+    timeline, = app.recent_timelines
+    assert timeline.mode == "full"
+    assert set(timeline.as_dict()) >= {"hotkey", "dialog", "choice", "hidden", "grabbed", "clipboard", "saved"}
+    assert QImage(saved[0]).width() == 1920
+
+
+def test_dialog_flow_cropped_capture_then_repeat_region(screenshot_app):
+    app = screenshot_app
+    saved = []
+    app.screenshot_capture.save_pipeline.saved.connect(saved.append)
+    app.scheduler.trigger("dialog", time.perf_counter())
+    _wait_for(lambda: app.screenshot_dialog.isVisible())
+    app.screenshot_dialog.accept_cropped()
+    overlay = app._cropping_widget
+    _wait_for(lambda: overlay.isVisible() and overlay.screen_pixmap is not None)
+    _drag(overlay, QPoint(10, 20), QPoint(109, 69))
+    _wait_for(lambda: saved and app.scheduler.in_flight is None)
+    assert app._last_region == QRect(10, 20, 100, 50)
+
+    app.scheduler.trigger("repeat_region", time.perf_counter())
+    _wait_for(lambda: len(saved) == 2 and app.scheduler.in_flight is None)
+    assert [(QImage(path).width(), QImage(path).height()) for path in saved] == [(100, 50), (100, 50)]
+    assert [timeline.mode for timeline in app.recent_timelines] == ["cropped", "cropped"]
+
+
+def test_dialog_flow_cancel_captures_nothing(screenshot_app):
+    app = screenshot_app
+    app.scheduler.trigger("dialog", time.perf_counter())
+    _wait_for(lambda: app.screenshot_dialog.isVisible())
+    app.screenshot_dialog.reject()
+    _wait_for(lambda: app.scheduler.in_flight is None)
+    assert app.screenshot_capture.save_pipeline.pending() == 0
+    assert not list(app.recent_timelines)
+
+
+def test_closing_the_overlay_without_escape_ends_the_capture(screenshot_app):
+    app = screenshot_app
+    app.scheduler.trigger("region", time.perf_counter())
+    overlay = app._cropping_widget
+    _wait_for(lambda: overlay.isVisible() and app.scheduler.in_flight is not None)
+    # As the window manager or Alt+F4 would
+    overlay.close()
+    _wait_for(lambda: app.scheduler.in_flight is None)
+    assert app.screenshot_capture.save_pipeline.pending() == 0
+    # The next hotkey (past the debounce window) starts a new capture
+    app.scheduler.trigger("region", time.perf_counter() + 60)
+    _wait_for(lambda: overlay.isVisible())
+    overlay.close()
+    _wait_for(lambda: app.scheduler.in_flight is None)
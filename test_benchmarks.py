@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Latency benchmarks of the capture steps at 1080p, 4K and 8K (needs pytest-benchmark)
+
+Each step is timed on synthetic frames under the offscreen platform:
+grab, encode, save (grab to file written and cataloged), clipboard
+(publishing a capture and converting it on paste) and one overlay repaint
+while dragging a selection. Store a baseline and compare later runs with it:
+
+    python -m pytest test_benchmarks.py --benchmark-only --benchmark-save=baseline
+    python -m pytest test_benchmarks.py --benchmark-only --benchmark-compare --benchmark-compare-fail=median:25%
+
+Baselines are kept under .benchmarks/, one directory per machine. Skip the
+benchmarks in a quick test run with --benchmark-skip.
+"""
+
+import os
+import threading
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from PyQt6.QtCore import QPoint, QPointF, QRect, Qt
+from PyQt6.QtGui import QMouseEvent, QPixmap
+from PyQt6.QtWidgets import QApplication
+
+from capture_backends import SyntheticCaptureBackend
+from clipboard_data import IMAGE_MIME_TYPE, DeferredImageMimeData
+from encoders import create_encoder
+from settings import DEFAULT_SETTINGS
+
+RESOLUTIONS = {"1080p": (1920, 1080), "4k": (3840, 2160), "8k": (7680, 4320)}
+# Rounds per resolution for the steps that take whole seconds at 8K
+ROUNDS = {"1080p": 10, "4k": 5, "8k": 3}
+DRAG_STEPS = 200
+
+_backends = {}
+
+
+def _app():
+    return QApplication.instance() or QApplication([])
+
+
+def _mouse_event(event_type, point):
+    button = Qt.MouseButton.NoButton if event_type == QMouseEvent.Type.MouseMove else Qt.MouseButton.LeftButton
+    return QMouseEvent(event_type, QPointF(point), QPointF(point), button, Qt.MouseButton.LeftButton,
+                       Qt.KeyboardModifier.NoModifier)
+
+
+def _backend(resolution):
+    """One synthetic screen per resolution, shared by the benchmarks"""
+    if resolution not in _backends:
+        _backends[resolution] = SyntheticCaptureBackend(*RESOLUTIONS[resolution])
+    return _backends[resolution]
+
+
+def _pedantic(benchmark, resolution, target, setup=None):
+    return benchmark.pedantic(target, setup=setup, rounds=ROUNDS[resolution], warmup_rounds=1)
+
+
+resolutions = pytest.mark.parametrize("resolution", list(RESOLUTIONS))
+
+
+@resolutions
+@pytest.mark.benchmark(group="grab")
+def test_grab(benchmark, resolution):
+    backend = _backend(resolution)
+    image = benchmark(backend.grab)
+    assert (image.width(), image.height()) == RESOLUTIONS[resolution]
+
+
+@resolutions
+@pytest.mark.benchmark(group="encode")
+def test_encode(benchmark, resolution):
+    image = _backend(resolution).grab()
+    encoder = create_encoder(DEFAULT_SETTINGS)
+    data = _pedantic(benchmark, resolution, lambda: encoder.encode(image))
+    benchmark.extra_info["bytes"] = len(data)
+
+
+@resolutions
+@pytest.mark.benchmark(group="save")
+def test_save(benchmark, resolution, tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("USERPROFILE", str(tmp_path))
+    from screenshot_app import ScreenshotCapture
+    capture = ScreenshotCapture(dict(DEFAULT_SETTINGS), backend=_backend(resolution))
+    def save():
+        result = capture.take_full_screenshot()
+        capture.save_pipeline.wait_idle()
+        return result
+    try:
+        result = _pedantic(benchmark, resolution, save)
+        assert os.path.exists(result.filepath)
+    finally:
+        capture.save_pipeline.shutdown()
+        for thread in threading.enumerate():
+            if thread.name == "CatalogSync":
+                thread.join()
+        capture.catalog.close()
+
+
+@resolutions
+@pytest.mark.benchmark(group="clipboard")
+def test_clipboard_publish(benchmark, resolution):
+    image = _backend(resolution).grab()
+    def publish():
+        data = DeferredImageMimeData(image)
+        return data.formats(), data.retrieveData(IMAGE_MIME_TYPE, None)
+    benchmark(publish)
+
+
+@resolutions
+@pytest.mark.benchmark(group="clipboard")
+def test_clipboard_paste_png(benchmark, resolution):
+    image = _backend(resolution).grab()
+    data = _pedantic(benchmark, resolution, lambda: DeferredImageMimeData(image).retrieveData("image/png", None))
+    assert data.size() > 0
+
+
+@resolutions
+@pytest.mark.benchmark(group="overlay_paint")
+def test_overlay_paint(benchmark, resolution, tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("USERPROFILE", str(tmp_path))
+    from screenshot_app import CroppingWidget
+    app = _app()
+    width, height = RESOLUTIONS[resolution]
+    widget = CroppingWidget()
+    widget.begin(QPixmap.fromImage(_backend(resolution).grab()), QRect(0, 0, width, height))
+    app.processEvents()
+    start = QPoint(width // 8, height // 8)
+    widget.mousePressEvent(_mouse_event(QMouseEvent.Type.MouseButtonPress, start))
+    steps = iter(range(1, DRAG_STEPS + 1))
+    def drag_step():
+        # One mouse move and the repaint of the area the selection moved across
+        step = next(steps)
+        point = QPoint(start.x() + (width * 3 // 4) * step // DRAG_STEPS,
+                       start.y() + (height * 3 // 4) * step // DRAG_STEPS)
+        widget.mouseMoveEvent(_mouse_event(QMouseEvent.Type.MouseMove, point))
+        app.processEvents()
+    try:
+        # Every step of one diagonal drag, as the selection grows from nothing to most of the screen
+        benchmark.pedantic(drag_step, rounds=DRAG_STEPS)
+    finally:
+        widget.origin = None
+        widget.close()
+        widget.deleteLater()
+        app.processEvents()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for burst capture and its frame ring buffer
+"""
+
+import os
+
+from PyQt6.QtCore import QCoreApplication, QEventLoop, QTimer
+from PyQt6.QtGui import QImage
+
+from burst_capture import BurstCapture, FrameRingBuffer
+from capture_backends import SyntheticCaptureBackend
+from frame_dedup import FrameDeduplicator
+
+
+def _app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def test_ring_buffer_drops_when_full():
+    backend = SyntheticCaptureBackend(32, 32)
+    ring = FrameRingBuffer(2, 32, 32)
+    assert ring.push(backend.grab(), "a.png")
+    assert ring.push(backend.grab(), "b.png")
+    assert not ring.push(backend.grab(), "c.png")
+    index, filepath, _, _ = ring.take()
+    assert filepath == "a.png"
+    ring.release(index)
+    assert ring.push(backend.grab(), "d.png")
+
+
+def test_ring_buffer_copies_into_preallocated_slot():
+    frame = SyntheticCaptureBackend(32, 32).grab()
+    ring = FrameRingBuffer(1, 32, 32)
+    ring.push(frame, "a.png")
+    index, _, _, _ = ring.take()
+    assert ring.slot(index) == frame.convertToFormat(QImage.Format.Format_RGB32)
+
+
+def test_burst_writes_uniquely_named_frames(tmp_path):
+    app = _app()
+    burst = BurstCapture(SyntheticCaptureBackend(64, 48), str(tmp_path))
+    results = []
+    loop = QEventLoop()
+    burst.finished.connect(results.append)
+    burst.finished.connect(loop.quit)
+    QTimer.singleShot(5000, loop.quit)
+    assert burst.start(rate=50, duration=0.2)
+    loop.exec()
+    assert results, "burst did not finish"
+    stats = results[0]
+    names = sorted(os.listdir(tmp_path))
+    assert stats["frames_captured"] + stats["frames_dropped"] == 10
+    assert stats["frames_written"] == stats["frames_captured"] == len(names)
+    assert len(set(names)) == len(names)
+    assert names == sorted(names, key=lambda name: int(name.rsplit("_", 1)[1].split(".")[0]))
+
+
+def test_burst_skips_unchanged_frames(tmp_path):
+    app = _app()
+    burst = BurstCapture(SyntheticCaptureBackend(64, 48, static=True), str(tmp_path),
+                         deduplicator_factory=lambda: FrameDeduplicator(mode="skip", tile_size=16))
+    results = []
+    loop = QEventLoop()
+    burst.finished.connect(results.append)
+    burst.finished.connect(loop.quit)
+    QTimer.singleShot(5000, loop.quit)
+    burst.start(rate=50, duration=0.1)
+    loop.exec()
+    stats = results[0]
+    assert stats["frames_written"] == 1
+    assert stats["frames_deduplicated"] == 4
+    assert stats["dedup"]["frames_skipped"] == 4
+    assert len(os.listdir(tmp_path)) == 1
+
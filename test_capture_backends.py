@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Tests for the capture backend layer
+"""
+
+import threading
+
+from PyQt6.QtCore import QRect
+
+import capture_backends
+from capture_backends import (BACKENDS, LazyCaptureBackend, QtCaptureBackend, ScreenInfo, SyntheticCaptureBackend,
+                              VirtualDesktopBackend, create_backend)
+from settings import load_settings
+
+
+def test_synthetic_backend_is_deterministic():
+    first = SyntheticCaptureBackend(320, 200)
+    second = SyntheticCaptureBackend(320, 200)
+    frames_a = [first.grab() for _ in range(3)]
+    frames_b = [second.grab() for _ in range(3)]
+    assert frames_a == frames_b
+    assert frames_a[0] != frames_a[1]
+    assert frames_a[0].width() == 320 and frames_a[0].height() == 200
+
+
+def test_synthetic_backend_static_frames_are_identical():
+    backend = SyntheticCaptureBackend(64, 64, static=True)
+    assert backend.grab() == backend.grab()
+
+
+def test_synthetic_backend_region_matches_full_frame():
+    full = SyntheticCaptureBackend(320, 200).grab()
+    region = SyntheticCaptureBackend(320, 200).grab(QRect(10, 20, 100, 50))
+    assert region == full.copy(QRect(10, 20, 100, 50))
+
+
+def test_create_backend_by_name():
+    assert isinstance(create_backend("synthetic"), SyntheticCaptureBackend)
+    assert isinstance(create_backend("does-not-exist"), QtCaptureBackend)
+    assert set(BACKENDS) >= {"qt", "pil", "pyautogui", "mss", "synthetic"}
+
+
+def test_load_settings_merges_defaults(tmp_path):
+    path = tmp_path / "settings.json"
+    path.write_text('{"capture_backend": "synthetic"}')
+    assert load_settings(str(path))["capture_backend"] == "synthetic"
+    path.write_text("not json")
+    assert load_settings(str(path))["capture_backend"] == "auto"
+
+
+def _two_screen_desktop(parallel=True):
+    """A 1x screen next to a 2x screen, grabbed from one synthetic native desktop"""
+    layout = [ScreenInfo("left", QRect(0, 0, 100, 50), 1.0), ScreenInfo("right", QRect(100, 0, 100, 50), 2.0)]
+    factory = lambda: SyntheticCaptureBackend(300, 100, static=True)
+    return VirtualDesktopBackend(factory, layout=layout, parallel=parallel)
+
+
+def test_virtual_desktop_stitches_screens_at_highest_ratio():
+    native = SyntheticCaptureBackend(300, 100, static=True).grab()
+    desktop = _two_screen_desktop()
+    image = desktop.grab()
+    desktop.close()
+    assert desktop.desktop_geometry() == QRect(0, 0, 200, 50)
+    assert (image.width(), image.height(), image.devicePixelRatio()) == (400, 100, 2.0)
+    # The 2x screen is copied 1:1, the 1x screen is upscaled into place
+    assert image.copy(QRect(200, 0, 200, 100)) == native.copy(QRect(100, 0, 200, 100))
+    assert image.pixel(20, 20) == native.pixel(10, 10)
+    assert len(desktop.last_timings["screens_ms"]) == 2 and desktop.last_timings["parallel"]
+
+
+def test_virtual_desktop_region_spans_monitors_and_matches_sequential():
+    parallel, sequential = _two_screen_desktop(), _two_screen_desktop(parallel=False)
+    rect = QRect(90, 10, 20, 20)
+    spanning = parallel.grab(rect)
+    assert (spanning.width(), spanning.height()) == (40, 40)
+    assert spanning == sequential.grab(rect)
+    assert parallel.grab() == sequential.grab()
+    parallel.close()
+    assert not sequential.last_timings["parallel"]
+
+
+def test_virtual_desktop_fills_gaps_between_screens_with_black():
+    layout = [ScreenInfo("a", QRect(0, 0, 50, 50)), ScreenInfo("b", QRect(50, 20, 50, 50))]
+    desktop = VirtualDesktopBackend(lambda: SyntheticCaptureBackend(100, 70, static=True), layout=layout)
+    image = desktop.grab()
+    desktop.close()
+    assert (image.width(), image.height()) == (100, 70)
+    assert image.pixelColor(75, 5).black() == 255
+    assert image.pixelColor(5, 65).black() == 255
+
+
+def test_a_screen_backend_that_cannot_be_created_fails_the_grab():
+    def factory():
+        raise OSError("no display")
+    layout = [ScreenInfo("a", QRect(0, 0, 50, 50)), ScreenInfo("b", QRect(50, 0, 50, 50))]
+    desktop = VirtualDesktopBackend(factory, layout=layout)
+    errors = []
+    def grab():
+        try:
+            desktop.grab()
+        except OSError as e:
+            errors.append(e)
+    grabber = threading.Thread(target=grab, daemon=True)
+    grabber.start()
+    grabber.join(5)
+    desktop.close()
+    assert not grabber.is_alive()
+    assert [str(e) for e in errors] == ["no display"]
+
+
+def test_lazy_backend_is_created_on_first_use():
+    lazy = LazyCaptureBackend("synthetic")
+    assert not lazy.is_resolved()
+    image = lazy.grab(QRect(0, 0, 8, 8))
+    assert lazy.is_resolved() and lazy.name == "synthetic"
+    assert (image.width(), image.height()) == (8, 8)
+    assert lazy.warm_up() is lazy.resolve()
+    assert lazy.static is False  # forwarded to the real backend
+
+
+def test_auto_benchmark_off_the_gui_thread_leaves_only_qt_for_resolve(monkeypatch):
+    grabs = []
+    original = SyntheticCaptureBackend.grab
+    def grab(self, rect=None):
+        grabs.append((self.name, threading.current_thread() is threading.main_thread()))
+        return original(self, rect)
+    monkeypatch.setitem(BACKENDS, "mss", type("Fast", (SyntheticCaptureBackend,), {"name": "mss", "grab": grab}))
+    monkeypatch.setitem(BACKENDS, "qt", type("Gui", (SyntheticCaptureBackend,), {
+        "name": "qt", "gui_thread_only": True, "grab": grab}))
+    monkeypatch.setattr(capture_backends, "AUTO_CANDIDATES", ["mss", "qt"])
+    lazy = LazyCaptureBackend("auto")
+    worker = threading.Thread(target=lazy.prepare)
+    worker.start()
+    worker.join()
+    assert grabs and all(name == "mss" and not on_gui for name, on_gui in grabs)
+    grabs.clear()
+    assert lazy.resolve().name in ("mss", "qt")
+    assert grabs and all(name == "qt" and on_gui for name, on_gui in grabs)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for the hotkey capture scheduler
+"""
+
+import threading
+
+from PyQt6.QtCore import QCoreApplication
+
+from capture_scheduler import CaptureScheduler
+
+
+def _app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def make_scheduler(**kwargs):
+    scheduler = CaptureScheduler(**kwargs)
+    dispatched = []
+    scheduler.dispatch.connect(lambda action, at: dispatched.append(action))
+    return scheduler, dispatched
+
+
+def test_key_repeat_is_debounced():
+    scheduler, dispatched = make_scheduler(debounce_ms=250)
+    for at in (0.0, 0.1, 0.2, 0.3):
+        scheduler.trigger("region", at)
+    scheduler.capture_finished()
+    scheduler.trigger("region", 1.0)
+    assert dispatched == ["region", "region"]
+    assert scheduler.counters["debounced"] == 3
+
+
+def test_triggers_during_a_capture_are_merged_queued_or_dropped():
+    app = _app()
+    scheduler, dispatched = make_scheduler(max_queue=2)
+    scheduler.trigger("dialog", 0.0)
+    scheduler.trigger("dialog", 1.0)  # same as in flight
+    scheduler.trigger("region", 2.0)
+    scheduler.trigger("region", 3.0)  # already queued
+    scheduler.trigger("full", 4.0)
+    scheduler.trigger("repeat_region", 5.0)  # queue full
+    assert dispatched == ["dialog"]
+    assert scheduler.queued() == ["region", "full"]
+    assert scheduler.counters == {"accepted": 1, "debounced": 0, "coalesced": 2, "dropped": 1}
+    scheduler.capture_finished()
+    # The next capture starts on the next event-loop turn, not inside capture_finished()
+    assert dispatched == ["dialog"] and scheduler.in_flight == "region"
+    app.processEvents()
+    assert dispatched == ["dialog", "region"]
+    scheduler.capture_finished()
+    app.processEvents()
+    scheduler.capture_finished()
+    assert dispatched == ["dialog", "region", "full"]
+    assert scheduler.in_flight is None
+
+
+def test_immediate_actions_skip_the_queue():
+    scheduler, dispatched = make_scheduler()
+    scheduler.trigger("dialog", 0.0)
+    scheduler.trigger("burst", 1.0)
+    assert dispatched == ["dialog", "burst"]
+    assert scheduler.in_flight == "dialog"
+
+
+def test_triggers_from_other_threads_are_delivered_on_the_gui_thread():
+    app = _app()
+    scheduler = CaptureScheduler()
+    threads_seen = []
+    scheduler.dispatch.connect(lambda action, at: threads_seen.append(threading.current_thread()))
+    worker = threading.Thread(target=lambda: scheduler.trigger("full"))
+    worker.start()
+    worker.join()
+    assert threads_seen == []
+    app.processEvents()
+    assert threads_seen == [threading.main_thread()]
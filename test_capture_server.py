@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Tests for the local capture API
+"""
+
+import json
+import os
+import threading
+
+from PyQt6.QtCore import QCoreApplication, QEventLoop, QTimer
+from PyQt6.QtGui import QImage
+
+from capture_backends import SyntheticCaptureBackend
+from capture_client import CaptureClient
+from capture_server import CaptureServer
+from encoders import QtEncoder
+from save_pipeline import SavePipeline
+from telemetry import metrics
+
+
+def _app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+class _Capture:
+    """The parts of ScreenshotCapture the server uses"""
+
+    def __init__(self, screenshot_dir):
+        self.backend = SyntheticCaptureBackend(320, 200)
+        self.encoder = QtEncoder("PNG", "png")
+        self.save_pipeline = SavePipeline(max_workers=2, max_pending=8)
+        self.screenshot_dir = screenshot_dir
+        self.recorded = []
+
+    def write_callback(self, mode, image, captured_at, crop_rect=None, dedup_action=None):
+        def on_written(filepath, nbytes, seconds):
+            self.recorded.append((mode, filepath, crop_rect))
+        return on_written
+
+
+def _run_clients(name, jobs):
+    """Run each job(client) on its own thread while the server's event loop spins"""
+    results = [None] * len(jobs)
+    def run(index, job):
+        client = CaptureClient(name)
+        try:
+            results[index] = job(client)
+        finally:
+            client.close()
+    threads = [threading.Thread(target=run, args=(i, job)) for i, job in enumerate(jobs)]
+    for thread in threads:
+        thread.start()
+    loop = QEventLoop()
+    timer = QTimer()
+    timer.timeout.connect(lambda: loop.quit() if not any(t.is_alive() for t in threads) else None)
+    timer.start(10)
+    QTimer.singleShot(10000, loop.quit)
+    loop.exec()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def _server(tmp_path, max_pending=32):
+    capture = _Capture(str(tmp_path))
+    server = CaptureServer(capture, max_pending=max_pending, name=f"ScreenshotServiceTest{os.getpid()}")
+    assert server.start()
+    return capture, server
+
+
+def test_full_region_and_bytes_captures(tmp_path):
+    app = _app()
+    capture, server = _server(tmp_path)
+    out = str(tmp_path / "out" / "region.png")
+    os.makedirs(os.path.dirname(out))
+    def job(client):
+        return [client.capture("full"),
+                client.capture("region", (10, 20, 64, 48), out=out),
+                client.capture("full", want_bytes=True)]
+    (full, region, raw), = _run_clients(server.name, [job])
+    server.close()
+    capture.save_pipeline.shutdown()
+
+    reply, data = full
+    assert reply["ok"] and data is None
+    assert os.path.dirname(reply["path"]) == str(tmp_path)
+    assert (reply["width"], reply["height"]) == (320, 200)
+    reply, _ = region
+    assert reply["path"] == out
+    assert QImage(out).width() == 64 and QImage(out).height() == 48
+    reply, data = raw
+    assert reply["length"] == len(data)
+    image = QImage()
+    assert image.loadFromData(data) and image.width() == 320
+    # Only captures saved into the screenshot folder are catalogued
+    assert [mode for mode, _, _ in capture.recorded] == ["full", "full"]
+
+
+def test_concurrent_clients_are_all_served(tmp_path):
+    app = _app()
+    capture, server = _server(tmp_path)
+    replies = _run_clients(server.name, [lambda client: client.capture("full")[0] for _ in range(6)])
+    server.close()
+    capture.save_pipeline.shutdown()
+    assert all(reply["ok"] for reply in replies)
+    assert len({reply["path"] for reply in replies}) == 6
+
+
+def test_requests_beyond_max_pending_are_answered_busy(tmp_path):
+    app = _app()
+    capture, server = _server(tmp_path, max_pending=1)
+    def job(client):
+        # Pipeline two requests before reading either reply
+        client._conn.sendall(b'{"id": 1, "capture": "full"}\n{"id": 2, "capture": "full"}\n')
+        return [client._read_line(), client._read_line()]
+    replies, = _run_clients(server.name, [job])
+    server.close()
+    capture.save_pipeline.shutdown()
+    by_id = {reply["id"]: reply for reply in replies}
+    assert by_id[1]["ok"]
+    assert by_id[2]["error"] == "busy"
+
+
+def test_invalid_requests_get_errors(tmp_path):
+    app = _app()
+    capture, server = _server(tmp_path)
+    def job(client):
+        client._conn.sendall(b'not json\n{"id": 7, "capture": "window"}\n')
+        return [client._read_line(), client._read_line()]
+    (bad_json, bad_mode), = _run_clients(server.name, [job])
+    server.close()
+    capture.save_pipeline.shutdown()
+    assert not bad_json["ok"]
+    assert bad_mode["id"] == 7 and "unknown capture mode" in bad_mode["error"]
+
+
+def test_requests_that_are_not_objects_are_rejected(tmp_path):
+    app = _app()
+    capture, server = _server(tmp_path)
+    def job(client):
+        client._conn.sendall(b'1\n[]\n"full"\n')
+        replies = [client._read_line() for _ in range(3)]
+        # The server is still serving afterwards
+        return replies + [client.capture("full")[0]]
+    replies, = _run_clients(server.name, [job])
+    server.close()
+    capture.save_pipeline.shutdown()
+    assert [reply["error"] for reply in replies[:3]] == ["request must be a JSON object"] * 3
+    assert replies[3]["ok"]
+
+
+def test_an_out_path_still_being_written_is_refused(tmp_path):
+    app = _app()
+    capture = _Capture(str(tmp_path))
+    # No save workers, so the first capture stays in flight
+    capture.save_pipeline = SavePipeline(max_workers=0, max_pending=8)
+    server = CaptureServer(capture, name=f"ScreenshotServiceTest{os.getpid()}")
+    assert server.start()
+    out = str(tmp_path / "same.png")
+    def job(client):
+        client._conn.sendall(b"".join(json.dumps({"id": index, "capture": "full", "out": out}).encode() + b"\n"
+                                      for index in (1, 2)))
+        return client._read_line()
+    refused, = _run_clients(server.name, [job])
+    server.close()
+    capture.save_pipeline.shutdown()
+    assert refused["id"] == 2 and "still being written" in refused["error"]
+
+
+def test_overlong_requests_close_the_connection(tmp_path):
+    app = _app()
+    capture = _Capture(str(tmp_path))
+    server = CaptureServer(capture, name=f"ScreenshotServiceTest{os.getpid()}", max_line_bytes=1024)
+    assert server.start()
+    def job(client):
+        client._conn.sendall(b"x" * 4096)
+        reply = client._read_line()
+        try:
+            client._read_line()
+        except ConnectionError:
+            return reply, True
+        return reply, False
+    (reply, closed), = _run_clients(server.name, [job])
+    server.close()
+    capture.save_pipeline.shutdown()
+    assert not reply["ok"] and "longer than 1024 bytes" in reply["error"]
+    assert closed
+
+
+def test_metrics_are_served_without_queueing_a_capture(tmp_path):
+    app = _app()
+    capture, server = _server(tmp_path)
+    metrics.enabled = True
+    metrics.reset()
+    try:
+        def job(client):
+            client.capture("full")
+            capture.save_pipeline.wait_idle()
+            return [client.telemetry("metrics"), client.telemetry("log", 5), client.telemetry("traces"),
+                    *(client.telemetry("log", lines) for lines in ("5", -1, 2.5))]
+        (served, log, unknown, *bad_lines), = _run_clients(server.name, [job])
+    finally:
+        metrics.enabled = False
+        metrics.reset()
+    server.close()
+    capture.save_pipeline.shutdown()
+    reply, text = served
+    assert reply["ok"]
+    assert 'screenshot_grab_seconds_count{mode="api"} 1' in text.splitlines()
+    assert 'screenshot_encode_seconds_count{format="PNG"} 1' in text.splitlines()
+    assert log[0]["ok"]
+    assert "unknown telemetry" in unknown[0]["error"]
+    assert [reply["error"] for reply, _ in bad_lines] == ["lines must be a non-negative integer"] * 3
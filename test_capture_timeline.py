@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Tests for the capture latency timeline
+"""
+
+import threading
+
+from capture_timeline import CaptureTimeline
+
+
+def test_marks_are_relative_to_the_start():
+    timeline = CaptureTimeline("full", started_at=100.0)
+    timeline.mark("hotkey", at=100.0)
+    timeline.mark("hidden", "presented", at=100.05)
+    assert round(timeline.elapsed_ms("hidden"), 6) == 50.0
+    assert timeline.elapsed_ms("saved") is None
+    summary = timeline.summary()
+    assert summary.startswith("Capture timeline (full): hotkey +0.0")
+    assert "hidden +50.0 (presented)" in summary
+
+
+def test_completes_once_when_final_stages_arrive_in_any_order():
+    timeline = CaptureTimeline()
+    assert not timeline.mark("grabbed")
+    assert not timeline.mark("saved")
+    assert timeline.mark("clipboard")
+    assert not timeline.mark("clipboard")
+
+
+def test_marks_from_several_threads_are_all_kept():
+    timeline = CaptureTimeline(complete_on=("never",))
+    threads = [threading.Thread(target=lambda: [timeline.mark("saved") for _ in range(100)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert timeline.summary().count("saved") == 400
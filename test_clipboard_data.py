@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Tests for the deferred clipboard data
+"""
+
+from PyQt6.QtCore import QUrl
+from PyQt6.QtGui import QImage
+
+from capture_backends import SyntheticCaptureBackend
+from clipboard_data import DeferredImageMimeData, path_mime_data
+
+
+def test_image_is_encoded_once_and_only_when_asked_for():
+    image = SyntheticCaptureBackend(320, 200).grab()
+    data = DeferredImageMimeData(image)
+    assert data.hasFormat("image/png") and data.hasImage()
+    assert data.encodes == 0
+    assert data.imageData() == image
+    assert data.encodes == 0
+    png = data.data("image/png")
+    assert data.data("image/png") == png
+    assert data.encodes == 1
+    assert QImage.fromData(png, "PNG").convertToFormat(image.format()) == image
+
+
+def test_png_is_served_from_the_saved_file(tmp_path):
+    image = SyntheticCaptureBackend(320, 200).grab()
+    path = tmp_path / "cropped_screenshot_20240101_000000.png"
+    image.save(str(path))
+    data = DeferredImageMimeData(image, str(path))
+    assert bytes(data.data("image/png")) == path.read_bytes()
+    assert data.encodes == 0
+    # Not written yet: falls back to encoding the image
+    pending = DeferredImageMimeData(image, str(tmp_path / "missing.png"))
+    assert not pending.data("image/png").isEmpty()
+    assert pending.encodes == 1
+
+
+def test_path_mode_holds_the_file_url(tmp_path):
+    path = str(tmp_path / "full_screenshot_20240101_000000.png")
+    data = path_mime_data(path)
+    assert data.text() == path
+    assert data.urls() == [QUrl.fromLocalFile(path)]
+    assert not data.hasImage()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for the output encoders
+"""
+
+import subprocess
+import sys
+
+import pytest
+from PyQt6.QtGui import QColor, QImage
+
+from capture_backends import SyntheticCaptureBackend
+from encoders import PNG_FILTERS, PngEncoder, QtEncoder, create_encoder
+from save_pipeline import write_image
+
+
+def _frame():
+    return SyntheticCaptureBackend(97, 61).grab()
+
+
+@pytest.mark.parametrize("png_filter", sorted(PNG_FILTERS))
+@pytest.mark.parametrize("level", [1, 9])
+def test_png_encoder_round_trips(png_filter, level):
+    frame = _frame()
+    decoded = QImage.fromData(PngEncoder(level=level, filter=png_filter).encode(frame))
+    assert decoded.convertToFormat(QImage.Format.Format_RGB32) == frame
+
+
+def test_png_encoder_keeps_alpha():
+    frame = QImage(16, 9, QImage.Format.Format_ARGB32)
+    frame.fill(QColor(10, 20, 30, 40))
+    decoded = QImage.fromData(PngEncoder(filter="paeth").encode(frame))
+    assert decoded.hasAlphaChannel()
+    assert decoded.pixelColor(3, 3).alpha() == 40
+
+
+def test_lossless_webp_round_trips():
+    encoder = create_encoder({"encoder": "webp", "webp_lossless": True})
+    assert encoder.extension == "webp"
+    decoded = QImage.fromData(encoder.encode(_frame()))
+    assert decoded.convertToFormat(QImage.Format.Format_RGB32) == _frame()
+
+
+def test_create_encoder_settings():
+    assert isinstance(create_encoder({}), QtEncoder)
+    assert create_encoder({"encoder": "jpeg", "jpeg_quality": 70}).extension == "jpg"
+    png = create_encoder({"encoder": "png", "png_filter": "up", "png_level": 1})
+    assert isinstance(png, PngEncoder) and png.level == 1
+    assert create_encoder({"encoder": "qoi"}).extension == "qoi"
+
+
+def test_qoi_falls_back_to_png_without_the_qoi_package(monkeypatch):
+    monkeypatch.setitem(sys.modules, "qoi", None)
+    assert create_encoder({"encoder": "qoi"}).extension == "png"
+
+
+def test_write_image_uses_encoder(tmp_path):
+    path = str(tmp_path / "shot.jpg")
+    write_image(_frame(), path, create_encoder({"encoder": "jpeg"}))
+    with open(path, "rb") as f:
+        assert f.read(2) == b"\xff\xd8"
+
+
+def test_importing_encoders_and_dedup_does_not_load_numpy():
+    code = "import sys, encoders, frame_dedup, capture_backends; print('numpy' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for frame-difference deduplication
+"""
+
+import os
+
+from PyQt6.QtCore import QRect
+from PyQt6.QtGui import QColor, QImage, QPainter
+
+from capture_backends import SyntheticCaptureBackend
+from frame_dedup import FrameDeduplicator, TileHasher, apply_delta, delta_path
+from save_pipeline import write_image
+
+
+def _frame(block=None):
+    image = SyntheticCaptureBackend(200, 130, static=True).grab()
+    if block is not None:
+        painter = QPainter(image)
+        painter.fillRect(block, QColor(255, 0, 0))
+        painter.end()
+    return image
+
+
+def test_tile_hashes_localize_changes():
+    hasher = TileHasher(tile_size=32)
+    before = hasher.hash_image(_frame())
+    after = hasher.hash_image(_frame(QRect(40, 40, 10, 10)))
+    assert before.shape == (5, 7)
+    changed = before != after
+    assert changed.sum() == 1 and changed[1, 1]
+
+
+def test_identical_frames_are_skipped():
+    dedup = FrameDeduplicator(mode="skip", tile_size=32)
+    assert dedup.check(_frame(), "a.png").action == "full"
+    decision = dedup.check(_frame(), "b.png")
+    assert decision.action == "skip" and decision.duplicate_of == "a.png"
+    assert dedup.check(_frame(QRect(0, 0, 5, 5)), "c.png").action == "full"
+    stats = dedup.stats()
+    assert stats["frames_seen"] == 3 and stats["frames_skipped"] == 1
+    assert stats["hash_ms_per_frame"] >= 0.0
+
+
+def test_threshold_tolerates_small_changes():
+    dedup = FrameDeduplicator(mode="skip", tile_size=32, threshold=0.05)
+    dedup.check(_frame(), "a.png")
+    assert dedup.check(_frame(QRect(0, 0, 5, 5)), "b.png").action == "skip"
+
+
+def test_delta_round_trip(tmp_path):
+    dedup = FrameDeduplicator(mode="delta", tile_size=32)
+    keyframe_path = str(tmp_path / "key.png")
+    assert dedup.check(_frame(), keyframe_path).action == "full"
+    write_image(_frame(), keyframe_path)
+    changed = _frame(QRect(70, 70, 20, 20))
+    decision = dedup.check(changed, str(tmp_path / "next.png"))
+    assert decision.action == "delta" and decision.keyframe == keyframe_path
+    path = delta_path(str(tmp_path / "next.png"))
+    write_image(dedup.build_delta(changed, decision), path)
+    rebuilt = apply_delta(path)
+    assert rebuilt.convertToFormat(QImage.Format.Format_RGB32) == changed.convertToFormat(QImage.Format.Format_RGB32)
+
+
+def test_skip_after_a_delta_points_at_the_written_delta(tmp_path):
+    dedup = FrameDeduplicator(mode="delta", tile_size=32)
+    keyframe_path = str(tmp_path / "full_1.png")
+    dedup.check(_frame(), keyframe_path)
+    write_image(_frame(), keyframe_path)
+    changed = _frame(QRect(70, 70, 20, 20))
+    decision = dedup.check(changed, str(tmp_path / "full_2.png"))
+    assert decision.action == "delta"
+    write_image(dedup.build_delta(changed, decision), delta_path(str(tmp_path / "full_2.png")))
+    skipped = dedup.check(changed, str(tmp_path / "full_3.png"))
+    assert skipped.action == "skip"
+    assert os.path.exists(skipped.duplicate_of)
+
+
+def test_only_committed_frames_become_the_reference(tmp_path):
+    dedup = FrameDeduplicator(mode="delta", tile_size=32)
+    keyframe_path = str(tmp_path / "full_1.png")
+    # A keyframe that was never queued is not skipped against
+    dedup.decide(_frame(), keyframe_path)
+    first = dedup.decide(_frame(), keyframe_path)
+    assert first.action == "full" and first.new_keyframe
+    dedup.commit(first)
+    changed = _frame(QRect(70, 70, 20, 20))
+    decision = dedup.decide(changed, str(tmp_path / "full_2.png"))
+    assert decision.action == "delta" and decision.keyframe == keyframe_path
+    assert decision.filepath == delta_path(str(tmp_path / "full_2.png"))
+    assert dedup.decide(changed, str(tmp_path / "full_3.png")).action == "delta"
+
+
+def test_a_failed_write_starts_a_new_keyframe(tmp_path):
+    dedup = FrameDeduplicator(mode="delta", tile_size=32)
+    keyframe_path = str(tmp_path / "full_1.png")
+    dedup.check(_frame(), keyframe_path)
+    assert not dedup.discard(str(tmp_path / "other.png"))
+    assert dedup.discard(keyframe_path)
+    decision = dedup.check(_frame(QRect(70, 70, 20, 20)), str(tmp_path / "full_2.png"))
+    assert decision.action == "full" and decision.new_keyframe
+    assert dedup.check(_frame(QRect(70, 70, 20, 20)), str(tmp_path / "full_3.png")).duplicate_of == \
+        str(tmp_path / "full_2.png")
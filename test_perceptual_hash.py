@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tests for perceptual hashing and the nearest-capture lookup
+"""
+
+import random
+import sqlite3
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QColor, QImage, QPainter
+
+from perceptual_hash import band_neighbours, find_similar, hamming, index_missing, phash
+from screenshot_catalog import ScreenshotCatalog, hash_bands
+
+
+def _screen(seed, width=640, height=400, clock=False):
+    """A window-like layout of coloured panels that differs per seed"""
+    rng = random.Random(seed)
+    image = QImage(width, height, QImage.Format.Format_RGB32)
+    image.fill(QColor(240, 240, 240))
+    painter = QPainter(image)
+    for _ in range(12):
+        painter.fillRect(rng.randrange(width), rng.randrange(height), rng.randrange(40, 300),
+                         rng.randrange(20, 200), QColor(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    if clock:
+        # The same screen a minute later
+        painter.fillRect(width - 40, height - 20, 30, 12, QColor(0, 0, 0))
+    painter.end()
+    return image
+
+
+def test_phash_is_stable_under_rescaling_and_small_edits():
+    image = _screen(1)
+    edited = _screen(1, clock=True)
+    half = image.scaled(320, 200, transformMode=Qt.TransformationMode.SmoothTransformation)
+    assert hamming(phash(image), phash(half)) <= 4
+    assert hamming(phash(image), phash(edited)) <= 6
+    assert min(hamming(phash(image), phash(_screen(seed))) for seed in range(2, 10)) > 12
+
+
+def _hashed_catalog(tmp_path):
+    """Catalog of 300 hashed entries and a query hash; a third of them lie a few bits from the query"""
+    catalog = ScreenshotCatalog(str(tmp_path))
+    rng = random.Random(7)
+    query = rng.getrandbits(64)
+    hashes = {}
+    for index in range(300):
+        # Mostly unrelated hashes, some a few bits away from the query
+        value = query ^ sum(1 << bit for bit in rng.sample(range(64), rng.randrange(1, 14))) if index % 3 == 0 \
+            else rng.getrandbits(64)
+        path = tmp_path / f"full_screenshot_20240101_{index:06d}.png"
+        path.write_bytes(b"x")
+        catalog.record(str(path), "full", captured_at=index)
+        catalog.set_perceptual_hash(str(path), value)
+        hashes[str(path)] = value
+    return catalog, query, hashes
+
+
+def test_band_lookup_matches_a_linear_scan(tmp_path):
+    catalog, query, hashes = _hashed_catalog(tmp_path)
+    expected = sorted(hamming(query, value) for value in hashes.values() if hamming(query, value) <= 10)
+    matches = find_similar(catalog, query, limit=len(hashes), max_distance=10)
+    assert [distance for distance, _ in matches] == expected
+    nearest = find_similar(catalog, query, limit=3, max_distance=10)
+    assert [distance for distance, _ in nearest] == expected[:3]
+    assert all(entry["perceptual_hash"] == hashes[entry["path"]] for _, entry in matches)
+    catalog.close()
+
+
+def test_large_distances_stay_within_sqlite_variable_limits(tmp_path):
+    catalog, query, hashes = _hashed_catalog(tmp_path)
+    # The lowest limit SQLite has shipped with; builds differ
+    catalog._conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+    # Band radius 4 binds over 10000 values, split across queries
+    neighbours = [band_neighbours(band, 4) for band in hash_bands(query)]
+    chunked = catalog.perceptual_hash_candidates(neighbours)
+    expected = {path for path, value in hashes.items()
+                if any(band in values for band, values in zip(hash_bands(value), neighbours))}
+    assert {entry["path"] for entry in chunked} == expected
+    for max_distance in (24, 40):
+        matches = find_similar(catalog, query, limit=len(hashes), max_distance=max_distance)
+        assert [distance for distance, _ in matches] == sorted(
+            distance for distance in (hamming(query, value) for value in hashes.values()) if distance <= max_distance)
+    catalog.close()
+
+
+def test_indexing_pass_hashes_existing_files(tmp_path):
+    _screen(1).save(str(tmp_path / "full_screenshot_20240101_000000.png"))
+    _screen(2).save(str(tmp_path / "full_screenshot_20240101_000001.png"))
+    _screen(1, clock=True).save(str(tmp_path / "cropped_screenshot_20240101_000100.png"))
+    _screen(3).save(str(tmp_path / "cropped_screenshot_20240102_000000.png"))
+    catalog = ScreenshotCatalog(str(tmp_path))
+    catalog.sync_directory()
+    assert index_missing(catalog) == 4
+    assert index_missing(catalog) == 0
+    query = str(tmp_path / "full_screenshot_20240101_000000.png")
+    matches = find_similar(catalog, catalog.perceptual_hash(query), limit=5, exclude=query)
+    assert [entry["path"] for _, entry in matches] == [str(tmp_path / "cropped_screenshot_20240101_000100.png")]
+    catalog.close()
+
+
+def test_removed_entries_take_their_hash_with_them(tmp_path):
+    catalog = ScreenshotCatalog(str(tmp_path))
+    first, second = tmp_path / "full_screenshot_20240101_000000.png", tmp_path / "full_screenshot_20240101_000001.png"
+    first.write_bytes(b"x")
+    second.write_bytes(b"x")
+    first, second = str(first), str(second)
+    catalog.record(first, "full", captured_at=1)
+    catalog.set_perceptual_hash(first, 0x1234)
+    catalog.remove(first)
+    # The freed id is handed to the next entry, which must not inherit the old hash
+    catalog.record(second, "full", captured_at=2)
+    assert catalog.perceptual_hash(second) is None
+    assert catalog.without_perceptual_hash() == [second]
+    catalog.close()
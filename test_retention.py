@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Tests for retention, quota and background compaction
+"""
+
+import os
+import time
+import zipfile
+
+from PyQt6.QtGui import QImage
+
+from retention import DAY, RetentionManager
+from save_pipeline import write_image
+from screenshot_catalog import ScreenshotCatalog
+from settings import DEFAULT_SETTINGS
+
+NOW = 1_700_000_000.0
+
+
+def _photo(width=160, height=100):
+    """Noisy frame that PNG cannot shrink much, like a photo or video on screen"""
+    return QImage(os.urandom(width * height * 3), width, height, width * 3, QImage.Format.Format_RGB888).copy()
+
+
+def _setup(tmp_path, ages_days, **settings):
+    """Catalog with one full capture per age (in days before NOW), oldest first"""
+    directory = str(tmp_path)
+    catalog = ScreenshotCatalog(directory)
+    paths = []
+    for index, age in enumerate(ages_days):
+        path = os.path.join(directory, f"full_screenshot_{index:03d}.png")
+        write_image(_photo(), path)
+        catalog.record(path, "full", captured_at=NOW - age * DAY, width=160, height=100)
+        paths.append(path)
+    manager = RetentionManager({**DEFAULT_SETTINGS, **settings}, directory, catalog)
+    return manager, catalog, paths
+
+
+def _add_delta(catalog, keyframe, age):
+    """Record a delta frame rebuilt from keyframe, age days before NOW"""
+    path = os.path.splitext(keyframe)[0] + f"_{age}.delta.png"
+    image = _photo()
+    image.setText("keyframe", os.path.basename(keyframe))
+    assert image.save(path)
+    catalog.record(path, "full", captured_at=NOW - age * DAY, width=160, height=100)
+    return path
+
+
+def test_old_captures_are_deleted_and_the_quota_drops_the_oldest(tmp_path):
+    manager, catalog, paths = _setup(tmp_path, [40, 20, 10, 1], retention_max_age_days=30)
+    stats = manager.run_pass(now=NOW)
+    assert stats["deleted"] == 1 and not os.path.exists(paths[0])
+    assert catalog.get(paths[0]) is None
+    per_file = os.path.getsize(paths[1])
+    manager.settings["retention_max_total_mb"] = (per_file * 1.5) / (1024 * 1024)
+    manager.run_pass(now=NOW)
+    assert [os.path.exists(path) for path in paths[1:]] == [False, False, True]
+    catalog.close()
+
+
+def test_recompress_then_archive_by_day(tmp_path):
+    manager, catalog, paths = _setup(tmp_path, [9, 9, 3, 0], retention_recompress_after_days=2,
+                                     retention_archive_after_days=7)
+    stats = manager.run_pass(now=NOW)
+    assert stats["recompressed"] == 3 and stats["archived"] == 2
+    webp = os.path.splitext(paths[2])[0] + ".webp"
+    assert os.path.exists(webp) and not os.path.exists(paths[2])
+    assert catalog.get(webp)["captured_at"] == NOW - 3 * DAY
+    assert os.path.exists(paths[3])
+    archives = os.listdir(manager.archive_dir)
+    assert len(archives) == 1 and archives[0].startswith("screenshots_")
+    with zipfile.ZipFile(os.path.join(manager.archive_dir, archives[0])) as archive:
+        assert sorted(archive.namelist()) == ["full_screenshot_000.webp", "full_screenshot_001.webp"]
+    assert catalog.stats()["full"]["count"] == 2
+    catalog.close()
+
+
+def test_an_interrupted_archive_pass_resumes_without_duplicates(tmp_path):
+    manager, catalog, paths = _setup(tmp_path, [9, 9], retention_archive_after_days=7)
+    manager.run_pass(now=NOW)
+    archive_path = os.path.join(manager.archive_dir, os.listdir(manager.archive_dir)[0])
+    # Simulate a pass that stopped after writing the archive but before removing the files
+    for path in paths:
+        with zipfile.ZipFile(archive_path) as archive:
+            with open(path, "wb") as f:
+                f.write(archive.read(os.path.basename(path)))
+        catalog.record(path, "full", captured_at=NOW - 9 * DAY)
+    stats = manager.run_pass(now=NOW)
+    assert stats["archived"] == 2 and len(os.listdir(manager.archive_dir)) == 1
+    assert not any(os.path.exists(path) for path in paths)
+    catalog.close()
+
+
+def test_work_waits_while_a_capture_is_busy(tmp_path):
+    manager, catalog, paths = _setup(tmp_path, [40], retention_max_age_days=30)
+    busy_until = time.monotonic() + 0.3
+    manager.is_busy = lambda: time.monotonic() < busy_until
+    manager.run_pass(now=NOW)
+    assert time.monotonic() >= busy_until and not os.path.exists(paths[0])
+    catalog.close()
+
+
+def test_keyframes_outlive_expiry_and_archiving_while_their_deltas_remain(tmp_path):
+    manager, catalog, paths = _setup(tmp_path, [40, 40], retention_max_age_days=30)
+    keyframe = paths[0]
+    old_delta = _add_delta(catalog, keyframe, 35)
+    new_delta = _add_delta(catalog, keyframe, 10)
+    manager.run_pass(now=NOW)
+    assert os.path.exists(keyframe) and os.path.exists(new_delta)
+    assert not os.path.exists(old_delta) and not os.path.exists(paths[1])
+
+    manager.settings.update(retention_max_age_days=0, retention_archive_after_days=30)
+    manager.run_pass(now=NOW)
+    assert os.path.exists(keyframe) and not os.path.exists(manager.archive_dir)
+
+    # Once its last delta is archived on the same day, the keyframe goes into that zip too
+    catalog.record(new_delta, "full", captured_at=NOW - 40 * DAY, width=160, height=100)
+    manager.run_pass(now=NOW)
+    with zipfile.ZipFile(os.path.join(manager.archive_dir, os.listdir(manager.archive_dir)[0])) as archive:
+        assert sorted(archive.namelist()) == sorted(os.path.basename(path) for path in (keyframe, new_delta))
+    catalog.close()
+
+
+def test_quota_evicts_a_keyframe_with_its_deltas_and_counts_other_folders(tmp_path):
+    manager, catalog, paths = _setup(tmp_path, [40, 30, 20])
+    delta = _add_delta(catalog, paths[0], 25)
+    per_file = os.path.getsize(paths[1])
+    recordings = tmp_path / "recordings"
+    recordings.mkdir()
+    recording = recordings / "recording_1.png"
+    recording.write_bytes(os.urandom(per_file))
+    os.utime(recording, (NOW - 35 * DAY, NOW - 35 * DAY))
+    roi = tmp_path / "roi" / "clock"
+    roi.mkdir(parents=True)
+    (roi / "clock_1.png").write_bytes(os.urandom(per_file))
+    # Six files of about per_file bytes each and room for three: the keyframe and its
+    # delta go first, then the recording, which is older than the remaining captures
+    manager.settings["retention_max_total_mb"] = (per_file * 3.5) / (1024 * 1024)
+    manager.run_pass(now=NOW)
+    assert not any(os.path.exists(path) for path in (paths[0], delta, recording))
+    assert os.path.exists(paths[1]) and os.path.exists(paths[2]) and (roi / "clock_1.png").exists()
+    catalog.close()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for scheduled region-of-interest capture
+"""
+
+import json
+import os
+
+import pytest
+from PyQt6.QtCore import QRect
+
+from capture_backends import SyntheticCaptureBackend
+from roi_capture import RoiRegion, RoiScheduler, crop_region, group_regions, load_roi_config
+from save_pipeline import SavePipeline
+
+
+class _RecordingBackend(SyntheticCaptureBackend):
+    def __init__(self):
+        super().__init__(400, 300, static=True)
+        self.grabbed = []
+
+    def grab(self, rect=None):
+        self.grabbed.append(rect)
+        return super().grab(rect)
+
+
+def test_overlapping_regions_are_grouped_transitively():
+    a = RoiRegion("a", QRect(0, 0, 50, 50), 1)
+    b = RoiRegion("b", QRect(200, 0, 50, 50), 1)
+    c = RoiRegion("c", QRect(40, 40, 170, 20), 1)  # bridges a and b
+    d = RoiRegion("d", QRect(0, 200, 10, 10), 1)
+    groups = group_regions([a, b, d, c])
+    assert sorted((bounds.getRect(), sorted(r.name for r in members)) for bounds, members in groups) == [
+        ((0, 0, 250, 60), ["a", "b", "c"]),
+        ((0, 200, 10, 10), ["d"]),
+    ]
+
+
+def test_grouped_crops_match_direct_grabs():
+    backend = SyntheticCaptureBackend(400, 300, static=True)
+    bounds = QRect(20, 30, 200, 100)
+    image = backend.grab(bounds)
+    rect = QRect(60, 50, 40, 30)
+    assert crop_region(image, bounds, rect) == backend.grab(rect)
+    doubled = image.scaled(400, 200)
+    assert crop_region(doubled, bounds, rect).size().width() == 80
+
+
+def test_due_regions_share_one_grab_and_are_saved(tmp_path):
+    backend = _RecordingBackend()
+    pipeline = SavePipeline(max_workers=1)
+    regions = [RoiRegion("left", QRect(0, 0, 100, 100), 5), RoiRegion("inner", QRect(50, 50, 20, 20), 1),
+               RoiRegion("far", QRect(300, 200, 50, 50), 60)]
+    scheduler = RoiScheduler(backend, regions, str(tmp_path), pipeline)
+    scheduler.start()
+    scheduler.stop()
+    now = regions[0].next_due
+    scheduler.capture_due(now)
+    pipeline.wait_idle()
+    assert sorted(rect.getRect() for rect in backend.grabbed) == [(0, 0, 100, 100), (300, 200, 50, 50)]
+    for name in ("left", "inner", "far"):
+        assert len(os.listdir(tmp_path / name)) == 1
+    # One second later only "inner" is due, and it is grabbed on its own
+    scheduler.capture_due(now + 1.0)
+    assert backend.grabbed[-1].getRect() == (50, 50, 20, 20)
+    assert scheduler.stats["grabs"] == 3 and scheduler.stats["regions_captured"] == 4
+    pipeline.shutdown()
+
+
+def test_config_is_validated(tmp_path):
+    path = tmp_path / "roi.json"
+    path.write_text(json.dumps({"regions": [{"name": "bar", "rect": [0, 0, 10, 10], "interval_s": 2}]}))
+    regions, window = load_roi_config(str(path))
+    assert regions[0].rect == QRect(0, 0, 10, 10) and regions[0].interval == 2.0 and window == 100
+    path.write_text(json.dumps({"regions": [{"name": "bad name", "rect": [0, 0, 10, 10], "interval_s": 2}]}))
+    with pytest.raises(ValueError):
+        load_roi_config(str(path))
+    path.write_text(json.dumps({"regions": [{"name": "bar", "rect": [0, 0, 0, 10], "interval_s": 2}]}))
+    with pytest.raises(ValueError):
+        load_roi_config(str(path))
+
+
+@pytest.mark.parametrize("config, message", [
+    ([], "JSON object"),
+    ({"regions": {"name": "bar"}}, "regions must be a list"),
+    ({"regions": ["bar"]}, "Region 0"),
+    ({"regions": [{"name": 7, "rect": [0, 0, 10, 10], "interval_s": 2}]}, "Region 0"),
+    ({"regions": [{"name": "bar", "rect": [0, 0, 10, 10], "interval_s": 2},
+                  {"name": "baz", "rect": ["0", "0", "10", "10"], "interval_s": 2}]}, "Region 1"),
+    ({"regions": [{"name": "bar", "rect": [0, 0, 10, 10], "interval_s": "often"}]}, "Region 0"),
+    ({"regions": [{"name": "bar", "rect": [0, 0, 10, 10], "interval_s": True}]}, "Region 0"),
+    ({"regions": [], "group_window_ms": "soon"}, "group_window_ms"),
+])
+def test_malformed_configs_raise_value_error(tmp_path, config, message):
+    path = tmp_path / "roi.json"
+    path.write_text(json.dumps(config))
+    with pytest.raises(ValueError, match=message):
+        load_roi_config(str(path))
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests for the background save pipeline
+"""
+
+import os
+
+from PyQt6.QtGui import QImage, QColor
+
+from save_pipeline import SavePipeline, capture_timestamp
+
+
+def _image(width=64, height=48):
+    image = QImage(width, height, QImage.Format.Format_RGB32)
+    image.fill(QColor(10, 120, 200))
+    return image
+
+
+def test_save_pipeline_writes_files(tmp_path):
+    pipeline = SavePipeline(max_workers=2, max_pending=4)
+    paths = [str(tmp_path / f"shot_{i}.png") for i in range(6)]
+    for path in paths:
+        assert pipeline.submit(_image(), path)
+    pipeline.wait_idle()
+    pipeline.shutdown()
+    for path in paths:
+        assert os.path.exists(path)
+        assert QImage(path).size() == _image().size()
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".part")]
+
+
+def test_save_pipeline_rejects_after_shutdown(tmp_path):
+    pipeline = SavePipeline(max_workers=1)
+    pipeline.shutdown()
+    assert not pipeline.submit(_image(), str(tmp_path / "late.png"))
+
+
+def test_save_pipeline_cleans_up_failed_writes(tmp_path):
+    pipeline = SavePipeline(max_workers=1)
+    bad_path = str(tmp_path / "shot.unknownformat")
+    pipeline.submit(_image(), bad_path)
+    pipeline.wait_idle()
+    pipeline.shutdown()
+    assert not os.path.exists(bad_path)
+    assert not os.path.exists(bad_path + ".part")
+
+
+def test_capture_timestamps_never_repeat():
+    stamps = [capture_timestamp() for _ in range(1000)]
+    assert len(set(stamps)) == len(stamps)
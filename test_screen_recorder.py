@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for screen recording
+"""
+
+import threading
+
+import numpy as np
+from PIL import Image
+from PyQt6.QtCore import Qt
+
+from capture_backends import SyntheticCaptureBackend
+from encoders import qimage_to_rgb_array
+from screen_recorder import ScreenRecorder
+
+
+class _ScriptedBackend(SyntheticCaptureBackend):
+    """Advances the synthetic frame only when told to, so some grabs repeat the last frame"""
+
+    def __init__(self):
+        super().__init__(320, 200)
+        self.last = None
+        self.hold = False
+
+    def grab(self, rect=None):
+        if self.hold and self.last is not None:
+            return self.last
+        self.last = super().grab(rect)
+        return self.last
+
+
+def _record(recorder, backend, pattern):
+    recorder.start()
+    recorder._timer.stop()
+    for hold in pattern:
+        backend.hold = hold
+        recorder.capture_frame()
+    recorder.stop(wait=True)
+    return recorder.stats()
+
+
+def test_apng_stores_changed_regions_and_skips_unchanged_frames(tmp_path):
+    backend = _ScriptedBackend()
+    recorder = ScreenRecorder(backend, str(tmp_path), fmt="apng", max_queue=64, keyframe_interval=3)
+    finished = []
+    recorder.finished.connect(lambda path, stats: finished.append(path), type=Qt.ConnectionType.DirectConnection)
+    stats = _record(recorder, backend, [False, True, True, False, False, False, True])
+    assert stats["frames_captured"] == 8
+    assert stats["frames_unchanged"] == 3
+    assert stats["frames_encoded"] == 5
+    assert stats["keyframes"] == 2
+    assert finished == [recorder.filepath]
+    with Image.open(recorder.filepath) as animation:
+        assert animation.n_frames == 5
+        animation.seek(1)
+        # The second frame only holds the tiles the moving block touched
+        assert animation.dispose_extent[2] - animation.dispose_extent[0] < 320
+        animation.seek(4)
+        last = np.asarray(animation.convert("RGB"))
+    assert np.array_equal(last, qimage_to_rgb_array(backend.last))
+
+
+def test_webp_recording_reads_back(tmp_path):
+    backend = _ScriptedBackend()
+    recorder = ScreenRecorder(backend, str(tmp_path), fmt="webp", max_queue=64)
+    stats = _record(recorder, backend, [False, False, True])
+    with Image.open(recorder.filepath) as animation:
+        assert animation.n_frames == stats["frames_encoded"] == 3
+
+
+def test_webp_falls_back_to_apng_without_the_streaming_encoder(tmp_path, monkeypatch):
+    from PIL import _webp
+    monkeypatch.delattr(_webp, "WebPAnimEncoder")
+    backend = _ScriptedBackend()
+    recorder = ScreenRecorder(backend, str(tmp_path), fmt="webp", max_queue=64)
+    stats = _record(recorder, backend, [False, False, True])
+    assert recorder.filepath.endswith(".png")
+    with Image.open(recorder.filepath) as animation:
+        assert animation.format == "PNG" and animation.n_frames == stats["frames_encoded"]
+
+
+def test_frames_are_dropped_when_the_encoder_falls_behind(tmp_path):
+    gate = threading.Event()
+
+    class _SlowRecorder(ScreenRecorder):
+        def _create_writer(self, width, height):
+            writer = super()._create_writer(width, height)
+            add_frame = writer.add_frame
+            writer.add_frame = lambda *args: (gate.wait(), add_frame(*args))
+            return writer
+
+    backend = _ScriptedBackend()
+    recorder = _SlowRecorder(backend, str(tmp_path), fmt="apng", max_queue=2)
+    recorder.start()
+    recorder._timer.stop()
+    for _ in range(10):
+        recorder.capture_frame()
+    gate.set()
+    recorder.stop(wait=True)
+    stats = recorder.stats()
+    # The encoder holds at most one frame and the queue two
+    assert stats["frames_captured"] <= 4
+    assert stats["frames_dropped"] == 11 - stats["frames_captured"]
+    assert stats["max_queue_depth"] <= 2
+    with Image.open(recorder.filepath) as animation:
+        assert animation.n_frames == stats["frames_encoded"]
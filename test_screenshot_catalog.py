@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite screenshot catalog
+"""
+
+import os
+from datetime import datetime
+
+from capture_backends import SyntheticCaptureBackend
+from save_pipeline import write_image
+from screenshot_catalog import ScreenshotCatalog, parse_filename
+
+
+def _write(directory, name):
+    path = os.path.join(directory, name)
+    write_image(SyntheticCaptureBackend(40, 30).grab(), path)
+    return path
+
+
+def test_record_and_paginate(tmp_path):
+    catalog = ScreenshotCatalog(str(tmp_path))
+    paths = [_write(str(tmp_path), f"shot_{i}.png") for i in range(5)]
+    for i, path in enumerate(paths):
+        mode = "cropped" if i % 2 else "full"
+        crop = (1, 2, 3, 4) if mode == "cropped" else None
+        catalog.record(path, mode, captured_at=1000.0 + i, width=40, height=30, crop_rect=crop)
+    rows, token = catalog.query(limit=2)
+    assert [row["captured_at"] for row in rows] == [1004.0, 1003.0]
+    rows, token = catalog.query(limit=2, page_token=token)
+    assert [row["captured_at"] for row in rows] == [1002.0, 1001.0]
+    rows, token = catalog.query(limit=2, page_token=token)
+    assert [row["captured_at"] for row in rows] == [1000.0] and token is None
+    cropped, _ = catalog.query(mode="cropped")
+    assert [row["crop_width"] for row in cropped] == [3, 3]
+    ranged, _ = catalog.query(since=1001.0, until=1003.0)
+    assert [row["captured_at"] for row in ranged] == [1002.0, 1001.0]
+    assert catalog.stats()["full"]["count"] == 3
+    catalog.close()
+
+
+def test_sync_directory_is_incremental(tmp_path):
+    directory = str(tmp_path)
+    first = _write(directory, "full_screenshot_20240131_093000.png")
+    _write(directory, "cropped_screenshot_20240131_093001.png")
+    catalog = ScreenshotCatalog(directory)
+    assert catalog.sync_directory() == (2, 0)
+    assert catalog.sync_directory() == (0, 0)
+    entry = catalog.get(first)
+    assert entry["mode"] == "full" and entry["width"] == 40
+    assert entry["captured_at"] == datetime(2024, 1, 31, 9, 30).timestamp()
+    os.remove(first)
+    _write(directory, "burst_20240131_093002_000001_000000.png")
+    assert catalog.sync_directory() == (1, 1)
+    catalog.close()
+
+
+def test_parse_filename():
+    assert parse_filename("burst_20240131_093002_000001_000007.png")[0] == "burst"
+    assert parse_filename("notes.png") == (None, None)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests for logging and metrics
+"""
+
+import io
+import logging
+
+from capture_backends import SyntheticCaptureBackend
+from save_pipeline import write_image
+from telemetry import (Metrics, configure_logging, metrics, recent_log,
+                       shutdown_logging)
+
+
+def test_disabled_metrics_record_nothing():
+    registry = Metrics()
+    span = registry.span("grab", mode="full")
+    assert span is registry.span("encode")
+    with span:
+        pass
+    registry.inc("captures_total")
+    registry.observe("grab_seconds", 0.01)
+    assert registry.counter("captures_total") == 0
+    assert registry.histogram("grab_seconds") is None
+    assert registry.render() == ""
+
+
+def test_counters_and_histograms_render_as_prometheus_text():
+    registry = Metrics(enabled=True, buckets=(0.01, 0.1))
+    registry.inc("captures_total", mode="full")
+    registry.inc("captures_total", 2, mode="full")
+    registry.inc("captures_total", mode='a"b')
+    for seconds in (0.005, 0.05, 0.5):
+        registry.observe("grab_seconds", seconds, mode="full")
+    try:
+        with registry.span("write"):
+            raise OSError("disk full")
+    except OSError:
+        pass
+    assert registry.counter("captures_total", mode="full") == 3
+    assert registry.counter("write_failures_total") == 1
+    assert registry.histogram("write_seconds")["count"] == 1
+    lines = registry.render().splitlines()
+    assert "# TYPE screenshot_captures_total counter" in lines
+    assert 'screenshot_captures_total{mode="full"} 3' in lines
+    assert 'screenshot_captures_total{mode="a\\"b"} 1' in lines
+    assert "# TYPE screenshot_grab_seconds histogram" in lines
+    assert 'screenshot_grab_seconds_bucket{mode="full",le="0.01"} 1' in lines
+    assert 'screenshot_grab_seconds_bucket{mode="full",le="0.1"} 2' in lines
+    assert 'screenshot_grab_seconds_bucket{mode="full",le="+Inf"} 3' in lines
+    assert 'screenshot_grab_seconds_count{mode="full"} 3' in lines
+    assert lines.count("# TYPE screenshot_grab_seconds histogram") == 1
+
+
+def test_log_records_below_the_level_are_dropped_and_the_rest_buffered():
+    stream = io.StringIO()
+    configure_logging("info", buffer_lines=3, stream=stream)
+    log = logging.getLogger("test_telemetry")
+    try:
+        log.debug("hidden %s", object())
+        for index in range(5):
+            log.info("capture %d saved", index)
+        log.error("save failed")
+    finally:
+        shutdown_logging()
+    output = stream.getvalue().splitlines()
+    assert output == [f"[INFO] capture {index} saved" for index in range(5)] + ["[ERROR] save failed"]
+    assert [line.split(" ", 2)[2] for line in recent_log()] == [
+        "[INFO] capture 3 saved", "[INFO] capture 4 saved", "[ERROR] save failed"]
+    assert len(recent_log(1)) == 1
+    assert recent_log(0) == []
+
+
+def test_write_image_times_encode_and_write(tmp_path):
+    metrics.enabled = True
+    metrics.reset()
+    try:
+        nbytes = write_image(SyntheticCaptureBackend(64, 48).grab(), str(tmp_path / "frame.png"))
+        assert metrics.histogram("encode_seconds", format="png")["count"] == 1
+        assert metrics.histogram("write_seconds")["count"] == 1
+        assert metrics.counter("bytes_written_total") == nbytes
+    finally:
+        metrics.enabled = False
+        metrics.reset()
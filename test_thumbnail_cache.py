@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for the thumbnail cache
+"""
+
+import os
+
+from PyQt6.QtCore import QCoreApplication, QEventLoop, QSize, QTimer
+
+from capture_backends import SyntheticCaptureBackend
+from save_pipeline import write_image
+from thumbnail_cache import THUMBNAIL_DIRNAME, ThumbnailCache
+
+
+def _app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def _wait_for(cache, count):
+    ready = []
+    loop = QEventLoop()
+    def on_ready(path, image):
+        ready.append((path, image))
+        if len(ready) >= count:
+            loop.quit()
+    cache.thumbnail_ready.connect(on_ready)
+    QTimer.singleShot(5000, loop.quit)
+    loop.exec()
+    cache.thumbnail_ready.disconnect(on_ready)
+    return ready
+
+
+def test_thumbnails_render_persist_and_hit_memory(tmp_path):
+    app = _app()
+    path = str(tmp_path / "shot.png")
+    write_image(SyntheticCaptureBackend(800, 500).grab(), path)
+    mtime = os.path.getmtime(path)
+    cache = ThumbnailCache(str(tmp_path), size=QSize(80, 80))
+    assert cache.get(path, mtime) is None
+    (ready_path, thumb), = _wait_for(cache, 1)
+    assert ready_path == path
+    assert thumb.width() == 80 and thumb.height() == 50
+    assert cache.get(path, mtime) is not None
+    assert len(os.listdir(tmp_path / THUMBNAIL_DIRNAME)) == 1
+    cache.shutdown()
+
+
+def test_memory_lru_is_bounded_by_bytes(tmp_path):
+    app = _app()
+    paths = []
+    for i in range(4):
+        path = str(tmp_path / f"shot_{i}.png")
+        write_image(SyntheticCaptureBackend(64, 64).grab(), path)
+        paths.append(path)
+    one_thumb = 64 * 64 * 4
+    cache = ThumbnailCache(str(tmp_path), size=QSize(64, 64), max_bytes=2 * one_thumb, workers=1)
+    for path in paths:
+        cache.get(path, 1.0)
+    _wait_for(cache, 4)
+    assert cache.memory_bytes() <= 2 * one_thumb
+    cache.shutdown()
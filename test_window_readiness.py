@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Tests for waiting until windows have left the screen
+"""
+
+from PyQt6.QtCore import QEventLoop, QTimer
+from PyQt6.QtGui import QColor, QImage
+from PyQt6.QtWidgets import QApplication, QWidget
+
+from window_readiness import WindowHiddenWaiter, fingerprint, fingerprints_match
+
+
+def _app():
+    return QApplication.instance() or QApplication([])
+
+
+def _wait(waiter):
+    reasons = []
+    loop = QEventLoop()
+    waiter.ready.connect(lambda reason: (reasons.append(reason), loop.quit()))
+    QTimer.singleShot(5000, loop.quit)
+    waiter.start()
+    if not reasons:
+        loop.exec()
+    return reasons
+
+
+def test_fingerprints_tell_different_images_apart():
+    dark, light = QImage(64, 40, QImage.Format.Format_RGB32), QImage(64, 40, QImage.Format.Format_RGB32)
+    dark.fill(QColor(20, 20, 20))
+    light.fill(QColor(220, 220, 220))
+    assert fingerprints_match(fingerprint(dark), fingerprint(dark.scaled(128, 80)))
+    assert not fingerprints_match(fingerprint(dark), fingerprint(light))
+
+
+def test_visible_window_is_hidden_then_reported_presented(monkeypatch):
+    app = _app()
+    # What the offscreen platform's screen grab holds is undefined, so fix the
+    # fingerprints: the window's own, the window still on screen at the first
+    # probe, then the desktop without it
+    window, desktop = bytes([20]) * 256, bytes([220]) * 256
+    fingerprints = iter([window, window])
+    monkeypatch.setattr("window_readiness.fingerprint", lambda image: next(fingerprints, desktop))
+    widget = QWidget()
+    widget.resize(120, 80)
+    widget.show()
+    waiter = WindowHiddenWaiter([widget], timeout_ms=2000)
+    assert _wait(waiter) == ["presented"]
+    assert not widget.isVisible()
+    assert next(fingerprints, None) is None  # the first probe still saw the window
+
+
+def test_times_out_while_the_window_is_still_on_screen(monkeypatch):
+    app = _app()
+    widget = QWidget()
+    widget.resize(120, 80)
+    monkeypatch.setattr("window_readiness.fingerprints_match", lambda a, b: True)
+    waiter = WindowHiddenWaiter([widget], timeout_ms=30)
+    assert _wait(waiter) == ["timeout"]
@@ -0,0 +1,128 @@
+import hashlib
+import logging
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+from PyQt6.QtCore import QObject, QSize, Qt, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader
+
+log = logging.getLogger(__name__)
+
+THUMBNAIL_DIRNAME = ".thumbnails"
+
+
+class ThumbnailCache(QObject):
+    """Screenshot thumbnails from a byte-bounded in-memory LRU, a disk store, or a worker pool
+
+    Disk entries are keyed by the file's path, mtime and content hash, so an
+    overwritten screenshot never shows a stale thumbnail. Misses are rendered
+    by background workers, newest request first, and announced through
+    thumbnail_ready.
+    """
+    thumbnail_ready = pyqtSignal(str, QImage)  # source path, thumbnail
+
+    def __init__(self, screenshot_dir, size=QSize(200, 125), max_bytes=64 * 1024 * 1024, workers=2, parent=None):
+        super().__init__(parent)
+        self.size = size
+        self.max_bytes = max_bytes
+        self.store_dir = os.path.join(screenshot_dir, THUMBNAIL_DIRNAME)
+        os.makedirs(self.store_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> QImage
+        self._memory_bytes = 0
+        self._in_flight = set()
+        # LIFO so the thumbnails the user scrolled to most recently come first
+        self._queue = queue.LifoQueue()
+        self._workers = []
+        for index in range(workers):
+            worker = threading.Thread(target=self._run, name=f"ThumbnailWorker-{index}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def cache_key(self, path, mtime, content_hash=None):
+        identity = f"{os.path.abspath(path)}|{mtime!r}|{content_hash or ''}|{self.size.width()}x{self.size.height()}"
+        return hashlib.blake2b(identity.encode(), digest_size=16).hexdigest()
+
+    def memory_bytes(self):
+        with self._lock:
+            return self._memory_bytes
+
+    def get(self, path, mtime, content_hash=None):
+        """Return the thumbnail if it is in memory, otherwise queue it and return None"""
+        key = self.cache_key(path, mtime, content_hash)
+        with self._lock:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+                return image
+            if key in self._in_flight:
+                return None
+            self._in_flight.add(key)
+        self._queue.put((key, path))
+        return None
+
+    def clear_pending(self):
+        """Forget queued requests, e.g. when the view scrolled far away"""
+        while True:
+            try:
+                key, _ = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            with self._lock:
+                self._in_flight.discard(key)
+
+    def shutdown(self):
+        self.clear_pending()
+        for _ in self._workers:
+            self._queue.put(None)
+
+    def _remember(self, key, image):
+        with self._lock:
+            self._in_flight.discard(key)
+            if key in self._memory:
+                return
+            self._memory[key] = image
+            self._memory_bytes += image.sizeInBytes()
+            while self._memory_bytes > self.max_bytes and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted.sizeInBytes()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            key, path = job
+            try:
+                image = self._load_or_render(key, path)
+            except Exception as e:
+                log.error("Could not create thumbnail for %s: %s", path, e)
+                with self._lock:
+                    self._in_flight.discard(key)
+                continue
+            self._remember(key, image)
+            self.thumbnail_ready.emit(path, image)
+
+    def _load_or_render(self, key, path):
+        stored = os.path.join(self.store_dir, f"{key}.jpg")
+        image = QImage(stored) if os.path.exists(stored) else QImage()
+        if not image.isNull():
+            return image
+        reader = QImageReader(path)
+        source_size = reader.size()
+        if source_size.isValid():
+            # Lets JPEG decode at reduced size instead of decoding and then scaling
+            reader.setScaledSize(source_size.scaled(self.size, Qt.AspectRatioMode.KeepAspectRatio))
+        image = reader.read()
+        if image.isNull():
+            raise OSError(reader.errorString())
+        if image.width() > self.size.width() or image.height() > self.size.height():
+            image = image.scaled(self.size, Qt.AspectRatioMode.KeepAspectRatio,
+                                 Qt.TransformationMode.SmoothTransformation)
+        image = image.convertToFormat(QImage.Format.Format_RGB32)
+        tmp_path = stored + ".part"
+        if image.save(tmp_path, "JPEG", 85):
+            os.replace(tmp_path, stored)
+        return image
@@ -0,0 +1,94 @@
+import math
+
+from PyQt6.QtCore import QEvent, QObject, QTimer, Qt, pyqtSignal
+from PyQt6.QtGui import QImage
+
+FINGERPRINT_SIZE = 16
+# Mean per-pixel grey difference below which the screen still shows the window
+FINGERPRINT_TOLERANCE = 12
+
+
+def fingerprint(image):
+    """Tiny greyscale thumbnail used to recognise a window's pixels on screen"""
+    small = image.scaled(FINGERPRINT_SIZE, FINGERPRINT_SIZE, Qt.AspectRatioMode.IgnoreAspectRatio,
+                         Qt.TransformationMode.SmoothTransformation)
+    small = small.convertToFormat(QImage.Format.Format_Grayscale8)
+    return bytes(small.constBits().asarray(small.sizeInBytes()))
+
+
+def fingerprints_match(a, b):
+    if len(a) != len(b) or not a:
+        return False
+    return sum(abs(x - y) for x, y in zip(a, b)) / len(a) < FINGERPRINT_TOLERANCE
+
+
+class WindowHiddenWaiter(QObject):
+    """Signals once the given windows are hidden and gone from the screen
+
+    Visible windows are hidden and their Hide events awaited. Then, one
+    frame interval at a time, the screen area each window covered is
+    grabbed and compared with the window's own rendering; once no window
+    is recognisable on screen the compositor has presented a frame without
+    them. ready(reason) fires with "presented", or with "timeout" when
+    timeout_ms passes first.
+    """
+    ready = pyqtSignal(str)
+
+    def __init__(self, widgets, timeout_ms=200, parent=None):
+        super().__init__(parent)
+        self._widgets = [widget for widget in widgets if widget is not None]
+        self._awaiting_hide = set()
+        self._probes = []  # (screen, rect relative to the screen, fingerprint of the window)
+        self._finished = False
+        self._timeout = QTimer(self)
+        self._timeout.setSingleShot(True)
+        self._timeout.setInterval(max(0, int(timeout_ms)))
+        self._timeout.timeout.connect(lambda: self._finish("timeout"))
+        self._poll = QTimer(self)
+        self._poll.timeout.connect(self._check_presented)
+
+    def start(self):
+        for widget in self._widgets:
+            screen = widget.screen()
+            if screen is not None:
+                rect = widget.geometry().translated(-screen.geometry().topLeft())
+                self._probes.append((screen, rect, fingerprint(widget.grab().toImage())))
+                refresh_rate = screen.refreshRate() or 60.0
+                interval = math.ceil(1000.0 / refresh_rate)
+                if not self._poll.interval() or interval < self._poll.interval():
+                    self._poll.setInterval(interval)
+            if widget.isVisible():
+                widget.installEventFilter(self)
+                self._awaiting_hide.add(widget)
+        self._timeout.start()
+        for widget in list(self._awaiting_hide):
+            widget.hide()
+        if not self._awaiting_hide:
+            self._poll.start()
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Hide and obj in self._awaiting_hide:
+            obj.removeEventFilter(self)
+            self._awaiting_hide.discard(obj)
+            if not self._awaiting_hide and not self._finished:
+                # The first probe comes one frame after the last hide
+                self._poll.start()
+        return False
+
+    def _check_presented(self):
+        for screen, rect, window_fingerprint in self._probes:
+            shown = screen.grabWindow(0, rect.x(), rect.y(), rect.width(), rect.height()).toImage()
+            if fingerprints_match(fingerprint(shown), window_fingerprint):
+                return
+        self._finish("presented")
+
+    def _finish(self, reason):
+        if self._finished:
+            return
+        self._finished = True
+        self._timeout.stop()
+        self._poll.stop()
+        for widget in self._awaiting_hide:
+            widget.removeEventFilter(self)
+        self._awaiting_hide.clear()
+        self.ready.emit(reason)